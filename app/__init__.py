@@ -1,13 +1,50 @@
-from flask import Flask
+from flask import Flask, current_app, has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from .config import Config
 
-db = SQLAlchemy()
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class RoutingSession(Session):
+    """Session that sends reads issued by safe requests to the ``replica`` bind.
+
+    Flushes always go to the primary, so a GET handler that writes keeps working.
+    Without a ``replica`` entry in ``SQLALCHEMY_BINDS`` this is a plain session.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and "replica" in self._db.engines
+            and has_request_context()
+            and request.method in READ_METHODS
+        ):
+            return self._db.engines["replica"]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 login_manager = LoginManager()
 migrate = Migrate()
 
+
+def get_redis():
+    """Redis client shared by the app, or None when ``REDIS_URL`` is not set."""
+    ext = current_app.extensions
+    if "redis" not in ext:
+        url = current_app.config.get("REDIS_URL")
+        if url:
+            import redis  # only needed when a Redis server is configured
+
+            ext["redis"] = redis.from_url(url)
+        else:
+            ext["redis"] = None
+    return ext["redis"]
+
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
@@ -28,8 +65,13 @@ def create_app():
     app.register_blueprint(api_bp, url_prefix="/api")
     app.register_blueprint(web_bp)
 
+    from .storage import blobs_cli
+    app.cli.add_command(blobs_cli)
+
     # Create DB tables on first run (SQLite dev convenience)
     with app.app_context():
         db.create_all()
+        from . import category_tree
+        category_tree.rebuild_closure()
 
     return app
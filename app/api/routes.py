@@ -1,11 +1,15 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, url_for, send_file
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
-import os, hashlib, re, unicodedata
-from datetime import date, datetime
-from .. import db
-from ..models import Transaction, Attachment, Account, Category, Rule
-from ..ocr import extract_fields
+import os, base64, hashlib, hmac, json, re, tempfile, unicodedata, uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from .. import db, get_redis, category_tree, merchants, reference_data, statements, timeseries
+from ..models import Transaction, Attachment, Account, Category, Rule, UploadJob
+from ..changelog import SYNCED, changes_since, record_changes
+from ..dashboard import invalidate_dashboard
+from ..ocr import extract_fields, parse_fields
+from ..storage import blob_store
 from sqlalchemy.exc import IntegrityError
 
 api_bp = Blueprint("api", __name__)
@@ -64,6 +68,300 @@ def _normalize_icon_emoji(value: str | None):
         return None
     return value
 
+BULK_MAX_ITEMS = 500
+
+
+def _bulk_items():
+    """Items of a bulk request body (a list, or ``{"items": [...]}``).
+
+    Returns ``(items, None)`` or ``(None, error_response)``.
+    """
+    data = request.get_json(silent=True)
+    items = data.get("items") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return None, _error("items must be a non-empty list")
+    if len(items) > BULK_MAX_ITEMS:
+        return None, _error(f"at most {BULK_MAX_ITEMS} items per request", status=413)
+    return items, None
+
+
+def _item_error(index, message, status=400, errors=None):
+    item = {"index": index, "message": message, "status": status}
+    if errors:
+        item["errors"] = errors
+    return item
+
+
+def _load_owned(model, ids):
+    """The current user's live ``model`` rows with the given ids, in one query."""
+    if not ids:
+        return {}
+    rows = (
+        model.query.filter(model.user_id == current_user.id, model.id.in_(ids))
+        .filter(model.deleted_at.is_(None))
+        .all()
+    )
+    return {r.id: r for r in rows}
+
+
+def _name_taken(model, name, exclude_id=None):
+    """Whether another live row of the user already uses ``name`` (case-insensitive)."""
+    owner = reference_data.names(current_user.id, model).get(name.lower())
+    return owner is not None and owner != exclude_id
+
+
+def _name_conflicts(model, named):
+    """Indexes in ``named`` (``[(index, id_or_None, name)]``) whose name is taken.
+
+    A name is taken by another live row of the user or by an earlier item of
+    the same batch; comparison is case-insensitive.
+    """
+    if not named:
+        return set()
+    existing = reference_data.names(current_user.id, model)
+    conflicts, seen = set(), set()
+    for index, item_id, name in named:
+        key = name.lower()
+        owner = existing.get(key)
+        if key in seen or (owner is not None and owner != item_id):
+            conflicts.add(index)
+        seen.add(key)
+    return conflicts
+
+
+def _is_name_conflict(exc):
+    """Whether ``exc`` was raised by a ``uq_*_user_name_active`` index."""
+    return "_user_name_active" in str(exc.orig)
+
+
+def _bulk_upsert(model, items, validate, to_dict, duplicate_message, check=None, finish=None):
+    """Validate every item, then create (no ``id``) or update them all in one transaction.
+
+    ``check(prepared, targets)`` returns extra per-item errors and
+    ``finish(changes)`` runs after the flush with ``(row, created, previous)``
+    tuples. Nothing is written unless every item is valid.
+    """
+    errors, prepared = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append(_item_error(index, "item must be an object"))
+            continue
+        # A present id means an update, so it must name a row; null is not "create"
+        if "id" in item and (not isinstance(item["id"], int) or isinstance(item["id"], bool)):
+            errors.append(_item_error(index, "id must be an integer", 400, {"id": ["invalid"]}))
+            continue
+        fields, err = validate(item, partial="id" in item)
+        if err:
+            errors.append(_item_error(index, *err))
+            continue
+        prepared.append((index, item.get("id"), fields))
+    targets = _load_owned(model, [item_id for _, item_id, _ in prepared if item_id is not None])
+    for index, item_id, _ in prepared:
+        if item_id is not None and item_id not in targets:
+            errors.append(_item_error(index, "not found", 404))
+    named = [(index, item_id, f["name"]) for index, item_id, f in prepared if "name" in f]
+    for index in _name_conflicts(model, named):
+        errors.append(_item_error(index, duplicate_message, 409, {"name": ["exists"]}))
+    if check:
+        errors.extend(check(prepared, targets))
+    if errors:
+        return _error("no items were saved", status=422, errors=sorted(errors, key=lambda e: e["index"]))
+
+    changes = []
+    for _, item_id, fields in prepared:
+        if item_id is None:
+            row = model(user_id=current_user.id, **fields)
+            db.session.add(row)
+            changes.append((row, True, {}))
+        else:
+            row = targets[item_id]
+            previous = {key: getattr(row, key) for key in fields}
+            for key, value in fields.items():
+                setattr(row, key, value)
+            changes.append((row, False, previous))
+    try:
+        db.session.flush()
+        if finish:
+            finish(changes)
+        db.session.commit()
+    except IntegrityError as exc:
+        db.session.rollback()
+        if _is_name_conflict(exc):
+            return _error(duplicate_message, status=409, errors={"name": ["exists"]})
+        current_app.logger.warning("Bulk %s upsert rejected: %s", model.__tablename__, exc.orig)
+        return _error("no items were saved", status=409)
+    return _success([to_dict(row) for row, _, _ in changes])
+
+
+def _list_rows(model, columns):
+    """The user's live ``model`` rows as Core rows holding only ``columns``.
+
+    The ``*_to_dict`` serialisers read attributes, so they accept these rows
+    as well as entities; nothing enters the identity map.
+    """
+    return db.session.execute(
+        db.select(*columns).where(model.user_id == current_user.id, model.deleted_at.is_(None))
+    ).all()
+
+
+def _invalidate_user_caches():
+    """Drop cached summaries after set-based writes the ORM events cannot see."""
+    invalidate_dashboard(current_user.id)
+    reference_data.invalidate_reference_data(current_user.id)
+
+
+def _bulk_ids():
+    """Distinct ids of a bulk delete/restore body (a list, or ``{"ids": [...]}``).
+
+    Returns ``(ids, None)`` or ``(None, error_response)``.
+    """
+    data = request.get_json(silent=True)
+    ids = data.get("ids") if isinstance(data, dict) else data
+    if (
+        not isinstance(ids, list)
+        or not ids
+        or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)
+    ):
+        return None, _error("ids must be a non-empty list of integers")
+    if len(ids) > BULK_MAX_ITEMS:
+        return None, _error(f"at most {BULK_MAX_ITEMS} ids per request", status=413)
+    return list(dict.fromkeys(ids)), None
+
+
+def _owned_rows(model, ids, *columns):
+    """``{id: row}`` of the user's ``model`` rows in ``ids``, deleted or not, in one query."""
+    rows = db.session.query(model.id, model.deleted_at, *columns).filter(
+        model.user_id == current_user.id, model.id.in_(ids)
+    )
+    return {row.id: row for row in rows}
+
+
+def _missing_errors(ids, rows):
+    return [_item_error(index, "not found", 404) for index, i in enumerate(ids) if i not in rows]
+
+
+def _set_deleted(model, ids, deleted):
+    """Soft-delete (or restore) the user's ``model`` rows in ``ids`` with one UPDATE.
+
+    Rows already in the requested state are left alone; returns the number changed.
+    """
+    criteria = (
+        model.user_id == current_user.id,
+        model.id.in_(ids),
+        model.deleted_at.is_(None) if deleted else model.deleted_at.isnot(None),
+    )
+    record_changes(model, *criteria)
+    stmt = db.update(model).where(*criteria).values(deleted_at=datetime.utcnow() if deleted else None)
+    return db.session.execute(stmt).rowcount
+
+
+def _set_rules_active(active, *criteria):
+    """Flip ``active`` on the user's live rules matching ``criteria`` with one UPDATE.
+
+    Returns the number of rules changed.
+    """
+    criteria = (
+        Rule.user_id == current_user.id,
+        Rule.deleted_at.is_(None),
+        Rule.active == (not active),
+        *criteria,
+    )
+    record_changes(Rule, *criteria)
+    return db.session.execute(db.update(Rule).where(*criteria).values(active=active)).rowcount
+
+
+_UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def _stream_to_temp(f, directory):
+    """Copy an upload into a temp file in ``directory``, hashing as it is written.
+
+    Memory use is one chunk regardless of the file size.
+    Returns ``(temp_path, sha256_hex, size)``.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: f.stream.read(_UPLOAD_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), size
+
+
+def _previous_ocr_fields(sha):
+    """Fields of a transaction already extracted from identical bytes, if any."""
+    unfinished = db.exists().where(
+        UploadJob.transaction_id == Transaction.id, UploadJob.status != "done"
+    )
+    prev = (
+        db.session.query(Transaction)
+        .join(Attachment, Attachment.transaction_id == Transaction.id)
+        .filter(Attachment.user_id == current_user.id, Attachment.sha256 == sha)
+        .filter(~unfinished)
+        .order_by(Attachment.id)
+        .first()
+    )
+    if prev is None:
+        return None
+    return {"date": prev.date, "amount": prev.amount, "merchant": prev.merchant}
+
+
+def _upload_job_to_dict(job: UploadJob):
+    return {
+        "id": job.id,
+        "status": job.status,
+        "transaction_id": job.transaction_id,
+        "attachment_id": job.attachment_id,
+        "error": job.error,
+    }
+
+
+def _complete_upload_job(job: UploadJob, fields):
+    tx = db.session.get(Transaction, job.transaction_id) if job.transaction_id else None
+    if tx is None:
+        # The transaction was deleted while the job was queued
+        _fail_upload_job(job, "transaction deleted")
+        return
+    tx.date = fields.get("date") or tx.date
+    tx.amount = fields.get("amount", 0)
+    tx.merchant = fields.get("merchant", "")
+    job.status = "done"
+    job.completed_at = datetime.utcnow()
+    db.session.commit()
+
+
+def _fail_upload_job(job: UploadJob, error):
+    job.status = "failed"
+    job.error = (error or "OCR failed")[:255]
+    job.completed_at = datetime.utcnow()
+    db.session.commit()
+
+
+def _enqueue_ocr(job: UploadJob, path):
+    """Queue ``job`` for services/worker. Returns False when no queue is configured."""
+    redis_conn = get_redis()
+    if redis_conn is None:
+        return False
+    base = current_app.config.get("OCR_CALLBACK_BASE_URL")
+    if base:
+        webhook_url = base.rstrip("/") + url_for("api.upload_result", job_id=job.id)
+    else:
+        webhook_url = url_for("api.upload_result", job_id=job.id, _external=True)
+    payload = {
+        "id": job.id,
+        "image_path": os.path.abspath(path),
+        "webhook_url": webhook_url,
+    }
+    redis_conn.rpush(current_app.config["OCR_QUEUE"], json.dumps(payload))
+    return True
+
+
 @api_bp.post("/upload")
 @login_required
 def upload():
@@ -71,46 +369,197 @@ def upload():
     account_id = request.form.get("account_id", type=int)
     if not f or not account_id:
         return jsonify({"error": "file and account_id are required"}), 400
+    if account_id not in reference_data.live_ids(current_user.id, Account):
+        return jsonify({"error": "invalid account"}), 400
     if not _allowed(f.filename):
         return jsonify({"error": "file type not allowed"}), 400
 
-    data = f.read()
-    sha = hashlib.sha256(data).hexdigest()
-    updir = current_app.config["UPLOAD_FOLDER"]
-    os.makedirs(updir, exist_ok=True)
-    name = f"{sha}_{secure_filename(f.filename)}"
-    path = os.path.join(updir, name)
-    if not os.path.exists(path):
-        with open(path, "wb") as out:
-            out.write(data)
-
-    fields = extract_fields(path)
+    store = blob_store()
+    os.makedirs(store.root, exist_ok=True)
+    tmp_path, sha, size = _stream_to_temp(f, store.root)
+    path = store.put(tmp_path, sha)
 
+    # Identical bytes were already processed for this user: skip OCR
+    fields = _previous_ocr_fields(sha)
     tx = Transaction(
         user_id=current_user.id,
         account_id=account_id,
-        date=fields.get("date", date.today()),
-        amount=fields.get("amount", 0),
-        merchant=fields.get("merchant", ""),
+        date=(fields or {}).get("date", date.today()),
+        amount=(fields or {}).get("amount", 0),
+        merchant=(fields or {}).get("merchant", ""),
         note="(OCR)",
         source="ocr"
     )
-    db.session.add(tx); db.session.commit()
+    db.session.add(tx); db.session.flush()
 
     att = Attachment(
         user_id=current_user.id,
         transaction_id=tx.id,
-        filename=name,
+        filename=secure_filename(f.filename),
         mime=f.mimetype,
-        size=len(data),
+        size=size,
         sha256=sha
     )
-    db.session.add(att); db.session.commit()
-    return jsonify({"ok": True, "transaction_id": tx.id, "attachment_id": att.id})
+    db.session.add(att); db.session.flush()
+    if fields is not None:
+        db.session.commit()
+        return jsonify({
+            "ok": True,
+            "transaction_id": tx.id,
+            "attachment_id": att.id,
+            "deduplicated": True,
+        })
+
+    job = UploadJob(
+        id=uuid.uuid4().hex,
+        user_id=current_user.id,
+        attachment_id=att.id,
+        transaction_id=tx.id,
+    )
+    db.session.add(job); db.session.commit()
+    if not _enqueue_ocr(job, path):
+        # No worker queue (dev/tests): run OCR in the request instead
+        try:
+            _complete_upload_job(job, extract_fields(path, sha256=sha))
+        except Exception as exc:
+            # The upload is already saved; report the job failed, not a 500
+            current_app.logger.exception("OCR failed for upload job %s", job.id)
+            db.session.rollback()
+            _fail_upload_job(job, str(exc))
+    return jsonify({
+        "ok": True,
+        "job_id": job.id,
+        "status": job.status,
+        "transaction_id": tx.id,
+        "attachment_id": att.id,
+        "deduplicated": False,
+    }), 202
+
+
+@api_bp.get("/uploads/<job_id>")
+@login_required
+def upload_status(job_id):
+    job = UploadJob.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    return _success(_upload_job_to_dict(job))
+
+
+@api_bp.post("/uploads/<job_id>/result")
+def upload_result(job_id):
+    """Callback used by services/worker once OCR text is available.
+
+    A body with ``error`` instead of ``text`` reports a job the worker gave
+    up on; the job is marked ``failed`` so clients stop polling.
+    """
+    body = request.get_data()
+    secret = current_app.config["OCR_WEBHOOK_SECRET"].encode()
+    expected = hmac.new(secret, body, hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected, request.headers.get("X-Hub-Signature", "")):
+        return _error("invalid signature", status=403)
+    job = db.session.get(UploadJob, job_id)
+    if job is None:
+        return _error("job not found", status=404)
+    if job.status == "queued":
+        # Worker retries may deliver the same result twice
+        data = request.get_json(silent=True) or {}
+        if "error" in data:
+            _fail_upload_job(job, str(data["error"]))
+        else:
+            _complete_upload_job(job, parse_fields(data.get("text", "")))
+    return _success(_upload_job_to_dict(job))
+
+
+# Attachments are stored by sha256 and never rewritten, so a URL's bytes never change
+_ATTACHMENT_MAX_AGE = 365 * 24 * 3600
+_THUMB_SIZES = (128, 256, 512)
+# ``Attachment.mime`` comes from the client; only raster images are shown
+# inline (SVG can carry script), anything else is downloaded
+_INLINE_MIMETYPES = {"image/gif", "image/jpeg", "image/png", "image/webp"}
+
+
+def _attachment_path(att: Attachment):
+    if att.sha256:
+        path = blob_store().path(att.sha256)
+        if os.path.exists(path):
+            return path
+    # Flat-layout file not yet moved by `flask blobs migrate`
+    return os.path.abspath(os.path.join(current_app.config["UPLOAD_FOLDER"], att.filename))
+
+
+def _send_immutable(path, mimetype, etag, download_name=None, as_attachment=False):
+    # conditional=True gives Range/206 and If-None-Match/304 handling; the
+    # body is streamed with wsgi.file_wrapper (sendfile) when the server has it
+    rv = send_file(
+        path,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=True,
+        etag=etag,
+        max_age=_ATTACHMENT_MAX_AGE,
+    )
+    # Never let the browser second-guess the declared type
+    rv.headers["X-Content-Type-Options"] = "nosniff"
+    rv.cache_control.public = False
+    rv.cache_control.private = True
+    rv.cache_control.immutable = True
+    return rv
+
+
+def _thumbnail(src, dest, size):
+    """Write a JPEG preview of ``src`` no larger than ``size`` px to ``dest``."""
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((size, size))
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest), prefix=".thumb-")
+        with os.fdopen(fd, "wb") as out:
+            img.convert("RGB").save(out, "JPEG", quality=80)
+    os.replace(tmp_path, dest)
+
+
+@api_bp.get("/attachments/<int:id>")
+@login_required
+def attachments_get(id):
+    att = Attachment.query.filter_by(id=id, user_id=current_user.id).first_or_404()
+    path = _attachment_path(att)
+    if not os.path.exists(path):
+        return _error("file not found", status=404)
+    return _send_immutable(
+        path, att.mime or None, att.sha256, att.filename, as_attachment=att.mime not in _INLINE_MIMETYPES
+    )
+
+
+@api_bp.get("/attachments/<int:id>/thumb")
+@login_required
+def attachments_thumb(id):
+    size = request.args.get("size", 256, type=int)
+    if size not in _THUMB_SIZES:
+        return _error(f"size must be one of {', '.join(map(str, _THUMB_SIZES))}")
+    att = Attachment.query.filter_by(id=id, user_id=current_user.id).first_or_404()
+    path = _attachment_path(att)
+    if not os.path.exists(path):
+        return _error("file not found", status=404)
+    thumb = os.path.join(
+        os.path.abspath(current_app.config["THUMBNAIL_FOLDER"]), f"{att.sha256}_{size}.jpg"
+    )
+    if not os.path.exists(thumb):
+        from PIL import Image
+
+        try:
+            _thumbnail(path, thumb, size)
+        except (OSError, Image.DecompressionBombError):
+            # PDFs, oversized images and anything else Pillow cannot decode have no preview
+            return _error("preview not available", status=404)
+    return _send_immutable(thumb, "image/jpeg", f"{att.sha256}-{size}")
 
 
 # --- Accounts CRUD ---
 
+_ACCOUNT_COLUMNS = (Account.id, Account.name, Account.type, Account.currency, Account.opening_balance, Account.active)
+
+
 def _account_to_dict(a: Account):
     return {
         "id": a.id,
@@ -125,77 +574,61 @@ def _account_to_dict(a: Account):
 @api_bp.get("/accounts")
 @login_required
 def accounts_list():
-    items = (
-        Account.query.filter_by(user_id=current_user.id)
-        .filter(Account.deleted_at.is_(None))
-        .all()
-    )
-    return _success([_account_to_dict(a) for a in items])
+    return _success([_account_to_dict(r) for r in _list_rows(Account, _ACCOUNT_COLUMNS)])
+
+
+def _validate_account(data, partial=False):
+    """Check account fields; ``partial`` only checks the keys present (updates).
+
+    Returns ``(fields, None)`` or ``(None, (message, status, errors))``.
+    """
+    fields = {}
+    if not partial or "name" in data:
+        name = (data.get("name") or "").strip()
+        if not name or not (1 <= len(name) <= 80):
+            return None, ("invalid name", 400, {"name": ["required or length"]})
+        fields["name"] = name
+    if not partial or "type" in data:
+        acc_type = data.get("type")
+        if not acc_type and not partial:
+            return None, ("name and type required", 400, None)
+        if acc_type not in current_app.config.get("ALLOWED_ACCOUNT_TYPES", set()):
+            return None, ("invalid account type", 422, {"type": ["invalid"]})
+        fields["type"] = acc_type
+    if not partial or "currency" in data:
+        currency = data.get("currency", "MXN")
+        if currency not in current_app.config.get("ALLOWED_CURRENCIES", []):
+            return None, ("invalid currency", 422, {"currency": ["invalid"]})
+        fields["currency"] = currency
+    if not partial or "opening_balance" in data:
+        try:
+            opening_balance = float(data.get("opening_balance", 0))
+        except (TypeError, ValueError):
+            return None, ("invalid opening_balance", 422, {"opening_balance": ["invalid"]})
+        if opening_balance < 0:
+            return None, ("opening_balance must be >= 0", 422, {"opening_balance": ["negative"]})
+        fields["opening_balance"] = opening_balance
+    if not partial or "active" in data:
+        active = data.get("active", True)
+        if not isinstance(active, bool):
+            return None, ("invalid active", 422, {"active": ["invalid"]})
+        fields["active"] = active
+    return fields, None
 
 
 @api_bp.post("/accounts")
 @login_required
 def accounts_create():
     data = request.get_json() or {}
-    name = (data.get("name") or "").strip()
-    acc_type = data.get("type")
-    currency = data.get("currency", "MXN")
-    opening_balance = data.get("opening_balance", 0)
-    active = data.get("active", True)
-    if not name or not (1 <= len(name) <= 80):
-        return _error("invalid name", errors={"name": ["required or length"]})
-    if not acc_type:
-        return _error("name and type required")
-    if acc_type not in current_app.config.get("ALLOWED_ACCOUNT_TYPES", set()):
-        return _error(
-            "invalid account type",
-            status=422,
-            errors={"type": ["invalid"]},
-        )
-    if currency not in current_app.config.get("ALLOWED_CURRENCIES", []):
-        return _error(
-            "invalid currency",
-            status=422,
-            errors={"currency": ["invalid"]},
-        )
-    try:
-        opening_balance = float(opening_balance)
-    except (TypeError, ValueError):
-        return _error(
-            "invalid opening_balance",
-            status=422,
-            errors={"opening_balance": ["invalid"]},
-        )
-    if opening_balance < 0:
-        return _error(
-            "opening_balance must be >= 0",
-            status=422,
-            errors={"opening_balance": ["negative"]},
-        )
-    if not isinstance(active, bool):
-        return _error(
-            "invalid active",
-            status=422,
-            errors={"active": ["invalid"]},
-        )
+    fields, err = _validate_account(data)
+    if err:
+        return _error(*err)
+    name = fields["name"]
     supports_partial = _supports_partial_index()
     if not supports_partial:
-        exists = (
-            Account.query.filter(Account.user_id == current_user.id)
-            .filter(db.func.lower(Account.name) == name.lower())
-            .filter(Account.deleted_at.is_(None))
-            .first()
-        )
-        if exists:
+        if _name_taken(Account, name):
             return _error("duplicate account name", status=409, errors={"name": ["exists"]})
-    a = Account(
-        user_id=current_user.id,
-        name=name,
-        type=acc_type,
-        currency=currency,
-        opening_balance=opening_balance,
-        active=active,
-    )
+    a = Account(user_id=current_user.id, **fields)
     db.session.add(a)
     try:
         db.session.commit()
@@ -205,6 +638,64 @@ def accounts_create():
     return _success(_account_to_dict(a), status=201)
 
 
+@api_bp.post("/accounts/bulk")
+@login_required
+def accounts_bulk():
+    """Create or update many accounts at once; items with an ``id`` are updates."""
+    items, err = _bulk_items()
+    if err:
+        return err
+    return _bulk_upsert(Account, items, _validate_account, _account_to_dict, "duplicate account name")
+
+
+@api_bp.post("/accounts/bulk/delete")
+@login_required
+def accounts_bulk_delete():
+    """Soft-delete many accounts and disable the rules scoped to them."""
+    ids, err = _bulk_ids()
+    if err:
+        return err
+    errors = _missing_errors(ids, _owned_rows(Account, ids))
+    if errors:
+        return _error("no items were changed", status=422, errors=errors)
+    deleted = _set_deleted(Account, ids, True)
+    disabled = _set_rules_active(False, Rule.scope_account_id.in_(ids))
+    db.session.commit()
+    _invalidate_user_caches()
+    return _success(
+        {"ids": ids, "deleted": deleted, "disabled_rules": disabled},
+        message=f"{disabled} rule(s) disabled",
+    )
+
+
+@api_bp.post("/accounts/bulk/restore")
+@login_required
+def accounts_bulk_restore():
+    """Restore many soft-deleted accounts; fails if a restored name is taken."""
+    ids, err = _bulk_ids()
+    if err:
+        return err
+    rows = _owned_rows(Account, ids, Account.name)
+    errors = _missing_errors(ids, rows)
+    named = [
+        (index, i, rows[i].name)
+        for index, i in enumerate(ids)
+        if i in rows and rows[i].deleted_at is not None
+    ]
+    for index in _name_conflicts(Account, named):
+        errors.append(_item_error(index, "duplicate account name", 409, {"name": ["exists"]}))
+    if errors:
+        return _error("no items were changed", status=422, errors=sorted(errors, key=lambda e: e["index"]))
+    try:
+        restored = _set_deleted(Account, ids, False)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return _error("duplicate account name", status=409, errors={"name": ["exists"]})
+    _invalidate_user_caches()
+    return _success({"ids": ids, "restored": restored})
+
+
 def _get_account(id: int, include_deleted=False):
     q = Account.query.filter_by(id=id, user_id=current_user.id)
     if not include_deleted:
@@ -230,14 +721,7 @@ def accounts_update(id):
             return _error("invalid name", errors={"name": ["required or length"]})
         supports_partial = _supports_partial_index()
         if not supports_partial:
-            exists = (
-                Account.query.filter(Account.user_id == current_user.id)
-                .filter(db.func.lower(Account.name) == name.lower())
-                .filter(Account.id != id)
-                .filter(Account.deleted_at.is_(None))
-                .first()
-            )
-            if exists:
+            if _name_taken(Account, name, exclude_id=id):
                 return _error("duplicate account name", status=409, errors={"name": ["exists"]})
         data["name"] = name
     if "type" in data:
@@ -294,16 +778,9 @@ def accounts_update(id):
 @login_required
 def accounts_delete(id):
     a = _get_account(id)
-    rules = (
-        Rule.query.filter_by(user_id=current_user.id, scope_account_id=id, active=True)
-        .filter(Rule.deleted_at.is_(None))
-        .all()
-    )
-    for r in rules:
-        r.active = False
+    count = _set_rules_active(False, Rule.scope_account_id == id)
     a.deleted_at = datetime.utcnow()
     db.session.commit()
-    count = len(rules)
     return _success({"id": id, "disabled_rules": count}, message=f"{count} rule(s) disabled")
 
 
@@ -315,13 +792,7 @@ def accounts_restore(id):
         return _success(_account_to_dict(a))
     supports_partial = _supports_partial_index()
     if not supports_partial:
-        dup = (
-            Account.query.filter(Account.user_id == current_user.id)
-            .filter(db.func.lower(Account.name) == a.name.lower())
-            .filter(Account.deleted_at.is_(None))
-            .first()
-        )
-        if dup:
+        if _name_taken(Account, a.name):
             return _error("duplicate account name", status=409, errors={"name": ["exists"]})
     data = request.get_json() or {}
     a.deleted_at = None
@@ -335,8 +806,57 @@ def accounts_restore(id):
     return _success(_account_to_dict(a))
 
 
+_MONTH_RE = re.compile(r"^(\d{4})-(\d{2})$")
+
+
+@api_bp.get("/accounts/<int:id>/statements/<month>")
+@login_required
+def accounts_statement(id, month):
+    """The PDF statement of an account for ``month`` (``YYYY-MM``).
+
+    Served from the statement cache when the account's data for the month is
+    unchanged; otherwise rendering is queued and 202 is returned, to be
+    polled until the file is ready.
+    """
+    a = _get_account(id, include_deleted=True)
+    m = _MONTH_RE.match(month)
+    if not m or not 1 <= int(m.group(2)) <= 12:
+        return _error("invalid month", errors={"month": ["expected YYYY-MM"]})
+    first_day = date(int(m.group(1)), int(m.group(2)), 1)
+    version = statements.data_version(db.session, a.id, first_day)
+    path = statements.statement_path(current_app.config["STATEMENT_FOLDER"], a.id, first_day, version)
+    if os.path.exists(path):
+        # The URL is not versioned, so clients revalidate against the version ETag
+        rv = send_file(
+            path,
+            mimetype="application/pdf",
+            as_attachment=True,
+            download_name=f"statement-{a.id}-{month}.pdf",
+            conditional=True,
+            etag=version,
+            max_age=0,
+        )
+        rv.cache_control.private = True
+        return rv
+    statements.request_statement(a.id, first_day, path)
+    rv, status = _success({"status": "pending", "version": version}, status=202)
+    rv.headers["Retry-After"] = "2"
+    return rv, status
+
+
 # --- Categories CRUD ---
 
+_CATEGORY_COLUMNS = (
+    Category.id,
+    Category.name,
+    Category.kind,
+    Category.color,
+    Category.icon_emoji,
+    Category.parent_id,
+    Category.is_system,
+)
+
+
 def _category_to_dict(c: Category):
     return {
         "id": c.id,
@@ -352,63 +872,64 @@ def _category_to_dict(c: Category):
 @api_bp.get("/categories")
 @login_required
 def categories_list():
-    items = (
-        Category.query.filter_by(user_id=current_user.id)
-        .filter(Category.deleted_at.is_(None))
-        .all()
-    )
-    return _success([_category_to_dict(c) for c in items])
+    return _success([_category_to_dict(r) for r in _list_rows(Category, _CATEGORY_COLUMNS)])
+
+
+def _validate_category(data, partial=False):
+    """Check category fields; ``partial`` only checks the keys present (updates).
+
+    The parent is not looked up here. Returns ``(fields, None)`` or
+    ``(None, (message, status, errors))``.
+    """
+    fields = {}
+    if partial and "is_system" in data:
+        return None, ("is_system cannot be modified", 400, None)
+    if not partial or "name" in data:
+        name = (data.get("name") or "").strip()
+        if not name or not (1 <= len(name) <= 60):
+            return None, ("invalid name", 400, {"name": ["required or length"]})
+        fields["name"] = name
+    if not partial or "kind" in data:
+        if not data.get("kind"):
+            return None, ("name and kind required", 400, None)
+        fields["kind"] = data["kind"]
+    if not partial or "color" in data:
+        color = _normalize_color(data.get("color", "#888888"))
+        if color is None:
+            return None, ("invalid color", 422, {"color": ["invalid hex"]})
+        fields["color"] = color
+    if not partial or "icon_emoji" in data:
+        raw_icon = data.get("icon_emoji")
+        icon_emoji = _normalize_icon_emoji(raw_icon)
+        if raw_icon not in (None, "") and icon_emoji is None:
+            return None, ("invalid icon emoji", 422, {"icon_emoji": ["invalid emoji"]})
+        fields["icon_emoji"] = icon_emoji
+    if not partial or "parent_id" in data:
+        fields["parent_id"] = data.get("parent_id")
+    if not partial:
+        fields["is_system"] = data.get("is_system", False)
+    return fields, None
 
 
 @api_bp.post("/categories")
 @login_required
 def categories_create():
     data = request.get_json() or {}
-    name = (data.get("name") or "").strip()
-    kind = data.get("kind")
-    color = _normalize_color(data.get("color", "#888888"))
-    raw_icon = data.get("icon_emoji")
-    icon_emoji = _normalize_icon_emoji(raw_icon)
-    if raw_icon not in (None, "") and icon_emoji is None:
-        return _error("invalid icon emoji", status=422, errors={"icon_emoji": ["invalid emoji"]})
-    parent_id = data.get("parent_id")
-    if parent_id is not None:
-        parent = (
-            Category.query.filter_by(id=parent_id, user_id=current_user.id)
-            .filter(Category.deleted_at.is_(None))
-            .first()
-        )
-        if not parent:
-            return _error("invalid parent category")
-    is_system = data.get("is_system", False)
-    if not name or not (1 <= len(name) <= 60):
-        return _error("invalid name", errors={"name": ["required or length"]})
-    if not kind:
-        return _error("name and kind required")
-    if color is None:
-        return _error("invalid color", status=422, errors={"color": ["invalid hex"]})
+    fields, err = _validate_category(data)
+    if err:
+        return _error(*err)
+    name, parent_id = fields["name"], fields["parent_id"]
+    if parent_id is not None and parent_id not in reference_data.live_ids(current_user.id, Category):
+        return _error("invalid parent category")
     supports_partial = _supports_partial_index()
     if not supports_partial:
-        exists = (
-            Category.query.filter(Category.user_id == current_user.id)
-            .filter(db.func.lower(Category.name) == name.lower())
-            .filter(Category.deleted_at.is_(None))
-            .filter(Category.is_system.is_(False))
-            .first()
-        )
-        if exists:
+        if _name_taken(Category, name):
             return _error("duplicate category name", status=409, errors={"name": ["exists"]})
-    c = Category(
-        user_id=current_user.id,
-        name=name,
-        kind=kind,
-        color=color,
-        icon_emoji=icon_emoji,
-        parent_id=parent_id,
-        is_system=is_system,
-    )
+    c = Category(user_id=current_user.id, **fields)
     db.session.add(c)
     try:
+        db.session.flush()
+        category_tree.add_category(c)
         db.session.commit()
     except IntegrityError:
         db.session.rollback()
@@ -416,6 +937,64 @@ def categories_create():
     return _success(_category_to_dict(c), status=201)
 
 
+def _closes_cycle(parent_of, category_id):
+    """Whether following ``parent_of`` up from ``category_id`` comes back to it."""
+    seen = set()
+    node = parent_of.get(category_id)
+    while node is not None and node not in seen:
+        if node == category_id:
+            return True
+        seen.add(node)
+        node = parent_of.get(node)
+    return False
+
+
+def _check_category_parents(prepared, targets):
+    """Per-item errors for parents that do not exist or would close a cycle.
+
+    Cycles are looked for in the tree as it will be once the whole batch is
+    applied, so two items that each move under the other are both rejected.
+    """
+    errors = []
+    parents = reference_data.live_ids(current_user.id, Category)
+    moves = {
+        item_id: fields["parent_id"]
+        for _, item_id, fields in prepared
+        if item_id is not None and "parent_id" in fields
+    }
+    parent_of = {}
+    if moves:
+        parent_of = dict(
+            db.session.query(Category.id, Category.parent_id)
+            .filter(Category.user_id == current_user.id)
+            .all()
+        )
+        parent_of.update(moves)
+    for index, item_id, fields in prepared:
+        parent_id = fields.get("parent_id")
+        if parent_id is None:
+            continue
+        if parent_id not in parents or (item_id is not None and _closes_cycle(parent_of, item_id)):
+            errors.append(_item_error(index, "invalid parent category"))
+    return errors
+
+
+def _update_category_tree(changes):
+    moved = []
+    for c, created, previous in changes:
+        if created:
+            category_tree.add_category(c)
+        elif "parent_id" in previous and previous["parent_id"] != c.parent_id:
+            moved.append(c)
+    # Detach every moved subtree before re-attaching any: moving them one by
+    # one could pass through a cycle even though the final tree has none
+    for c in moved:
+        category_tree.move_category(c.id, None)
+    for c in moved:
+        if c.parent_id is not None:
+            category_tree.move_category(c.id, c.parent_id)
+
+
 def _get_category(id: int, include_deleted=False):
     q = Category.query.filter_by(id=id, user_id=current_user.id)
     if not include_deleted:
@@ -443,15 +1022,7 @@ def categories_update(id):
             return _error("invalid name", errors={"name": ["required or length"]})
         supports_partial = _supports_partial_index()
         if not supports_partial:
-            exists = (
-                Category.query.filter(Category.user_id == current_user.id)
-                .filter(db.func.lower(Category.name) == name.lower())
-                .filter(Category.id != id)
-                .filter(Category.deleted_at.is_(None))
-                .filter(Category.is_system.is_(False))
-                .first()
-            )
-            if exists:
+            if _name_taken(Category, name, exclude_id=id):
                 return _error("duplicate category name", status=409, errors={"name": ["exists"]})
         data["name"] = name
     if "color" in data:
@@ -467,21 +1038,14 @@ def categories_update(id):
     if "parent_id" in data:
         parent_id = data["parent_id"]
         if parent_id is not None:
-            parent = (
-                Category.query.filter_by(id=parent_id, user_id=current_user.id)
-                .filter(Category.deleted_at.is_(None))
-                .first()
-            )
-            if not parent:
+            if parent_id not in reference_data.live_ids(current_user.id, Category):
                 return _error("invalid parent category")
-            ancestor = parent
-            while ancestor:
-                if ancestor.id == c.id:
-                    return _error("invalid parent category")
-                ancestor = ancestor.parent
+            # The new parent may not be the category itself or one of its descendants
+            if category_tree.is_descendant(c.id, parent_id):
+                return _error("invalid parent category")
+        if parent_id != c.parent_id:
+            category_tree.move_category(c.id, parent_id)
             c.parent_id = parent_id
-        else:
-            c.parent_id = None
     for field in ["name", "kind", "color", "icon_emoji"]:
         if field in data:
             setattr(c, field, data[field])
@@ -501,20 +1065,13 @@ def categories_delete(id):
         return _error("cannot delete system category")
     if request.args.get("confirm", "").lower() != "true":
         return _error("confirmation required")
-    rules = (
-        Rule.query.filter_by(user_id=current_user.id, category_id=id, active=True)
-        .filter(Rule.deleted_at.is_(None))
-        .all()
-    )
-    for r in rules:
-        r.active = False
-    if rules:
+    count = _set_rules_active(False, Rule.category_id == id)
+    if count:
         current_app.logger.warning(
-            "Disabling %d rule(s) referencing deleted category %s", len(rules), id
+            "Disabling %d rule(s) referencing deleted category %s", count, id
         )
     c.deleted_at = datetime.utcnow()
     db.session.commit()
-    count = len(rules)
     return _success({"id": id, "disabled_rules": count}, message=f"{count} rule(s) disabled")
 
 
@@ -526,37 +1083,142 @@ def categories_restore(id):
         return _success(_category_to_dict(c))
     supports_partial = _supports_partial_index()
     if not supports_partial:
-        dup = (
-            Category.query.filter(Category.user_id == current_user.id)
-            .filter(db.func.lower(Category.name) == c.name.lower())
-            .filter(Category.deleted_at.is_(None))
-            .filter(Category.is_system.is_(False))
-            .first()
-        )
-        if dup:
+        if _name_taken(Category, c.name):
             return _error("duplicate category name", status=409, errors={"name": ["exists"]})
     c.deleted_at = None
-    rules = (
-        Rule.query.filter_by(user_id=current_user.id, category_id=id, active=False)
-        .filter(Rule.deleted_at.is_(None))
-        .all()
-    )
-    for r in rules:
-        r.active = True
     try:
+        count = _set_rules_active(True, Rule.category_id == id)
         db.session.commit()
     except IntegrityError:
         db.session.rollback()
         return _error("duplicate category name", status=409, errors={"name": ["exists"]})
-    count = len(rules)
     return _success(
         {**_category_to_dict(c), "reenabled_rules": count},
         message=f"{count} rule(s) re-enabled",
     )
 
 
+@api_bp.post("/categories/bulk")
+@login_required
+def categories_bulk():
+    """Create or update many categories at once; items with an ``id`` are updates.
+
+    Parents must already exist; a batch cannot reference its own new items.
+    """
+    items, err = _bulk_items()
+    if err:
+        return err
+    return _bulk_upsert(
+        Category,
+        items,
+        _validate_category,
+        _category_to_dict,
+        "duplicate category name",
+        check=_check_category_parents,
+        finish=_update_category_tree,
+    )
+
+
+@api_bp.post("/categories/bulk/delete")
+@login_required
+def categories_bulk_delete():
+    """Soft-delete many categories and disable the rules that target them."""
+    if request.args.get("confirm", "").lower() != "true":
+        return _error("confirmation required")
+    ids, err = _bulk_ids()
+    if err:
+        return err
+    rows = _owned_rows(Category, ids, Category.is_system)
+    errors = _missing_errors(ids, rows)
+    errors.extend(
+        _item_error(index, "cannot delete system category")
+        for index, i in enumerate(ids)
+        if i in rows and rows[i].is_system
+    )
+    if errors:
+        return _error("no items were changed", status=422, errors=sorted(errors, key=lambda e: e["index"]))
+    deleted = _set_deleted(Category, ids, True)
+    disabled = _set_rules_active(False, Rule.category_id.in_(ids))
+    if disabled:
+        current_app.logger.warning(
+            "Disabling %d rule(s) referencing %d deleted categories", disabled, deleted
+        )
+    db.session.commit()
+    _invalidate_user_caches()
+    return _success(
+        {"ids": ids, "deleted": deleted, "disabled_rules": disabled},
+        message=f"{disabled} rule(s) disabled",
+    )
+
+
+@api_bp.post("/categories/bulk/restore")
+@login_required
+def categories_bulk_restore():
+    """Restore many soft-deleted categories and re-enable their rules."""
+    ids, err = _bulk_ids()
+    if err:
+        return err
+    rows = _owned_rows(Category, ids, Category.name)
+    errors = _missing_errors(ids, rows)
+    named = [
+        (index, i, rows[i].name)
+        for index, i in enumerate(ids)
+        if i in rows and rows[i].deleted_at is not None
+    ]
+    for index in _name_conflicts(Category, named):
+        errors.append(_item_error(index, "duplicate category name", 409, {"name": ["exists"]}))
+    if errors:
+        return _error("no items were changed", status=422, errors=sorted(errors, key=lambda e: e["index"]))
+    restored_ids = [i for _, i, _ in named]
+    try:
+        restored = _set_deleted(Category, restored_ids, False)
+        reenabled = _set_rules_active(True, Rule.category_id.in_(restored_ids))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return _error("duplicate category name", status=409, errors={"name": ["exists"]})
+    _invalidate_user_caches()
+    return _success(
+        {"ids": ids, "restored": restored, "reenabled_rules": reenabled},
+        message=f"{reenabled} rule(s) re-enabled",
+    )
+
+
+@api_bp.get("/categories/rollup")
+@login_required
+def categories_rollup():
+    """Transaction totals per category, each including all of its subcategories."""
+    try:
+        start = date.fromisoformat(request.args["from"]) if request.args.get("from") else None
+        end = date.fromisoformat(request.args["to"]) if request.args.get("to") else None
+    except ValueError:
+        return _error("dates must be YYYY-MM-DD")
+    root_id = request.args.get("root_id", type=int)
+    if root_id is not None:
+        _get_category(root_id)
+    rows = category_tree.subtree_rollup(current_user.id, start, end, root_id)
+    return _success([
+        {**_category_to_dict(c), "total": str(total), "count": count}
+        for c, total, count in rows
+    ])
+
+
 # --- Rules CRUD ---
 
+_RULE_COLUMNS = (
+    Rule.id,
+    Rule.pattern,
+    Rule.field,
+    Rule.category_id,
+    Rule.scope_account_id,
+    Rule.priority,
+    Rule.active,
+    # Not stored; selected as NULL so _rule_to_dict finds them on the row
+    db.null().label("min_amount"),
+    db.null().label("max_amount"),
+)
+
+
 def _rule_to_dict(r: Rule):
     def _safe(v):
         return None if isinstance(v, type) else v
@@ -576,59 +1238,100 @@ def _rule_to_dict(r: Rule):
 @api_bp.get("/rules")
 @login_required
 def rules_list():
-    items = (
-        Rule.query.filter_by(user_id=current_user.id)
-        .filter(Rule.deleted_at.is_(None))
-        .all()
-    )
-    return _success([_rule_to_dict(r) for r in items])
+    return _success([_rule_to_dict(r) for r in _list_rows(Rule, _RULE_COLUMNS)])
+
+
+_RULE_DEFAULTS = {
+    "pattern": None,
+    "field": "merchant",
+    "category_id": None,
+    "scope_account_id": None,
+    "min_amount": None,
+    "max_amount": None,
+    "priority": 100,
+    "active": True,
+}
+
+
+def _validate_rule(data, partial=False):
+    """Check rule fields; referenced category/account are looked up by the caller."""
+    if (not partial or "pattern" in data) and not data.get("pattern"):
+        return None, ("pattern required", 400, None)
+    fields = {
+        key: data.get(key, default)
+        for key, default in _RULE_DEFAULTS.items()
+        if not partial or key in data
+    }
+    return fields, None
+
+
+def _check_rule_references(prepared, targets):
+    errors = []
+    categories = reference_data.live_ids(current_user.id, Category)
+    accounts = reference_data.live_ids(current_user.id, Account)
+    for index, _, fields in prepared:
+        if fields.get("category_id") and fields["category_id"] not in categories:
+            errors.append(_item_error(index, "invalid category"))
+        elif fields.get("scope_account_id") and fields["scope_account_id"] not in accounts:
+            errors.append(_item_error(index, "invalid account"))
+    return errors
 
 
 @api_bp.post("/rules")
 @login_required
 def rules_create():
     data = request.get_json() or {}
-    pattern = data.get("pattern")
-    field = data.get("field", "merchant")
-    category_id = data.get("category_id")
-    scope_account_id = data.get("scope_account_id")
-    min_amount = data.get("min_amount")
-    max_amount = data.get("max_amount")
-    priority = data.get("priority", 100)
-    active = data.get("active", True)
-    if not pattern:
-        return _error("pattern required")
-    if category_id:
-        cat = (
-            Category.query.filter_by(id=category_id, user_id=current_user.id)
-            .filter(Category.deleted_at.is_(None))
-            .first()
-        )
-        if not cat:
-            return _error("invalid category")
-    if scope_account_id:
-        acc = (
-            Account.query.filter_by(id=scope_account_id, user_id=current_user.id)
-            .filter(Account.deleted_at.is_(None))
-            .first()
-        )
-        if not acc:
-            return _error("invalid account")
-    r = Rule(
-        user_id=current_user.id,
-        pattern=pattern,
-        field=field,
-        category_id=category_id,
-        scope_account_id=scope_account_id,
-        min_amount=min_amount,
-        max_amount=max_amount,
-        priority=priority,
-        active=active,
-    )
+    fields, err = _validate_rule(data)
+    if err:
+        return _error(*err)
+    ref_errors = _check_rule_references([(0, None, fields)], {})
+    if ref_errors:
+        return _error(ref_errors[0]["message"])
+    r = Rule(user_id=current_user.id, **fields)
     db.session.add(r); db.session.commit()
     return _success(_rule_to_dict(r), status=201)
 
 
+@api_bp.post("/rules/bulk")
+@login_required
+def rules_bulk():
+    """Create or update many rules at once; items with an ``id`` are updates."""
+    items, err = _bulk_items()
+    if err:
+        return err
+    return _bulk_upsert(
+        Rule, items, _validate_rule, _rule_to_dict, "duplicate rule", check=_check_rule_references
+    )
+
+
+@api_bp.post("/rules/bulk/delete")
+@login_required
+def rules_bulk_delete():
+    ids, err = _bulk_ids()
+    if err:
+        return err
+    errors = _missing_errors(ids, _owned_rows(Rule, ids))
+    if errors:
+        return _error("no items were changed", status=422, errors=errors)
+    deleted = _set_deleted(Rule, ids, True)
+    db.session.commit()
+    return _success({"ids": ids, "deleted": deleted})
+
+
+@api_bp.post("/rules/bulk/restore")
+@login_required
+def rules_bulk_restore():
+    ids, err = _bulk_ids()
+    if err:
+        return err
+    errors = _missing_errors(ids, _owned_rows(Rule, ids))
+    if errors:
+        return _error("no items were changed", status=422, errors=errors)
+    restored = _set_deleted(Rule, ids, False)
+    db.session.commit()
+    return _success({"ids": ids, "restored": restored})
+
+
 def _get_rule(id: int, include_deleted=False):
     q = Rule.query.filter_by(id=id, user_id=current_user.id)
     if not include_deleted:
@@ -682,3 +1385,352 @@ def rules_restore(id):
     r.deleted_at = None
     db.session.commit()
     return _success(_rule_to_dict(r))
+
+
+# --- Delta sync ---
+
+SYNC_PAGE_SIZE = 500
+
+_SYNC_SERIALIZERS = {
+    "account": ("accounts", _account_to_dict),
+    "category": ("categories", _category_to_dict),
+    "rule": ("rules", _rule_to_dict),
+}
+
+
+@api_bp.get("/sync")
+@login_required
+def sync():
+    """Accounts, categories and rules changed since the ``since`` cursor.
+
+    Live rows are returned in full and soft-deleted ones as ids under
+    ``deleted``. Start with ``since=0`` and keep passing the returned
+    ``cursor`` back; ``has_more`` means another page is waiting.
+    """
+    raw = request.args.get("since", "0")
+    if not raw.isdigit():
+        return _error("since must be a cursor returned by /api/sync")
+    since = int(raw)
+    changes = changes_since(current_user.id, since, SYNC_PAGE_SIZE + 1)
+    has_more = len(changes) > SYNC_PAGE_SIZE
+    changes = changes[:SYNC_PAGE_SIZE]
+
+    data = {"cursor": changes[-1].version if changes else since, "has_more": has_more}
+    data.update({key: [] for key, _ in _SYNC_SERIALIZERS.values()})
+    data["deleted"] = {key: [] for key, _ in _SYNC_SERIALIZERS.values()}
+    for entity, model in SYNCED.items():
+        ids = [c.entity_id for c in changes if c.entity == entity]
+        if not ids:
+            continue
+        rows = {
+            r.id: r
+            for r in model.query.filter(model.user_id == current_user.id, model.id.in_(ids))
+        }
+        key, to_dict = _SYNC_SERIALIZERS[entity]
+        for row_id in ids:
+            row = rows.get(row_id)
+            if row is None or row.deleted_at is not None:
+                data["deleted"][key].append(row_id)
+            else:
+                data[key].append(to_dict(row))
+    return _success(data)
+
+
+# --- Transactions CRUD ---
+
+TRANSACTIONS_PAGE_SIZE = 50
+TRANSACTIONS_MAX_PAGE_SIZE = 200
+
+# Columns of the list projection; rows are serialised without loading entities
+_TRANSACTION_FIELDS = {
+    "id": Transaction.id,
+    "account_id": Transaction.account_id,
+    "category_id": Transaction.category_id,
+    "date": Transaction.date,
+    "amount": Transaction.amount,
+    "merchant": Transaction.merchant,
+    "note": Transaction.note,
+    "source": Transaction.source,
+}
+
+
+def _transaction_to_dict(t, fields=_TRANSACTION_FIELDS):
+    """Serialise a ``Transaction`` or a projected row carrying ``fields``."""
+    data = {}
+    for field in fields:
+        value = getattr(t, field)
+        if field == "date":
+            value = value.isoformat()
+        elif field == "amount":
+            value = float(value)
+        data[field] = value
+    return data
+
+
+def _encode_cursor(day: date, tx_id: int) -> str:
+    raw = json.dumps([day.isoformat(), tx_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str):
+    """Decode a cursor produced by :func:`_encode_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        day, tx_id = json.loads(base64.urlsafe_b64decode(padded))
+        return date.fromisoformat(day), int(tx_id)
+    except Exception as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def _transaction_filters(args):
+    """WHERE criteria from the list query string.
+
+    Returns ``(criteria, None)`` or ``(None, (message, status, errors))``.
+    """
+    criteria = [Transaction.user_id == current_user.id]
+    try:
+        for key, column in (("account_id", Transaction.account_id), ("category_id", Transaction.category_id)):
+            if args.get(key):
+                criteria.append(column == int(args[key]))
+        if args.get("from"):
+            criteria.append(Transaction.date >= date.fromisoformat(args["from"]))
+        if args.get("to"):
+            criteria.append(Transaction.date <= date.fromisoformat(args["to"]))
+        if args.get("min_amount"):
+            criteria.append(Transaction.amount >= Decimal(args["min_amount"]))
+        if args.get("max_amount"):
+            criteria.append(Transaction.amount <= Decimal(args["max_amount"]))
+    except (ValueError, InvalidOperation):
+        return None, ("invalid filter", 400, None)
+    if args.get("q"):
+        criteria.append(Transaction.merchant.ilike(f"%{args['q']}%"))
+    if args.get("source"):
+        criteria.append(Transaction.source == args["source"])
+    return criteria, None
+
+
+@api_bp.get("/transactions")
+@login_required
+def transactions_list():
+    """One page of the user's transactions, newest first.
+
+    Paginated with a keyset on ``(date, id)`` so deep pages cost the same as
+    the first; pass ``next_cursor`` back as ``cursor``. ``fields`` picks the
+    returned columns (``id`` is always included).
+    """
+    criteria, err = _transaction_filters(request.args)
+    if err:
+        return _error(*err)
+    limit = request.args.get("limit", TRANSACTIONS_PAGE_SIZE, type=int)
+    if not 1 <= limit <= TRANSACTIONS_MAX_PAGE_SIZE:
+        return _error(f"limit must be between 1 and {TRANSACTIONS_MAX_PAGE_SIZE}")
+    fields = _TRANSACTION_FIELDS
+    if request.args.get("fields"):
+        wanted = ["id"] + [f for f in request.args["fields"].split(",") if f != "id"]
+        unknown = [f for f in wanted if f not in _TRANSACTION_FIELDS]
+        if unknown:
+            return _error("unknown fields", errors={"fields": unknown})
+        fields = {f: _TRANSACTION_FIELDS[f] for f in dict.fromkeys(wanted)}
+    if request.args.get("cursor"):
+        try:
+            day, tx_id = _decode_cursor(request.args["cursor"])
+        except ValueError:
+            return _error("invalid cursor")
+        criteria.append(Transaction.date <= day)
+        criteria.append(db.or_(Transaction.date < day, Transaction.id < tx_id))
+
+    # date is always selected so the next cursor can be built from the last row
+    columns = {**fields, "date": Transaction.date}
+    rows = db.session.execute(
+        db.select(*(column.label(name) for name, column in columns.items()))
+        .where(*criteria)
+        .order_by(Transaction.date.desc(), Transaction.id.desc())
+        .limit(limit + 1)
+    ).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1].date, rows[-1].id)
+    return _success({"items": [_transaction_to_dict(r, fields) for r in rows], "next_cursor": next_cursor})
+
+
+def _validate_transaction(data, partial=False):
+    """Check transaction fields; ``partial`` only checks the keys present (updates).
+
+    Returns ``(fields, None)`` or ``(None, (message, status, errors))``.
+    """
+    fields = {}
+    for key in ("account_id", "category_id"):
+        if key in data:
+            value = data[key]
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+                return None, (f"invalid {key}", 422, {key: ["invalid"]})
+            fields[key] = value
+    if not partial and fields.get("account_id") is None:
+        return None, ("account_id required", 400, {"account_id": ["required"]})
+    if partial and "account_id" in fields and fields["account_id"] is None:
+        return None, ("invalid account_id", 422, {"account_id": ["invalid"]})
+    if not partial or "date" in data:
+        raw = data.get("date")
+        try:
+            fields["date"] = date.fromisoformat(raw) if raw else date.today()
+        except (TypeError, ValueError):
+            return None, ("invalid date", 422, {"date": ["invalid"]})
+    if not partial or "amount" in data:
+        try:
+            amount = Decimal(str(data["amount"]))
+        except (KeyError, InvalidOperation):
+            return None, ("invalid amount", 422, {"amount": ["invalid"]})
+        # Numeric(12, 2) holds at most ten integer digits
+        if not amount.is_finite() or abs(amount) >= Decimal("1e10"):
+            return None, ("invalid amount", 422, {"amount": ["invalid"]})
+        fields["amount"] = amount.quantize(Decimal("0.01"))
+    for key, max_len in (("merchant", 160), ("note", 255)):
+        if key in data:
+            value = data[key]
+            if value is not None and (not isinstance(value, str) or len(value) > max_len):
+                return None, (f"invalid {key}", 422, {key: ["invalid"]})
+            fields[key] = value
+    return fields, None
+
+
+def _check_transaction_references(fields):
+    """The error tuple for an unknown or deleted account/category, else ``None``."""
+    for key, model, message in (
+        ("account_id", Account, "invalid account"),
+        ("category_id", Category, "invalid category"),
+    ):
+        value = fields.get(key)
+        if value is not None and value not in reference_data.live_ids(current_user.id, model):
+            return (message, 422, {key: ["invalid"]})
+    return None
+
+
+def _get_transaction(id: int):
+    return Transaction.query.filter_by(id=id, user_id=current_user.id).first_or_404()
+
+
+@api_bp.post("/transactions")
+@login_required
+def transactions_create():
+    data = request.get_json() or {}
+    fields, err = _validate_transaction(data)
+    if not err:
+        err = _check_transaction_references(fields)
+    if err:
+        return _error(*err)
+    t = Transaction(user_id=current_user.id, source="manual", **fields)
+    db.session.add(t)
+    db.session.commit()
+    return _success(_transaction_to_dict(t), status=201)
+
+
+@api_bp.get("/transactions/<int:id>")
+@login_required
+def transactions_get(id):
+    return _success(_transaction_to_dict(_get_transaction(id)))
+
+
+@api_bp.put("/transactions/<int:id>")
+@login_required
+def transactions_update(id):
+    t = _get_transaction(id)
+    data = request.get_json() or {}
+    fields, err = _validate_transaction(data, partial=True)
+    if not err:
+        err = _check_transaction_references(fields)
+    if err:
+        return _error(*err)
+    for key, value in fields.items():
+        setattr(t, key, value)
+    db.session.commit()
+    return _success(_transaction_to_dict(t))
+
+
+@api_bp.delete("/transactions/<int:id>")
+@login_required
+def transactions_delete(id):
+    """Delete a transaction; its receipts and upload jobs are kept, unlinked.
+
+    Queued jobs are marked ``failed``: their result has nowhere to go.
+    """
+    t = _get_transaction(id)
+    db.session.execute(
+        db.update(UploadJob)
+        .where(UploadJob.transaction_id == id, UploadJob.status == "queued")
+        .values(status="failed", error="transaction deleted", completed_at=datetime.utcnow())
+    )
+    for model in (Attachment, UploadJob):
+        db.session.execute(
+            db.update(model).where(model.transaction_id == id).values(transaction_id=None)
+        )
+    db.session.delete(t)
+    db.session.commit()
+    return _success({"id": id})
+
+
+MERCHANT_SUGGESTIONS = 10
+MERCHANT_MAX_SUGGESTIONS = 50
+
+
+@api_bp.get("/merchants/suggest")
+@login_required
+def merchants_suggest():
+    """Merchants from the user's history starting with ``prefix``, most used first.
+
+    Case-insensitive; an empty prefix returns the most used merchants.
+    """
+    limit = request.args.get("limit", MERCHANT_SUGGESTIONS, type=int)
+    if not 1 <= limit <= MERCHANT_MAX_SUGGESTIONS:
+        return _error(f"limit must be between 1 and {MERCHANT_MAX_SUGGESTIONS}")
+    prefix = request.args.get("prefix", "")
+    return _success({"items": merchants.suggest(current_user.id, prefix, limit)})
+
+
+# --- Charts ---
+
+# Default range per granularity when ``from`` is omitted
+_TIMESERIES_DEFAULT_SPAN = {"day": 30, "week": 7 * 12, "month": 365}
+
+
+@api_bp.get("/timeseries")
+@login_required
+def timeseries_get():
+    """Income and expense per day, week or month, for the dashboard charts.
+
+    Query: ``granularity`` (default ``day``), ``from``/``to`` (ISO dates,
+    inclusive) and ``account`` (an account id; all accounts by default).
+    Long ranges are downsampled so at most ``TIMESERIES_MAX_POINTS`` points
+    come back; ``granularity`` and ``step`` in the response say how.
+    """
+    args = request.args
+    granularity = args.get("granularity", "day")
+    if granularity not in timeseries.GRANULARITIES:
+        return _error("invalid granularity", errors={"granularity": list(timeseries.GRANULARITIES)})
+    try:
+        end = date.fromisoformat(args["to"]) if args.get("to") else date.today()
+        if args.get("from"):
+            start = date.fromisoformat(args["from"])
+        else:
+            span = timedelta(days=_TIMESERIES_DEFAULT_SPAN[granularity] - 1)
+            # Clamped: the span may reach back before year 1
+            start = end - span if end - date.min > span else date.min
+        account_id = int(args["account"]) if args.get("account") else None
+    except ValueError:
+        return _error("invalid filter")
+    if start > end:
+        return _error("from must not be after to")
+    if account_id is not None and account_id not in reference_data.live_ids(current_user.id, Account):
+        return _error("invalid account", errors={"account": ["invalid"]})
+    return _success(timeseries.time_series(
+        current_user.id,
+        granularity,
+        start,
+        end,
+        current_app.config["TIMESERIES_MAX_POINTS"],
+        account_id=account_id,
+    ))
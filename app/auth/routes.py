@@ -17,6 +17,8 @@ def login_post():
     if not user or not user.check_password(password):
         flash("Invalid credentials", "error")
         return redirect(url_for("auth.login"))
+    # check_password may have upgraded the hash to the current cost
+    db.session.commit()
     login_user(user)
     return redirect(url_for("web.dashboard"))
 
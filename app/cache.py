@@ -0,0 +1,146 @@
+"""Small caches shared by request handlers.
+
+``TTLCache`` is an in-process LRU with per-entry expiry. ``TwoTierCache`` puts
+one in front of Redis so several web processes share entries; without
+``REDIS_URL`` it is just the local tier. Values must be JSON serialisable.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import get_redis
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire ``ttl`` seconds after being set."""
+
+    def __init__(self, ttl, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TwoTierCache:
+    """A local :class:`TTLCache` backed by Redis under ``namespace``.
+
+    The local tier keeps its TTL short since other processes can only drop
+    their Redis copy; Redis failures degrade to a cache miss.
+    """
+
+    def __init__(self, namespace, local_ttl, remote_ttl, maxsize=1024):
+        self.namespace = namespace
+        self.remote_ttl = remote_ttl
+        self.local = TTLCache(local_ttl, maxsize)
+
+    def _key(self, key):
+        return f"cache:{self.namespace}:{key}"
+
+    def get(self, key):
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        redis_conn = get_redis()
+        if redis_conn is None:
+            return None
+        try:
+            raw = redis_conn.get(self._key(key))
+        except Exception:
+            logger.warning("Cache read failed for %s", self._key(key))
+            return None
+        if raw is None:
+            return None
+        value = json.loads(raw)
+        self.local.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        redis_conn = get_redis()
+        if redis_conn is None:
+            return
+        try:
+            redis_conn.set(self._key(key), json.dumps(value, default=str), ex=self.remote_ttl)
+        except Exception:
+            logger.warning("Cache write failed for %s", self._key(key))
+
+    def delete(self, key):
+        self.local.delete(key)
+        redis_conn = get_redis()
+        if redis_conn is None:
+            return
+        try:
+            redis_conn.delete(self._key(key))
+        except Exception:
+            logger.warning("Cache delete failed for %s", self._key(key))
+
+
+def app_cache(namespace, local_ttl, remote_ttl, maxsize=1024):
+    """The app's :class:`TwoTierCache` for ``namespace``, created on first use."""
+    caches = current_app.extensions.setdefault("fintrack_caches", {})
+    if namespace not in caches:
+        caches[namespace] = TwoTierCache(namespace, local_ttl, remote_ttl, maxsize)
+    return caches[namespace]
+
+
+def invalidate_on_commit(key, models, invalidate):
+    """Call ``invalidate(user_id)`` after each commit that wrote ``models`` rows of that user.
+
+    Users are collected in ``session.info[key]`` by mapper events, so writes
+    that bypass the ORM must invalidate explicitly. Invalidating only once the
+    data is visible keeps a concurrent request from re-caching the old state.
+    """
+    def mark(mapper, connection, target):
+        session = Session.object_session(target)
+        if session is not None:
+            session.info.setdefault(key, set()).add(target.user_id)
+
+    def after_commit(session):
+        for user_id in session.info.pop(key, ()):
+            invalidate(user_id)
+
+    def after_rollback(session):
+        session.info.pop(key, None)
+
+    for model in models:
+        for name in ("after_insert", "after_update", "after_delete"):
+            event.listen(model, name, mark)
+    event.listen(Session, "after_commit", after_commit)
+    event.listen(Session, "after_rollback", after_rollback)
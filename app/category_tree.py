@@ -0,0 +1,147 @@
+"""Category hierarchy backed by the ``category_closure`` table.
+
+Every category has a depth-0 row pointing at itself plus one row per
+ancestor, so cycle checks, subtree lookups and subtree rollups are each one
+indexed query instead of a walk up ``Category.parent``. Soft deletes keep the
+rows: the tree shape does not change, and a restore needs nothing rebuilt.
+"""
+from sqlalchemy import and_, delete, exists, func, insert, literal, select, text, true
+from sqlalchemy.orm import aliased
+
+from . import db
+from .models import Category, CategoryClosure, Transaction
+
+
+def add_category(category: Category):
+    """Insert closure rows for a freshly flushed ``category``."""
+    db.session.execute(
+        insert(CategoryClosure).values(ancestor_id=category.id, descendant_id=category.id, depth=0)
+    )
+    if category.parent_id is not None:
+        db.session.execute(
+            insert(CategoryClosure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                select(
+                    CategoryClosure.ancestor_id,
+                    literal(category.id),
+                    CategoryClosure.depth + 1,
+                ).where(CategoryClosure.descendant_id == category.parent_id),
+            )
+        )
+
+
+def rebuild_closure():
+    """Rebuild the closure from ``Category.parent_id`` if any category lacks its rows.
+
+    Databases created with ``db.create_all()`` instead of migration 20240508
+    start with an empty closure; this runs at startup so they get the same
+    backfill. Returns whether a rebuild was needed.
+    """
+    missing = db.session.scalar(
+        select(Category.id)
+        .where(
+            ~exists().where(
+                CategoryClosure.ancestor_id == Category.id,
+                CategoryClosure.descendant_id == Category.id,
+            )
+        )
+        .limit(1)
+    )
+    if missing is None:
+        return False
+    db.session.execute(delete(CategoryClosure))
+    # Same recursive walk as migration 20240508
+    db.session.execute(text(
+        """
+        INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM category
+            UNION ALL
+            SELECT tree.ancestor_id, category.id, tree.depth + 1
+            FROM tree JOIN category ON category.parent_id = tree.descendant_id
+        )
+        SELECT ancestor_id, descendant_id, depth FROM tree
+        """
+    ))
+    db.session.commit()
+    return True
+
+
+def is_descendant(ancestor_id: int, descendant_id: int) -> bool:
+    """Whether ``descendant_id`` is ``ancestor_id`` or somewhere below it."""
+    return db.session.execute(
+        select(literal(1)).where(
+            CategoryClosure.ancestor_id == ancestor_id,
+            CategoryClosure.descendant_id == descendant_id,
+        )
+    ).first() is not None
+
+
+def _subtree(category_id: int):
+    return select(CategoryClosure.descendant_id).where(CategoryClosure.ancestor_id == category_id)
+
+
+def descendant_ids(category_id: int):
+    """Ids of ``category_id`` and every category below it."""
+    return db.session.scalars(_subtree(category_id)).all()
+
+
+def move_category(category_id: int, new_parent_id: int | None):
+    """Re-parent the subtree rooted at ``category_id``.
+
+    Callers must reject moves under the category's own subtree first
+    (see :func:`is_descendant`).
+    """
+    subtree = _subtree(category_id)
+    # Drop links from the old ancestors into the subtree; links inside it stay
+    db.session.execute(
+        delete(CategoryClosure).where(
+            CategoryClosure.descendant_id.in_(subtree),
+            CategoryClosure.ancestor_id.not_in(subtree),
+        )
+    )
+    if new_parent_id is not None:
+        above = aliased(CategoryClosure)
+        below = aliased(CategoryClosure)
+        db.session.execute(
+            insert(CategoryClosure).from_select(
+                ["ancestor_id", "descendant_id", "depth"],
+                # Every ancestor of the new parent x every node of the subtree
+                select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+                .select_from(above)
+                .join(below, true())
+                .where(above.descendant_id == new_parent_id, below.ancestor_id == category_id),
+            )
+        )
+
+
+def subtree_rollup(user_id: int, start=None, end=None, root_id: int | None = None):
+    """Transaction totals per category including everything below it.
+
+    Returns rows of ``(category, total, count)`` for the user's live
+    categories, optionally limited to the subtree under ``root_id``.
+    """
+    conditions = [Transaction.user_id == user_id]
+    if start is not None:
+        conditions.append(Transaction.date >= start)
+    if end is not None:
+        conditions.append(Transaction.date <= end)
+    totals = (
+        select(
+            CategoryClosure.ancestor_id.label("category_id"),
+            func.sum(Transaction.amount).label("total"),
+            func.count(Transaction.id).label("count"),
+        )
+        .join(Transaction, and_(Transaction.category_id == CategoryClosure.descendant_id, *conditions))
+        .group_by(CategoryClosure.ancestor_id)
+        .subquery()
+    )
+    query = (
+        select(Category, totals.c.total, totals.c.count)
+        .join(totals, totals.c.category_id == Category.id)
+        .where(Category.user_id == user_id, Category.deleted_at.is_(None))
+        .order_by(totals.c.total)
+    )
+    if root_id is not None:
+        query = query.where(Category.id.in_(_subtree(root_id)))
+    return db.session.execute(query).all()
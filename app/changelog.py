@@ -0,0 +1,87 @@
+"""Change log behind delta sync.
+
+Every insert, update or delete of an account, category or rule appends a
+``ChangeLog`` row in the same transaction, and the row's auto-incrementing id
+is the change version. ORM flushes are logged by a session hook; set-based
+UPDATEs bypass it and must call :func:`record_changes` with their criteria
+before running.
+
+Versions are assigned at insert time, not commit time. So that one user's
+versions still become visible in order, a transaction locks the users it
+writes for (``SELECT ... FOR UPDATE`` on their rows) before its first write
+and holds them until it ends; a client can then never sync past a change
+that is still to commit. SQLite serializes writers already and has no row
+locks, so there the lock is left out.
+"""
+from itertools import chain
+
+from sqlalchemy import event, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from . import db
+from .models import Account, Category, ChangeLog, Rule, User
+
+SYNCED = {"account": Account, "category": Category, "rule": Rule}
+_ENTITY = {model: entity for entity, model in SYNCED.items()}
+
+
+def lock_users(user_ids):
+    """``SELECT ... FOR UPDATE`` of the ``user_ids`` rows, in id order to avoid deadlocks."""
+    return select(User.id).where(User.id.in_(user_ids)).order_by(User.id).with_for_update()
+
+
+def record_changes(model, *criteria):
+    """Log a change for every ``model`` row matching ``criteria``, in one statement.
+
+    Call it before the set-based write, so the user is locked before any of
+    their rows.
+    """
+    user_ids = db.session.scalars(select(model.user_id).where(*criteria).distinct()).all()
+    if user_ids:
+        db.session.execute(lock_users(sorted(user_ids)))
+    db.session.execute(
+        insert(ChangeLog).from_select(
+            ["user_id", "entity", "entity_id"],
+            select(model.user_id, literal(_ENTITY[model]), model.id).where(*criteria),
+        )
+    )
+
+
+def changes_since(user_id, since, limit):
+    """``(entity, entity_id, version)`` of rows changed after version ``since``.
+
+    Each row appears once with its latest version, oldest first, so a page cut
+    at ``limit`` can resume from the last version returned.
+    """
+    version = func.max(ChangeLog.id).label("version")
+    return db.session.execute(
+        select(ChangeLog.entity, ChangeLog.entity_id, version)
+        .where(ChangeLog.user_id == user_id, ChangeLog.id > since)
+        .group_by(ChangeLog.entity, ChangeLog.entity_id)
+        .order_by(version)
+        .limit(limit)
+    ).all()
+
+
+@event.listens_for(Session, "before_flush")
+def _lock_flushed_users(session, flush_context, instances):
+    user_ids = {
+        obj.user_id
+        for obj in chain(session.new, session.dirty, session.deleted)
+        if type(obj) in _ENTITY and obj.user_id is not None
+    }
+    if user_ids:
+        session.connection().execute(lock_users(sorted(user_ids)))
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flush(session, flush_context):
+    # new/dirty/deleted still describe the flush that just ran, and new rows have ids
+    rows = [
+        {"user_id": obj.user_id, "entity": _ENTITY[type(obj)], "entity_id": obj.id}
+        for obj in chain(session.new, session.dirty, session.deleted)
+        if type(obj) in _ENTITY
+        and (obj not in session.dirty or session.is_modified(obj, include_collections=False))
+    ]
+    if rows:
+        session.connection().execute(insert(ChangeLog.__table__), rows)
@@ -1,3 +1,5 @@
+import hashlib
+import hmac
 import os
 
 def _get_env(key, default=None):
@@ -7,11 +9,66 @@ class Config:
     SECRET_KEY = _get_env("SECRET_KEY", "dev-secret")
     SQLALCHEMY_DATABASE_URI = _get_env("DATABASE_URL", "sqlite:///fintrack.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Optional read-only replica; GET/HEAD requests read from it (see RoutingSession)
+    DATABASE_REPLICA_URL = _get_env("DATABASE_REPLICA_URL")
+    SQLALCHEMY_BINDS = {"replica": DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
 
     UPLOAD_FOLDER = _get_env("UPLOAD_FOLDER", "app/uploads")
+    THUMBNAIL_FOLDER = _get_env("THUMBNAIL_FOLDER", "app/uploads/thumbs")
     MAX_CONTENT_LENGTH = int(float(_get_env("MAX_UPLOAD_MB", "10")) * 1024 * 1024)
 
-    ALLOWED_EXTENSIONS = set((_get_env("ALLOWED_EXTENSIONS", "jpg,jpeg,png,pdf")).split(","))
+    ALLOWED_EXTENSIONS = set((_get_env("ALLOWED_EXTENSIONS", "jpg,jpeg,png,pdf,tif,tiff")).split(","))
+
+    OCR_CACHE_DIR = _get_env("OCR_CACHE_DIR", "app/ocr_cache")
+    OCR_WORKERS = int(_get_env("OCR_WORKERS", "2"))
+    OCR_TIMEOUT = float(_get_env("OCR_TIMEOUT", "60"))
+    # Pages past this limit in a PDF/TIFF are ignored
+    OCR_MAX_PAGES = int(_get_env("OCR_MAX_PAGES", "20"))
+
+    # bcrypt cost; existing hashes are upgraded on the next successful login
+    BCRYPT_ROUNDS = int(_get_env("BCRYPT_ROUNDS", "12"))
+    # Hashing threads and how many more requests may wait before a 503
+    PASSWORD_HASH_WORKERS = int(_get_env("PASSWORD_HASH_WORKERS", "4"))
+    PASSWORD_HASH_QUEUE = int(_get_env("PASSWORD_HASH_QUEUE", "16"))
+
+    # Seconds a user identity stays cached in-process / in Redis (see load_user)
+    USER_CACHE_TTL = float(_get_env("USER_CACHE_TTL", "30"))
+    USER_CACHE_REMOTE_TTL = int(_get_env("USER_CACHE_REMOTE_TTL", "300"))
+
+    # The dashboard summary is also dropped on every write, so these are upper bounds
+    DASHBOARD_CACHE_TTL = float(_get_env("DASHBOARD_CACHE_TTL", "60"))
+    DASHBOARD_CACHE_REMOTE_TTL = int(_get_env("DASHBOARD_CACHE_REMOTE_TTL", "600"))
+    # Live accounts/categories used by validations; the local tier is kept short
+    # because other processes can only drop the Redis copy
+    REFDATA_CACHE_TTL = float(_get_env("REFDATA_CACHE_TTL", "30"))
+    REFDATA_CACHE_REMOTE_TTL = int(_get_env("REFDATA_CACHE_REMOTE_TTL", "600"))
+    # Longer /api/timeseries ranges are downsampled to at most this many points
+    TIMESERIES_MAX_POINTS = int(_get_env("TIMESERIES_MAX_POINTS", "120"))
+    # Merchant typeahead indexes kept in memory per process (see app.merchants);
+    # the TTL bounds how long writes made by other processes go unseen
+    MERCHANT_INDEX_USERS = int(_get_env("MERCHANT_INDEX_USERS", "1000"))
+    MERCHANT_INDEX_TTL = float(_get_env("MERCHANT_INDEX_TTL", "300"))
+
+    # Without REDIS_URL uploads are OCR'd inline instead of by services/worker
+    REDIS_URL = _get_env("REDIS_URL")
+    OCR_QUEUE = _get_env("OCR_QUEUE", "ocr")
+    # Signs the worker's result callbacks. The worker reads it from its own
+    # environment, so it is never put in a job; without HMAC_SECRET both sides
+    # derive it from SECRET_KEY rather than sharing the session-signing key
+    OCR_WEBHOOK_SECRET = _get_env("HMAC_SECRET") or hmac.new(
+        SECRET_KEY.encode(), b"ocr-webhook", hashlib.sha256
+    ).hexdigest()
+    # Base URL the worker uses to reach this app (defaults to the request host)
+    OCR_CALLBACK_BASE_URL = _get_env("OCR_CALLBACK_BASE_URL")
+
+    # Rendered account statements (see app.statements); the folder is shared with
+    # services/worker, which renders them. Without REDIS_URL they are rendered on
+    # STATEMENT_WORKERS threads in the web process instead.
+    STATEMENT_FOLDER = _get_env("STATEMENT_FOLDER", "app/uploads/statements")
+    STATEMENT_QUEUE = _get_env("STATEMENT_QUEUE", "statements")
+    STATEMENT_WORKERS = int(_get_env("STATEMENT_WORKERS", "1"))
+    # Seconds before a statement job that never finished may be queued again
+    STATEMENT_JOB_TIMEOUT = int(_get_env("STATEMENT_JOB_TIMEOUT", "300"))
 
     ALLOWED_ACCOUNT_TYPES = set(
         (_get_env(
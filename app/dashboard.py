@@ -0,0 +1,192 @@
+"""Dashboard summary computed in one aggregated query and cached per user.
+
+Every part of the dashboard (account balances, month-to-date income and
+expense, top expense categories, recent transactions) is one branch of a
+single ``UNION ALL`` statement. The summary is cached in the app's two-tier
+cache and dropped after any commit that touched the user's accounts,
+categories, transactions or attachments. Set-based writes that bypass the ORM
+must call :func:`invalidate_dashboard` themselves. services/api deletes the
+Redis copy after its own writes, but each process's local copy can still
+lag those by up to ``DASHBOARD_CACHE_TTL`` seconds.
+"""
+from datetime import date
+from decimal import Decimal
+
+from flask import current_app, has_app_context
+from sqlalchemy import Date, Integer, Numeric, String, case, cast, func, literal, null, select, union_all
+
+from . import db
+from .cache import app_cache, invalidate_on_commit
+from .models import Account, Attachment, Category, Transaction
+
+TOP_CATEGORIES = 5
+RECENT_TRANSACTIONS = 10
+
+_MONEY = Numeric(12, 2)
+_CENT = Decimal("0.01")
+
+
+def _cache():
+    return app_cache(
+        "dashboard",
+        current_app.config["DASHBOARD_CACHE_TTL"],
+        current_app.config["DASHBOARD_CACHE_REMOTE_TTL"],
+    )
+
+
+def _summary_query(user_id, month_start, today):
+    """``UNION ALL`` of every dashboard section.
+
+    Columns are (kind, ref_id, label, amount, amount2, day, extra, extra2);
+    ``kind`` says which section a row belongs to.
+    """
+    balances = (
+        select(
+            literal("balance").label("kind"),
+            Account.id.label("ref_id"),
+            Account.name.label("label"),
+            cast(Account.opening_balance + func.coalesce(func.sum(Transaction.amount), 0), _MONEY).label("amount"),
+            cast(null(), _MONEY).label("amount2"),
+            cast(null(), Date).label("day"),
+            Account.currency.label("extra"),
+            cast(null(), String).label("extra2"),
+        )
+        .select_from(Account)
+        .outerjoin(Transaction, Transaction.account_id == Account.id)
+        .where(Account.user_id == user_id, Account.deleted_at.is_(None))
+        .group_by(Account.id, Account.name, Account.opening_balance, Account.currency)
+    )
+    month = select(
+        literal("month").label("kind"),
+        cast(null(), Integer).label("ref_id"),
+        cast(null(), String).label("label"),
+        cast(func.coalesce(func.sum(case((Transaction.amount > 0, Transaction.amount))), 0), _MONEY).label("amount"),
+        cast(func.coalesce(func.sum(case((Transaction.amount < 0, -Transaction.amount))), 0), _MONEY).label("amount2"),
+        cast(null(), Date).label("day"),
+        cast(null(), String).label("extra"),
+        cast(null(), String).label("extra2"),
+    ).where(Transaction.user_id == user_id, Transaction.date.between(month_start, today))
+    spent = func.sum(-Transaction.amount)
+    top = (
+        select(
+            literal("category").label("kind"),
+            Category.id.label("ref_id"),
+            Category.name.label("label"),
+            cast(spent, _MONEY).label("amount"),
+            cast(null(), _MONEY).label("amount2"),
+            cast(null(), Date).label("day"),
+            Category.color.label("extra"),
+            cast(null(), String).label("extra2"),
+        )
+        .join(Transaction, Transaction.category_id == Category.id)
+        .where(
+            Transaction.user_id == user_id,
+            Transaction.date.between(month_start, today),
+            Transaction.amount < 0,
+        )
+        .group_by(Category.id, Category.name, Category.color)
+        .order_by(spent.desc())
+        .limit(TOP_CATEGORIES)
+        .subquery()
+    )
+
+    def first_attachment(column):
+        return (
+            select(column)
+            .where(Attachment.transaction_id == Transaction.id)
+            .order_by(Attachment.id)
+            .limit(1)
+            .correlate(Transaction)
+            .scalar_subquery()
+        )
+
+    recent = (
+        select(
+            literal("recent").label("kind"),
+            Transaction.id.label("ref_id"),
+            Transaction.merchant.label("label"),
+            cast(Transaction.amount, _MONEY).label("amount"),
+            cast(null(), _MONEY).label("amount2"),
+            Transaction.date.label("day"),
+            cast(first_attachment(Attachment.id), String).label("extra"),
+            first_attachment(Attachment.mime).label("extra2"),
+        )
+        .where(Transaction.user_id == user_id)
+        .order_by(Transaction.date.desc(), Transaction.id.desc())
+        .limit(RECENT_TRANSACTIONS)
+        .subquery()
+    )
+    # SQLite only accepts LIMIT inside a compound select through a subquery
+    return union_all(balances, month, select(top), select(recent))
+
+
+def _money(value):
+    return str(Decimal(value or 0).quantize(_CENT))
+
+
+def _build_summary(user_id, today):
+    month_start = today.replace(day=1)
+    summary = {
+        "accounts": [],
+        "totals": {},
+        "month": {
+            "start": month_start.isoformat(),
+            "end": today.isoformat(),
+            "income": _money(0),
+            "expense": _money(0),
+        },
+        "top_categories": [],
+        "recent": [],
+    }
+    recent = []
+    # Always from the primary: a lagging replica would be cached as current
+    for row in db.session.execute(_summary_query(user_id, month_start, today), bind_arguments={"bind": db.engine}):
+        if row.kind == "balance":
+            summary["accounts"].append(
+                {"id": row.ref_id, "name": row.label, "currency": row.extra, "balance": _money(row.amount)}
+            )
+            totals = summary["totals"]
+            totals[row.extra] = _money(Decimal(totals.get(row.extra, 0)) + Decimal(row.amount or 0))
+        elif row.kind == "month":
+            summary["month"]["income"] = _money(row.amount)
+            summary["month"]["expense"] = _money(row.amount2)
+        elif row.kind == "category":
+            summary["top_categories"].append(
+                {"id": row.ref_id, "name": row.label, "color": row.extra, "spent": _money(row.amount)}
+            )
+        else:
+            recent.append(row)
+    summary["accounts"].sort(key=lambda a: (a["name"].lower(), a["id"]))
+    summary["top_categories"].sort(key=lambda c: Decimal(c["spent"]), reverse=True)
+    recent.sort(key=lambda r: (r.day, r.ref_id), reverse=True)
+    summary["recent"] = [
+        {
+            "id": r.ref_id,
+            "merchant": r.label,
+            "amount": _money(r.amount),
+            "date": r.day.isoformat(),
+            "attachment_id": int(r.extra) if r.extra else None,
+            "attachment_mime": r.extra2,
+        }
+        for r in recent
+    ]
+    return summary
+
+
+def dashboard_summary(user_id, today=None):
+    """JSON-ready dashboard data for ``user_id``, cached until the user's data changes."""
+    today = today or date.today()
+    summary = _cache().get(str(user_id))
+    # Month-to-date figures end today; future-dated transactions count from their day on
+    if summary is None or summary["month"].get("end") != today.isoformat():
+        summary = _build_summary(user_id, today)
+        _cache().set(str(user_id), summary)
+    return summary
+
+
+def invalidate_dashboard(user_id):
+    if has_app_context():
+        _cache().delete(str(user_id))
+
+
+invalidate_on_commit("dashboard_dirty_users", (Account, Category, Transaction, Attachment), invalidate_dashboard)
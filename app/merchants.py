@@ -0,0 +1,167 @@
+"""Per-user merchant index for typeahead.
+
+Each user's distinct merchants are kept in a list sorted by their casefolded
+name, so the names starting with a prefix are one ``bisect`` away and no
+``LIKE 'x%'`` query is needed. Suggestions are ranked by how many of the
+user's transactions use the merchant; spellings that differ only in case
+count together and show the most common one.
+
+Indexes are built from one ``GROUP BY`` on first use and kept in an
+in-process LRU (``MERCHANT_INDEX_USERS`` users). Commits that insert, update
+or delete transactions through the ORM adjust the loaded indexes in place.
+Writes from other processes or set-based statements are only picked up when
+an index expires after ``MERCHANT_INDEX_TTL`` seconds. That includes
+transactions created through services/api (``POST /transactions``): the
+indexes live in each web process, out of its reach, so a merchant first
+used there can take that long to be suggested.
+"""
+import heapq
+import threading
+from bisect import bisect_left
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from . import db
+from .cache import TTLCache
+from .models import Transaction
+
+_DELTAS_KEY = "merchant_deltas"
+
+
+def _key(name):
+    return name.strip().casefold()
+
+
+class MerchantIndex:
+    """One user's merchants and their transaction counts, sorted for prefix search."""
+
+    def __init__(self, counts=()):
+        self._keys = []  # sorted casefolded names
+        self._spellings = {}  # key -> {spelling: count}
+        self._totals = {}  # key -> count
+        self._lock = threading.Lock()
+        for name, count in counts:
+            self._add(name, count)
+
+    def _add(self, name, count):
+        name = (name or "").strip()
+        if not name:
+            return
+        key = _key(name)
+        if key not in self._totals:
+            i = bisect_left(self._keys, key)
+            self._keys.insert(i, key)
+            self._totals[key] = 0
+            self._spellings[key] = {}
+        spellings = self._spellings[key]
+        spellings[name] = spellings.get(name, 0) + count
+        if spellings[name] <= 0:
+            del spellings[name]
+        self._totals[key] += count
+        if self._totals[key] <= 0:
+            del self._keys[bisect_left(self._keys, key)]
+            del self._totals[key], self._spellings[key]
+
+    def apply(self, deltas):
+        """Add ``(name, count)`` pairs; negative counts remove uses."""
+        with self._lock:
+            for name, count in deltas:
+                self._add(name, count)
+
+    def suggest(self, prefix, limit=10):
+        """Up to ``limit`` ``{"merchant", "count"}`` starting with ``prefix``, most used first."""
+        # Trailing spaces are kept: "oxxo " should not match "oxxofuel"
+        prefix = prefix.lstrip().casefold()
+        with self._lock:
+            start = bisect_left(self._keys, prefix)
+            # Every key sharing the prefix sorts before prefix + the highest code point
+            end = bisect_left(self._keys, prefix + "\U0010ffff", start)
+            top = heapq.nsmallest(
+                limit, self._keys[start:end], key=lambda k: (-self._totals[k], k)
+            )
+            return [
+                {"merchant": max(self._spellings[k].items(), key=lambda s: (s[1], s[0]))[0],
+                 "count": self._totals[k]}
+                for k in top
+            ]
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def _indexes():
+    ext = current_app.extensions
+    if "merchant_indexes" not in ext:
+        ext["merchant_indexes"] = TTLCache(
+            current_app.config["MERCHANT_INDEX_TTL"], current_app.config["MERCHANT_INDEX_USERS"]
+        )
+    return ext["merchant_indexes"]
+
+
+def merchant_index(user_id):
+    """The user's :class:`MerchantIndex`, built from the database on first use."""
+    indexes = _indexes()
+    index = indexes.get(user_id)
+    if index is None:
+        rows = db.session.execute(
+            select(Transaction.merchant, func.count())
+            .where(Transaction.user_id == user_id, Transaction.merchant.isnot(None))
+            .group_by(Transaction.merchant),
+            # Always from the primary: later commits are applied as deltas on
+            # top, so rows a lagging replica missed would never show up
+            bind_arguments={"bind": db.engine},
+        )
+        index = MerchantIndex(rows)
+        indexes.set(user_id, index)
+    return index
+
+
+def suggest(user_id, prefix, limit=10):
+    return merchant_index(user_id).suggest(prefix, limit)
+
+
+def _record(target, *deltas):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault(_DELTAS_KEY, []).extend((target.user_id, name, n) for name, n in deltas)
+
+
+@event.listens_for(Transaction, "after_insert")
+def _merchant_added(mapper, connection, target):
+    _record(target, (target.merchant, 1))
+
+
+@event.listens_for(Transaction, "after_update")
+def _merchant_changed(mapper, connection, target):
+    history = inspect(target).attrs.merchant.history
+    if history.has_changes():
+        _record(target, *((old, -1) for old in history.deleted), (target.merchant, 1))
+
+
+@event.listens_for(Transaction, "after_delete")
+def _merchant_removed(mapper, connection, target):
+    history = inspect(target).attrs.merchant.history
+    _record(target, ((history.deleted or [target.merchant])[0], -1))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_merchant_deltas(session):
+    deltas = session.info.pop(_DELTAS_KEY, None)
+    if not deltas or not has_app_context():
+        return
+    indexes = _indexes()
+    by_user = {}
+    for user_id, name, count in deltas:
+        by_user.setdefault(user_id, []).append((name, count))
+    for user_id, changes in by_user.items():
+        # Unloaded users are built fresh, with these writes, on their next lookup
+        index = indexes.get(user_id)
+        if index is not None:
+            index.apply(changes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_merchant_deltas(session):
+    session.info.pop(_DELTAS_KEY, None)
@@ -1,7 +1,12 @@
 from datetime import datetime, date
+from flask import current_app, has_app_context
 from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import make_transient_to_detached
 from . import db, login_manager
-from passlib.hash import bcrypt
+from .cache import app_cache
+from .passwords import hash_password, verify_password
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -10,14 +15,58 @@ class User(db.Model, UserMixin):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def set_password(self, password: str):
-        self.password_hash = bcrypt.hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password: str) -> bool:
-        return bcrypt.verify(password, self.password_hash)
+        """Verify ``password``, upgrading the stored hash if ``BCRYPT_ROUNDS`` changed.
+
+        The caller commits the session to persist an upgraded hash.
+        """
+        ok, new_hash = verify_password(password, self.password_hash)
+        if ok and new_hash:
+            self.password_hash = new_hash
+        return ok
+
+def _user_cache():
+    return app_cache(
+        "user",
+        current_app.config["USER_CACHE_TTL"],
+        current_app.config["USER_CACHE_REMOTE_TTL"],
+    )
+
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    """Load the session user, from the identity cache when possible.
+
+    Cached entries hold no password hash; it is lazily loaded from the
+    database if a handler ever reads it.
+    """
+    cache = _user_cache()
+    claims = cache.get(str(user_id))
+    if claims is None:
+        user = db.session.get(User, int(user_id))
+        if user is not None:
+            cache.set(str(user_id), {
+                "id": user.id,
+                "email": user.email,
+                "created_at": user.created_at.isoformat() if user.created_at else None,
+            })
+        return user
+    user = User(
+        id=claims["id"],
+        email=claims["email"],
+        created_at=datetime.fromisoformat(claims["created_at"]) if claims["created_at"] else None,
+    )
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    if has_app_context():
+        _user_cache().delete(str(target.id))
 
 class Account(db.Model):
     __table_args__ = (
@@ -36,6 +85,16 @@ class Account(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     deleted_at = db.Column(db.DateTime)
 
+# Mirrors migration 20240503 so db.create_all() builds the same constraint
+db.Index(
+    "uq_account_user_name_active",
+    db.func.lower(Account.name),
+    Account.user_id,
+    unique=True,
+    sqlite_where=db.text("deleted_at IS NULL"),
+    postgresql_where=db.text("deleted_at IS NULL"),
+)
+
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), index=True, nullable=False)
@@ -49,13 +108,31 @@ class Category(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     deleted_at = db.Column(db.DateTime)
 
+db.Index(
+    "uq_category_user_name_active",
+    db.func.lower(Category.name),
+    Category.user_id,
+    unique=True,
+    sqlite_where=db.text("deleted_at IS NULL AND is_system = 0"),
+    postgresql_where=db.text("deleted_at IS NULL AND is_system = FALSE"),
+)
+
+class CategoryClosure(db.Model):
+    """One row per (ancestor, descendant) pair of the category tree, including
+    each category paired with itself at depth 0. Maintained by app.category_tree."""
+    ancestor_id = db.Column(db.Integer, db.ForeignKey("category.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = db.Column(
+        db.Integer, db.ForeignKey("category.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+    depth = db.Column(db.Integer, nullable=False)
+
 class Rule(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), index=True, nullable=False)
     pattern = db.Column(db.String(160), nullable=False) # text or regex (prefix re:)
     field = db.Column(db.String(16), default="merchant") # merchant|note
-    category_id = db.Column(db.Integer, db.ForeignKey("category.id"))
-    scope_account_id = db.Column(db.Integer, db.ForeignKey("account.id"))
+    category_id = db.Column(db.Integer, db.ForeignKey("category.id"), index=True)
+    scope_account_id = db.Column(db.Integer, db.ForeignKey("account.id"), index=True)
     min_amount = str  # documentary only; use Numeric in real DBs via SQLAlchemy Numeric
     max_amount = str
     priority = db.Column(db.Integer, default=100)
@@ -63,23 +140,92 @@ class Rule(db.Model):
     deleted_at = db.Column(db.DateTime)
 
 class Transaction(db.Model):
+    __table_args__ = (
+        # Per-user listings/aggregates by date, newest first with id as tie-breaker
+        db.Index("ix_transaction_user_id_date", "user_id", "date", "id"),
+        db.Index("ix_transaction_date", "date", "id"),
+        # Account statements: one month of an account in date order
+        db.Index("ix_transaction_account_id_date", "account_id", "date", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), index=True, nullable=False)
     account_id = db.Column(db.Integer, db.ForeignKey("account.id"), nullable=False)
-    category_id = db.Column(db.Integer, db.ForeignKey("category.id"))
+    category_id = db.Column(db.Integer, db.ForeignKey("category.id"), index=True)
     date = db.Column(db.Date, nullable=False, default=date.today)
     amount = db.Column(db.Numeric(12,2), nullable=False)
     merchant = db.Column(db.String(160))
     note = db.Column(db.String(255))
     source = db.Column(db.String(16), default="manual")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Part of the statement data version (see app.statements)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class Attachment(db.Model):
+    __table_args__ = (
+        # Upload dedup looks up a user's earlier copy of the same bytes
+        db.Index("ix_attachment_user_id_sha256", "user_id", "sha256"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), index=True, nullable=False)
-    transaction_id = db.Column(db.Integer, db.ForeignKey("transaction.id"))
+    transaction_id = db.Column(db.Integer, db.ForeignKey("transaction.id"), index=True)
     filename = db.Column(db.String(255), nullable=False)
     mime = db.Column(db.String(64))
     size = db.Column(db.Integer)
     sha256 = db.Column(db.String(64), index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Blob(db.Model):
+    """A stored file, keyed by the sha256 of its bytes (see app.storage).
+
+    ``refcount`` counts the Attachment rows with that sha256; it is kept by
+    the Attachment events below and re-derived by ``flask blobs gc``.
+    """
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.Integer)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+@event.listens_for(Attachment, "after_insert")
+def _add_blob_ref(mapper, connection, target):
+    if not target.sha256:
+        return
+    insert = postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
+    blob = Blob.__table__
+    connection.execute(
+        insert(blob)
+        .values(sha256=target.sha256, size=target.size, refcount=1, created_at=datetime.utcnow())
+        .on_conflict_do_update(index_elements=[blob.c.sha256], set_={"refcount": blob.c.refcount + 1})
+    )
+
+
+@event.listens_for(Attachment, "after_delete")
+def _drop_blob_ref(mapper, connection, target):
+    if target.sha256:
+        blob = Blob.__table__
+        connection.execute(
+            blob.update().where(blob.c.sha256 == target.sha256).values(refcount=blob.c.refcount - 1)
+        )
+
+class UploadJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, also the worker job id
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), index=True, nullable=False)
+    attachment_id = db.Column(db.Integer, db.ForeignKey("attachment.id"), nullable=False)
+    transaction_id = db.Column(db.Integer, db.ForeignKey("transaction.id"), index=True)
+    status = db.Column(db.String(16), nullable=False, default="queued")  # queued|done|failed
+    error = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+
+class ChangeLog(db.Model):
+    """One row per write to an account, category or rule; ``id`` is the change
+    version that ``GET /api/sync`` cursors count from. Written by app.changelog."""
+    __table_args__ = (db.Index("ix_change_log_user_id_id", "user_id", "id"),)
+
+    # BIGINT on real databases; SQLite only autoincrements INTEGER keys
+    id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    entity = db.Column(db.String(16), nullable=False)  # account|category|rule
+    entity_id = db.Column(db.Integer, nullable=False)
@@ -1,13 +1,248 @@
-"""OCR utilities (stub first, extend later)."""
+"""OCR for uploaded receipts.
+
+Tesseract runs in a bounded process pool so OCR never holds the web process'
+GIL, and recognised text is cached on disk keyed by the file's sha256, so the
+same bytes are never OCR'd twice. PDFs with a text layer skip OCR entirely;
+scanned pages of multi-page PDFs and TIFFs are OCR'd in parallel.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
 from decimal import Decimal
 
-def extract_fields(path: str):
-    # TODO: Implement real OCR with pytesseract + OpenCV
-    # For now we return a stub so the pipeline works end-to-end.
+from flask import current_app, has_app_context
+
+_AMOUNT_RE = re.compile(r"(?<![\d.,])(\d{1,3}(?:[,.]\d{3})+|\d+)[.,](\d{2})(?![\d.,]*\d)")
+_TOTAL_RE = re.compile(r"\b(total|importe|a pagar|monto)\b", re.I)
+_YMD_RE = re.compile(r"\b(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})\b")
+_DMY_RE = re.compile(r"\b(\d{1,2})[-/.](\d{1,2})[-/.](\d{2,4})\b")
+_LETTERS_RE = re.compile(r"[^\W\d_]{3,}")
+
+
+def _amounts(line):
+    found = []
+    for whole, cents in _AMOUNT_RE.findall(line):
+        whole = re.sub(r"[,.]", "", whole)
+        found.append(Decimal(f"{whole}.{cents}"))
+    return found
+
+
+def _parse_date(text):
+    for m in _YMD_RE.finditer(text):
+        y, mo, d = (int(g) for g in m.groups())
+        try:
+            return date(y, mo, d)
+        except ValueError:
+            continue
+    # Receipts here print day first (dd/mm/yyyy)
+    for m in _DMY_RE.finditer(text):
+        d, mo, y = (int(g) for g in m.groups())
+        if y < 100:
+            y += 2000
+        try:
+            return date(y, mo, d)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_fields(text: str):
+    """Pull merchant, amount and date out of raw receipt text.
+
+    The amount is the largest figure on the last "total" line, falling back to
+    the largest figure anywhere; the merchant is the first line with words.
+    """
+    lines = [ln.strip() for ln in (text or "").splitlines() if ln.strip()]
+    merchant = next(
+        (ln for ln in lines if _LETTERS_RE.search(ln) and not _TOTAL_RE.search(ln)), ""
+    )
+    amount = None
+    for ln in reversed(lines):
+        if _TOTAL_RE.search(ln) and _amounts(ln):
+            amount = max(_amounts(ln))
+            break
+    if amount is None:
+        amount = max((a for ln in lines for a in _amounts(ln)), default=Decimal("0.00"))
     return {
-        "merchant": "STUB MERCHANT",
-        "amount": Decimal("0.00"),
-        "date": date.today(),
-        "raw": "(ocr not yet implemented)"
+        "merchant": merchant[:160],
+        "amount": amount,
+        "date": _parse_date(text or "") or date.today(),
+        "raw": text or "",
     }
+
+
+_DEFAULTS = {"OCR_CACHE_DIR": None, "OCR_WORKERS": 2, "OCR_TIMEOUT": 60, "OCR_MAX_PAGES": 20}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _setting(key):
+    if has_app_context():
+        return current_app.config.get(key, _DEFAULTS[key])
+    # services/worker has no app; it is configured by the same env vars
+    return os.getenv(key, _DEFAULTS[key])
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=int(_setting("OCR_WORKERS")))
+        return _pool
+
+
+def _preprocess(image):
+    import cv2
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    # Tesseract wants ~30px glyphs; phone photos of small receipts are often less
+    if gray.shape[1] < 1000:
+        gray = cv2.resize(gray, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+    gray = cv2.medianBlur(gray, 3)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def ocr_image(path: str) -> str:
+    """Run Tesseract on one image file. Executed inside the OCR process pool."""
+    import cv2
+    import pytesseract
+
+    image = cv2.imread(path)
+    if image is None:
+        raise ValueError(f"unreadable image: {path}")
+    return pytesseract.image_to_string(_preprocess(image), config="--psm 6")
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_path(cache_dir, sha):
+    return os.path.join(cache_dir, sha[:2], f"{sha}.txt")
+
+
+def _cache_get(sha):
+    cache_dir = _setting("OCR_CACHE_DIR")
+    if not cache_dir:
+        return None
+    try:
+        with open(_cache_path(cache_dir, sha), encoding="utf-8") as fh:
+            return fh.read()
+    except FileNotFoundError:
+        return None
+
+
+def _cache_put(sha, text):
+    cache_dir = _setting("OCR_CACHE_DIR")
+    if not cache_dir:
+        return
+    path = _cache_path(cache_dir, sha)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        fh.write(text)
+    os.replace(tmp, path)
+
+
+# Pages whose text layer has fewer characters than this are treated as scans
+_MIN_TEXT_LAYER_CHARS = 16
+
+
+def _magic(path):
+    with open(path, "rb") as fh:
+        return fh.read(5)
+
+
+def _split_pages(path, workdir, max_pages):
+    """Split a document into at most ``max_pages`` pages.
+
+    Each page is either its text (PDF text layer) or a list of image files
+    that still need OCR: the embedded scans of a PDF page, one frame of a
+    multi-page TIFF, or the upload itself for single images.
+    """
+    magic = _magic(path)
+    if magic == b"%PDF-":
+        from pypdf import PdfReader
+
+        pages = []
+        for n, page in enumerate(PdfReader(path).pages[:max_pages]):
+            text = page.extract_text() or ""
+            if sum(c.isalnum() for c in text) >= _MIN_TEXT_LAYER_CHARS:
+                pages.append(text)
+                continue
+            images = []
+            for i, embedded in enumerate(page.images):
+                image_path = os.path.join(workdir, f"{n}-{i}.png")
+                embedded.image.convert("RGB").save(image_path)
+                images.append(image_path)
+            pages.append(images or text)
+        return pages
+    if magic[:4] in (b"II*\x00", b"MM\x00*"):
+        from PIL import Image, ImageSequence
+
+        pages = []
+        with Image.open(path) as tiff:
+            for n, frame in enumerate(ImageSequence.Iterator(tiff)):
+                if n >= max_pages:
+                    break
+                image_path = os.path.join(workdir, f"{n}.png")
+                frame.convert("RGB").save(image_path)
+                pages.append([image_path])
+        return pages
+    return [[path]]
+
+
+def document_text(path: str) -> str:
+    """Text of every page of ``path``, OCR'ing scanned pages in parallel.
+
+    All pages are submitted to the pool up front and joined in page order;
+    ``OCR_TIMEOUT`` bounds the whole document, not each page.
+    """
+    deadline = time.monotonic() + float(_setting("OCR_TIMEOUT"))
+    with tempfile.TemporaryDirectory() as workdir:
+        pages = _split_pages(path, workdir, int(_setting("OCR_MAX_PAGES")))
+        pending = [
+            page if isinstance(page, str) else [_get_pool().submit(ocr_image, p) for p in page]
+            for page in pages
+        ]
+        try:
+            texts = []
+            for page in pending:
+                if isinstance(page, str):
+                    texts.append(page)
+                    continue
+                texts.append(
+                    "\n".join(f.result(timeout=max(0, deadline - time.monotonic())) for f in page)
+                )
+        finally:
+            for page in pending:
+                if not isinstance(page, str):
+                    for future in page:
+                        future.cancel()
+    return "\n".join(texts)
+
+
+def recognize_text(path: str, sha256: str | None = None) -> str:
+    """Text of ``path``, served from the on-disk cache when possible."""
+    sha = sha256 or file_sha256(path)
+    text = _cache_get(sha)
+    if text is None:
+        text = document_text(path)
+        _cache_put(sha, text)
+    return text
+
+
+def extract_fields(path: str, sha256: str | None = None):
+    """OCR ``path`` and return the parsed merchant, amount, date and raw text."""
+    return parse_fields(recognize_text(path, sha256=sha256))
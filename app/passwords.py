@@ -0,0 +1,74 @@
+"""Password hashing off the request threads.
+
+bcrypt is deliberately slow, so hashes run on a small thread pool (the bcrypt
+extension releases the GIL) with a bounded backlog. When the backlog is full
+the request fails fast with 503 instead of tying up every web worker.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from passlib.context import CryptContext
+from werkzeug.exceptions import ServiceUnavailable
+
+
+class PasswordHasherBusy(ServiceUnavailable):
+    description = "Too many sign-ins are being processed, please retry shortly."
+
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+_contexts = {}
+
+
+def _context(rounds):
+    # min == max == default so hashes with any other cost report needs_update
+    if rounds not in _contexts:
+        _contexts[rounds] = CryptContext(
+            schemes=["bcrypt"],
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds,
+            bcrypt__max_rounds=rounds,
+        )
+    return _contexts[rounds]
+
+
+def _run(fn, *args):
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = current_app.config["PASSWORD_HASH_WORKERS"]
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+            _slots = threading.BoundedSemaphore(workers + current_app.config["PASSWORD_HASH_QUEUE"])
+    if not _slots.acquire(blocking=False):
+        raise PasswordHasherBusy(retry_after=1)
+    try:
+        future = _executor.submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future.result()
+
+
+def hash_password(password: str) -> str:
+    """Hash ``password`` with the configured ``BCRYPT_ROUNDS``.
+
+    Raises:
+        PasswordHasherBusy: If the hashing backlog is full.
+    """
+    return _run(_context(current_app.config["BCRYPT_ROUNDS"]).hash, password)
+
+
+def verify_password(password: str, password_hash: str):
+    """Return ``(ok, new_hash)``.
+
+    ``new_hash`` is set when the password matched but ``password_hash`` was
+    made with a different cost, so the caller can store the upgraded hash.
+
+    Raises:
+        PasswordHasherBusy: If the hashing backlog is full.
+    """
+    ctx = _context(current_app.config["BCRYPT_ROUNDS"])
+    return _run(ctx.verify_and_update, password, password_hash)
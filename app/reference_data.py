@@ -0,0 +1,85 @@
+"""Per-user cache of live accounts and categories.
+
+Reference checks (does this account/category exist, is this name taken) and
+dropdowns read a user's accounts and categories on almost every write. They
+are cached together in the app's two-tier cache and dropped after any commit
+that touched them; set-based writes must call
+:func:`invalidate_reference_data` themselves. services/api never writes
+accounts or categories; a writer outside this app that does must delete the
+user's ``cache:refdata:<user_id>`` key, or its change is seen only once the
+entry expires (``REFDATA_CACHE_REMOTE_TTL`` seconds in Redis, plus up to
+``REFDATA_CACHE_TTL`` in each process). The database constraints stay
+the final word: a stale entry can at worst let a duplicate name through to
+the unique index, which the handlers already turn into a 409.
+"""
+from flask import current_app, has_app_context
+from sqlalchemy import select
+
+from . import db
+from .cache import app_cache, invalidate_on_commit
+from .models import Account, Category
+
+_COLUMNS = {
+    "accounts": (Account, (Account.id, Account.name, Account.type, Account.currency, Account.active)),
+    "categories": (
+        Category,
+        (Category.id, Category.name, Category.kind, Category.color, Category.parent_id, Category.is_system),
+    ),
+}
+_KEYS = {Account: "accounts", Category: "categories"}
+
+
+def _cache():
+    return app_cache(
+        "refdata",
+        current_app.config["REFDATA_CACHE_TTL"],
+        current_app.config["REFDATA_CACHE_REMOTE_TTL"],
+    )
+
+
+def _load(user_id):
+    data = {}
+    for key, (model, columns) in _COLUMNS.items():
+        # Always from the primary: a lagging replica would be cached as current
+        rows = db.session.execute(
+            select(*columns)
+            .where(model.user_id == user_id, model.deleted_at.is_(None))
+            .order_by(model.id),
+            bind_arguments={"bind": db.engine},
+        )
+        data[key] = [dict(row._mapping) for row in rows]
+    return data
+
+
+def reference_data(user_id):
+    """``{"accounts": [...], "categories": [...]}`` of the user's live rows, as dicts."""
+    data = _cache().get(str(user_id))
+    if data is None:
+        data = _load(user_id)
+        _cache().set(str(user_id), data)
+    return data
+
+
+def live_ids(user_id, model):
+    """Ids of the user's live ``model`` (``Account`` or ``Category``) rows."""
+    return {row["id"] for row in reference_data(user_id)[_KEYS[model]]}
+
+
+def names(user_id, model):
+    """``{lower(name): id}`` of the names the unique index reserves.
+
+    System categories are left out, as the index leaves them out.
+    """
+    return {
+        row["name"].lower(): row["id"]
+        for row in reference_data(user_id)[_KEYS[model]]
+        if not row.get("is_system")
+    }
+
+
+def invalidate_reference_data(user_id):
+    if has_app_context():
+        _cache().delete(str(user_id))
+
+
+invalidate_on_commit("refdata_dirty_users", (Account, Category), invalidate_reference_data)
@@ -0,0 +1,230 @@
+"""Monthly account statements as PDF.
+
+Statements are rendered by services/worker (or, without ``REDIS_URL``, on a
+small thread pool in the web process) so a long month never ties up a
+request thread. Rows are streamed from the database in date order and drawn
+page by page, so memory stays flat however many transactions the month has.
+
+Each rendered file is cached at ``STATEMENT_FOLDER/<account>/<YYYY-MM>-<version>.pdf``.
+The version is a digest of everything the statement shows (account details,
+opening balance, and the count, total, newest id and last edit of the month's
+transactions), computed with one indexed aggregate; any change to those rows
+yields a new file name, and rendering it removes the month's older files.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import current_app
+from sqlalchemy import and_, case, func, select
+
+from . import db, get_redis
+from .models import Account, Transaction
+
+log = logging.getLogger(__name__)
+
+# Bump when the layout changes so cached files are rendered again
+RENDER_VERSION = 1
+_STREAM_BATCH = 500
+
+_lock = threading.Lock()
+_executor = None
+_pending = set()
+
+
+def month_bounds(month: date):
+    """``(first day, first day of the next month)`` of ``month``."""
+    start = month.replace(day=1)
+    end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start, end
+
+
+def data_version(conn, account_id: int, month: date) -> str:
+    """Digest of the data a statement of ``account_id`` for ``month`` shows.
+
+    ``conn`` is a session or connection.
+    """
+    start, end = month_bounds(month)
+    in_month = Transaction.date >= start
+    row = conn.execute(
+        select(
+            Account.name,
+            Account.currency,
+            Account.opening_balance,
+            func.coalesce(func.sum(case((Transaction.date < start, Transaction.amount))), 0),
+            func.count(case((in_month, Transaction.id))),
+            func.coalesce(func.sum(case((in_month, Transaction.amount))), 0),
+            func.max(case((in_month, Transaction.id))),
+            func.max(case((in_month, Transaction.updated_at))),
+        )
+        .select_from(Account)
+        .outerjoin(Transaction, and_(Transaction.account_id == Account.id, Transaction.date < end))
+        .where(Account.id == account_id)
+        .group_by(Account.id, Account.name, Account.currency, Account.opening_balance)
+    ).one()
+    payload = [RENDER_VERSION, start.isoformat()] + [
+        str(Decimal(v).quantize(Decimal("0.01"))) if isinstance(v, (Decimal, float)) else str(v)
+        for v in row
+    ]
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()[:16]
+
+
+def statement_path(folder, account_id: int, month: date, version: str) -> str:
+    return os.path.join(os.path.abspath(folder), str(account_id), f"{month:%Y-%m}-{version}.pdf")
+
+
+def _money(value) -> str:
+    return f"{value:,.2f}"
+
+
+def render_statement(conn, account_id: int, month: date, path: str):
+    """Render the statement of ``account_id`` for ``month`` to ``path``.
+
+    ``conn`` is a SQLAlchemy connection; no Flask app context is needed, so
+    services/worker calls this directly. The file is written to a temp name
+    and moved into place, so readers never see a partial PDF. Older versions
+    of the same month are removed afterwards.
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    start, end = month_bounds(month)
+    account = conn.execute(
+        select(Account.name, Account.currency, Account.opening_balance).where(Account.id == account_id)
+    ).one()
+    opening = Decimal(account.opening_balance or 0) + Decimal(conn.execute(
+        select(func.coalesce(func.sum(Transaction.amount), 0))
+        .where(Transaction.account_id == account_id, Transaction.date < start)
+    ).scalar_one())
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".pdf.tmp")
+    os.close(fd)
+    try:
+        pdf = canvas.Canvas(tmp_path, pagesize=letter, pageCompression=1)
+        pdf.setTitle(f"{account.name} {month:%Y-%m}")
+        width, height = letter
+        margin, line = 50, 14
+        page = 0
+
+        def new_page():
+            nonlocal page
+            page += 1
+            y = height - margin
+            pdf.setFont("Helvetica-Bold", 13 if page == 1 else 10)
+            pdf.drawString(margin, y, f"{account.name} ({account.currency}) - statement {month:%Y-%m}")
+            pdf.setFont("Helvetica", 8)
+            pdf.drawRightString(width - margin, y, f"Page {page}")
+            y -= 2 * line
+            pdf.setFont("Helvetica-Bold", 9)
+            pdf.drawString(margin, y, "Date")
+            pdf.drawString(margin + 70, y, "Description")
+            pdf.drawRightString(width - margin - 90, y, "Amount")
+            pdf.drawRightString(width - margin, y, "Balance")
+            pdf.setFont("Helvetica", 9)
+            return y - line
+
+        y = new_page()
+        pdf.drawString(margin + 70, y, "Opening balance")
+        pdf.drawRightString(width - margin, y, _money(opening))
+        y -= line
+
+        balance, count, credits, debits = opening, 0, Decimal(0), Decimal(0)
+        rows = conn.execute(
+            select(Transaction.date, Transaction.amount, Transaction.merchant, Transaction.note)
+            .where(Transaction.account_id == account_id, Transaction.date >= start, Transaction.date < end)
+            .order_by(Transaction.date, Transaction.id),
+            execution_options={"stream_results": True, "yield_per": _STREAM_BATCH},
+        )
+        for row in rows:
+            if y < margin:
+                pdf.showPage()
+                y = new_page()
+            amount = Decimal(row.amount)
+            balance += amount
+            count += 1
+            if amount >= 0:
+                credits += amount
+            else:
+                debits += amount
+            description = " - ".join(part for part in (row.merchant, row.note) if part)
+            pdf.drawString(margin, y, row.date.isoformat())
+            pdf.drawString(margin + 70, y, description[:60])
+            pdf.drawRightString(width - margin - 90, y, _money(amount))
+            pdf.drawRightString(width - margin, y, _money(balance))
+            y -= line
+
+        if y < margin + 4 * line:
+            pdf.showPage()
+            y = new_page()
+        y -= line
+        pdf.setFont("Helvetica-Bold", 9)
+        for label, value in (
+            (f"{count} transaction(s), credits", credits),
+            ("Debits", debits),
+            ("Closing balance", balance),
+        ):
+            pdf.drawString(margin + 70, y, label)
+            pdf.drawRightString(width - margin, y, _money(value))
+            y -= line
+        pdf.setFont("Helvetica", 7)
+        pdf.drawString(margin, margin / 2, f"Generated {datetime.utcnow():%Y-%m-%d %H:%M} UTC")
+        pdf.save()
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    prefix = f"{month:%Y-%m}-"
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(".pdf") and os.path.join(directory, name) != path:
+            os.remove(os.path.join(directory, name))
+
+
+def _render_in_background(app, account_id, month, path):
+    try:
+        with app.app_context():
+            engine = db.engines.get("replica", db.engine)
+            with engine.connect() as conn:
+                render_statement(conn, account_id, month, path)
+    except Exception:
+        log.exception("Failed to render statement %s", path)
+    finally:
+        with _lock:
+            _pending.discard(path)
+
+
+def request_statement(account_id: int, month: date, path: str) -> bool:
+    """Have ``path`` rendered in the background; returns at once.
+
+    Jobs go to services/worker through ``STATEMENT_QUEUE``, or to an
+    in-process thread pool when no Redis is configured. A statement already
+    queued is not queued again. Returns False if it was already pending.
+    """
+    redis_conn = get_redis()
+    if redis_conn is not None:
+        lock_key = f"statement-job:{path}"
+        if not redis_conn.set(lock_key, 1, nx=True, ex=current_app.config["STATEMENT_JOB_TIMEOUT"]):
+            return False
+        payload = {"account_id": account_id, "month": month.isoformat(), "path": path, "lock_key": lock_key}
+        redis_conn.rpush(current_app.config["STATEMENT_QUEUE"], json.dumps(payload))
+        return True
+
+    global _executor
+    with _lock:
+        if path in _pending:
+            return False
+        _pending.add(path)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config["STATEMENT_WORKERS"], thread_name_prefix="statement"
+            )
+    _executor.submit(_render_in_background, current_app._get_current_object(), account_id, month, path)
+    return True
@@ -1 +1,107 @@
 console.log("FinTrack+ loaded");
+
+// Transactions page: fetch one page at a time as the end of the table scrolls into view
+(function () {
+  const table = document.getElementById("transactions");
+  if (!table) return;
+  const body = table.querySelector("tbody");
+  const status = document.getElementById("transactions-status");
+  const sentinel = document.getElementById("transactions-more");
+  const lookups = JSON.parse(document.getElementById("transactions-lookups").textContent);
+  const fields = "date,merchant,account_id,category_id,amount";
+  let cursor = null;
+  let loading = false;
+  let done = false;
+
+  function cell(text) {
+    const td = document.createElement("td");
+    td.textContent = text;
+    return td;
+  }
+
+  function addRow(t) {
+    const tr = document.createElement("tr");
+    tr.append(
+      cell(t.date),
+      cell(t.merchant || "-"),
+      cell(lookups.accounts[t.account_id] || ""),
+      cell(t.category_id ? lookups.categories[t.category_id] || "" : ""),
+      cell(t.amount.toFixed(2))
+    );
+    body.appendChild(tr);
+  }
+
+  async function loadMore() {
+    if (loading || done) return;
+    loading = true;
+    status.textContent = "Loading…";
+    const params = new URLSearchParams({ fields: fields });
+    if (cursor) params.set("cursor", cursor);
+    try {
+      const res = await fetch(table.dataset.url + "?" + params, { credentials: "same-origin" });
+      if (!res.ok) throw new Error(res.statusText);
+      const data = (await res.json()).data;
+      data.items.forEach(addRow);
+      cursor = data.next_cursor;
+      done = !cursor;
+      status.textContent = done && !body.children.length ? "No transactions yet." : "";
+    } catch (err) {
+      status.textContent = "Could not load transactions.";
+      done = true;
+    } finally {
+      loading = false;
+    }
+    // Keep filling while the sentinel is still on screen (tall viewports)
+    if (!done && sentinel.getBoundingClientRect().top < window.innerHeight) loadMore();
+  }
+
+  new IntersectionObserver(function (entries) {
+    if (entries.some(function (e) { return e.isIntersecting; })) loadMore();
+  }, { rootMargin: "400px" }).observe(sentinel);
+})();
+
+// Dashboard: income/expense lines from the server-side buckets of /api/timeseries
+(function () {
+  const chart = document.getElementById("timeseries-chart");
+  if (!chart) return;
+  const controls = document.getElementById("timeseries-controls");
+  const range = document.getElementById("timeseries-range");
+  const svgNS = "http://www.w3.org/2000/svg";
+  const width = 600;
+  const height = 200;
+  const pad = 8;
+
+  function line(points, key, max, cls) {
+    const step = points.length > 1 ? (width - 2 * pad) / (points.length - 1) : 0;
+    const path = document.createElementNS(svgNS, "polyline");
+    path.setAttribute("class", cls);
+    path.setAttribute("vector-effect", "non-scaling-stroke");
+    path.setAttribute("points", points.map(function (p, i) {
+      const y = height - pad - (max ? (p[key] / max) * (height - 2 * pad) : 0);
+      return (pad + i * step).toFixed(1) + "," + y.toFixed(1);
+    }).join(" "));
+    return path;
+  }
+
+  async function draw() {
+    const params = new URLSearchParams();
+    new FormData(controls).forEach(function (value, key) {
+      if (value) params.set(key, value);
+    });
+    try {
+      const res = await fetch(chart.dataset.url + "?" + params, { credentials: "same-origin" });
+      if (!res.ok) throw new Error(res.statusText);
+      const data = (await res.json()).data;
+      const max = Math.max.apply(null, data.points.map(function (p) { return Math.max(p.income, p.expense); }).concat(0));
+      chart.replaceChildren(line(data.points, "income", max, "income"), line(data.points, "expense", max, "expense"));
+      const unit = data.step > 1 ? data.step + " " + data.granularity + "s" : data.granularity;
+      range.textContent = data.from + " to " + data.to + ", per " + unit + ", max " + max.toFixed(2);
+    } catch (err) {
+      chart.replaceChildren();
+      range.textContent = "Could not load the chart.";
+    }
+  }
+
+  controls.addEventListener("change", draw);
+  draw();
+})();
@@ -0,0 +1,255 @@
+"""Content-addressed attachment storage.
+
+Uploads are stored once per distinct content at
+``UPLOAD_FOLDER/ab/cd/abcd…`` (the sha256 split into two shard levels), so
+no directory grows past a few hundred entries and identical bytes uploaded
+under different names share one file. ``Blob`` rows count the attachments
+using each file; ``flask blobs gc`` deletes the ones nothing references and
+``flask blobs migrate`` moves files from the old flat ``{sha}_{name}`` layout.
+
+A blob's mtime is refreshed whenever an upload reuses it, and the collector
+leaves anything touched within its grace period alone. An upload can still
+reuse a blob while it is being collected, so the collector first renames the
+file to a tombstone, re-checks it, and only then unlinks it; ``put`` takes a
+tombstone back, after which the unlink finds nothing and the file is kept.
+"""
+import hashlib
+import os
+import re
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import delete, exists, func, insert, select, update
+
+from . import db
+from .models import Attachment, Blob
+
+_SHA_RE = re.compile(r"^[0-9a-f]{64}$")
+_LEGACY_RE = re.compile(r"^([0-9a-f]{64})_(.+)$")
+_CHUNK_SIZE = 64 * 1024
+_TOMBSTONE = ".deleting"
+
+
+class BlobStore:
+    """Files named by their sha256 under ``root``, two shard levels deep."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def path(self, sha):
+        return os.path.join(self.root, sha[:2], sha[2:4], sha)
+
+    def put(self, tmp_path, sha):
+        """Move ``tmp_path`` (on the same filesystem) into place as ``sha``.
+
+        If the blob is already stored the temp file is dropped and the blob's
+        mtime refreshed instead. Returns the blob's path.
+        """
+        path = self.path(sha)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            try:
+                # Being collected: take the file back before it is unlinked
+                os.replace(path + _TOMBSTONE, path)
+                os.utime(path)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+                return path
+        os.remove(tmp_path)
+        return path
+
+    def bury(self, sha):
+        """Rename the blob to its tombstone. Returns False if it is not stored."""
+        path = self.path(sha)
+        try:
+            os.replace(path, path + _TOMBSTONE)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def unbury(self, sha):
+        """Put a tombstoned blob back, unless an upload already has."""
+        path = self.path(sha)
+        try:
+            os.replace(path + _TOMBSTONE, path)
+        except FileNotFoundError:
+            pass
+
+    def purge(self, sha, cutoff):
+        """Unlink the blob's tombstone if untouched since ``cutoff``.
+
+        Returns False if it was touched or taken back by ``put``.
+        """
+        tombstone = self.path(sha) + _TOMBSTONE
+        try:
+            if os.path.getmtime(tombstone) >= cutoff:
+                return False
+            os.remove(tombstone)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def blobs(self):
+        """``(sha, path)`` of every stored blob."""
+        for first in sorted(os.listdir(self.root)) if os.path.isdir(self.root) else ():
+            level1 = os.path.join(self.root, first)
+            if len(first) != 2 or not os.path.isdir(level1):
+                continue
+            for second in sorted(os.listdir(level1)):
+                level2 = os.path.join(level1, second)
+                if not os.path.isdir(level2):
+                    continue
+                for name in os.listdir(level2):
+                    if _SHA_RE.match(name):
+                        yield name, os.path.join(level2, name)
+
+
+def blob_store():
+    return BlobStore(current_app.config["UPLOAD_FOLDER"])
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def reconcile_refcounts():
+    """Re-derive ``Blob.refcount`` from the attachments, adding missing rows."""
+    refs = select(func.count()).where(Attachment.sha256 == Blob.sha256).scalar_subquery()
+    db.session.execute(
+        update(Blob).where(Blob.refcount != refs).values(refcount=refs),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.execute(
+        insert(Blob).from_select(
+            ["sha256", "size", "refcount", "created_at"],
+            select(Attachment.sha256, func.max(Attachment.size), func.count(), func.min(Attachment.created_at))
+            .where(Attachment.sha256.isnot(None), ~exists().where(Blob.sha256 == Attachment.sha256))
+            .group_by(Attachment.sha256),
+        )
+    )
+    db.session.commit()
+
+
+def collect_garbage(grace_seconds=3600):
+    """Delete blobs no attachment references. Returns the number of files removed.
+
+    Unreferenced ``Blob`` rows and stray files without a row (uploads whose
+    transaction rolled back) are both collected once older than
+    ``grace_seconds``; cached thumbnails of removed blobs go with them.
+    """
+    reconcile_refcounts()
+    store = blob_store()
+    cutoff = time.time() - grace_seconds
+    removed = []
+
+    def expired(path):
+        try:
+            return os.path.getmtime(path) < cutoff
+        except FileNotFoundError:
+            return True
+
+    for sha in db.session.scalars(select(Blob.sha256).where(Blob.refcount == 0)).all():
+        if not expired(store.path(sha)):
+            continue
+        # Tombstoned before the re-check, so an upload reusing the blob from
+        # here on takes the file back instead of pointing at a deleted one
+        buried = store.bury(sha)
+        deleted = db.session.execute(
+            delete(Blob).where(
+                Blob.sha256 == sha,
+                Blob.refcount == 0,
+                ~exists().where(Attachment.sha256 == sha),
+            )
+        ).rowcount
+        db.session.commit()
+        if deleted and (not buried or store.purge(sha, cutoff)):
+            removed.append(sha)
+        elif buried:
+            store.unbury(sha)
+
+    known = set(db.session.scalars(select(Blob.sha256)))
+    for sha, path in store.blobs():
+        if sha in known or not expired(path) or not store.bury(sha):
+            continue
+        # An upload may have reused the file and committed since ``known`` was read
+        referenced = db.session.scalar(select(exists().where(Blob.sha256 == sha)))
+        if not referenced and store.purge(sha, cutoff):
+            removed.append(sha)
+        else:
+            store.unbury(sha)
+
+    thumbs = os.path.abspath(current_app.config["THUMBNAIL_FOLDER"])
+    if removed and os.path.isdir(thumbs):
+        gone = set(removed)
+        for name in os.listdir(thumbs):
+            if name.split("_", 1)[0] in gone:
+                os.remove(os.path.join(thumbs, name))
+    return len(removed)
+
+
+def migrate_legacy_files():
+    """Move flat ``{sha}_{name}`` uploads into the store.
+
+    Attachments pointing at a moved file keep their original name in
+    ``filename``. Returns ``(files_moved, attachments_updated)``.
+    """
+    store = blob_store()
+    moved = updated = 0
+    if not os.path.isdir(store.root):
+        return moved, updated
+    for legacy_name in sorted(os.listdir(store.root)):
+        match = _LEGACY_RE.match(legacy_name)
+        legacy_path = os.path.join(store.root, legacy_name)
+        if not match or not os.path.isfile(legacy_path):
+            continue
+        # Hash rather than trust the prefix: the file becomes the blob for that sha
+        sha = _file_sha256(legacy_path)
+        # Link first and unlink last, so every attachment can be served at any
+        # point and an interrupted run can simply be repeated
+        path = store.path(sha)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.link(legacy_path, path)
+        updated += db.session.execute(
+            update(Attachment)
+            # Uploads always recorded the prefix as sha256, which is indexed
+            .where(Attachment.sha256 == match.group(1), Attachment.filename == legacy_name)
+            .values(filename=match.group(2), sha256=sha),
+            execution_options={"synchronize_session": False},
+        ).rowcount
+        db.session.commit()
+        os.remove(legacy_path)
+        moved += 1
+    reconcile_refcounts()
+    return moved, updated
+
+
+blobs_cli = AppGroup("blobs", help="Manage stored attachment files.")
+
+
+@blobs_cli.command("gc")
+@click.option("--grace", default=3600, show_default=True, help="Keep blobs touched within this many seconds.")
+@click.option("--interval", type=int, help="Keep running, collecting every this many seconds.")
+def gc_command(grace, interval):
+    """Delete stored files that no attachment references."""
+    while True:
+        click.echo(f"removed {collect_garbage(grace)} unreferenced blob(s)")
+        if not interval:
+            break
+        db.session.remove()
+        time.sleep(interval)
+
+
+@blobs_cli.command("migrate")
+def migrate_command():
+    """Move uploads from the flat {sha}_{name} layout into the sharded store."""
+    moved, updated = migrate_legacy_files()
+    click.echo(f"moved {moved} file(s), updated {updated} attachment(s)")
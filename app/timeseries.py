@@ -0,0 +1,116 @@
+"""Income/expense time series for charts, bucketed in SQL.
+
+Transactions are grouped by their date truncated to the bucket
+(``date_trunc`` on PostgreSQL, ``date()`` modifiers on SQLite), so a chart
+costs one indexed aggregate however many transactions the range holds. When
+the range has more buckets than ``TIMESERIES_MAX_POINTS`` the series is
+downsampled: first to a coarser granularity (day, then week, then month),
+then by merging ``step`` consecutive months.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import Date, case, cast, func, select, type_coerce
+
+from . import db
+from .models import Transaction
+
+GRANULARITIES = ("day", "week", "month")
+
+
+def _week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def bucket_start(granularity, day: date) -> date:
+    """``day`` truncated to its bucket (weeks start on Monday)."""
+    if granularity == "week":
+        return _week_start(day)
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _bucket_index(granularity, origin: date, day: date) -> int:
+    """Buckets between ``origin``'s bucket and ``day``'s."""
+    if granularity == "month":
+        return (day.year - origin.year) * 12 + day.month - origin.month
+    days = (bucket_start(granularity, day) - bucket_start(granularity, origin)).days
+    return days // 7 if granularity == "week" else days
+
+
+def _add_buckets(granularity, origin: date, n: int) -> date:
+    if granularity == "month":
+        months = origin.year * 12 + origin.month - 1 + n
+        return date(months // 12, months % 12 + 1, 1)
+    return origin + timedelta(days=n * (7 if granularity == "week" else 1))
+
+
+def _truncate(granularity, column):
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return cast(func.date_trunc(granularity, column), Date)
+    if dialect == "sqlite":
+        # Dates are ISO text; "weekday 1" moves forward to a Monday, hence the -6 days
+        if granularity == "week":
+            return type_coerce(func.date(column, "-6 days", "weekday 1"), Date)
+        if granularity == "month":
+            return type_coerce(func.date(column, "start of month"), Date)
+        return column
+    # Elsewhere group by day; the buckets are rolled up below
+    return column
+
+
+def plan(granularity, start: date, end: date, max_points: int):
+    """``(granularity, step)`` keeping the bucket count within ``max_points``."""
+    for g in GRANULARITIES[GRANULARITIES.index(granularity):]:
+        count = _bucket_index(g, start, end) + 1
+        if count <= max_points:
+            return g, 1
+    return "month", -(-count // max_points)
+
+
+def time_series(user_id, granularity, start: date, end: date, max_points, account_id=None):
+    """Income and expense per bucket between ``start`` and ``end`` inclusive.
+
+    Returns ``{"granularity", "step", "from", "to", "points": [...]}``; every
+    bucket is present, empty ones with zeros, and each point is dated by the
+    first day of its bucket. ``expense`` is positive.
+    """
+    granularity, step = plan(granularity, start, end, max_points)
+    bucket = _truncate(granularity, Transaction.date).label("bucket")
+    criteria = [Transaction.user_id == user_id, Transaction.date >= start, Transaction.date <= end]
+    if account_id is not None:
+        criteria.append(Transaction.account_id == account_id)
+    rows = db.session.execute(
+        select(
+            bucket,
+            func.coalesce(func.sum(case((Transaction.amount > 0, Transaction.amount))), 0),
+            func.coalesce(func.sum(case((Transaction.amount < 0, -Transaction.amount))), 0),
+        )
+        .where(*criteria)
+        .group_by(bucket)
+    )
+
+    origin = bucket_start(granularity, start)
+    count = _bucket_index(granularity, origin, end) // step + 1
+    income = [Decimal(0)] * count
+    expense = [Decimal(0)] * count
+    for day, inc, exp in rows:
+        i = _bucket_index(granularity, origin, day) // step
+        income[i] += Decimal(inc)
+        expense[i] += Decimal(exp)
+    return {
+        "granularity": granularity,
+        "step": step,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "points": [
+            {
+                "date": _add_buckets(granularity, origin, i * step).isoformat(),
+                "income": float(income[i]),
+                "expense": float(expense[i]),
+            }
+            for i in range(count)
+        ],
+    }
@@ -1,7 +1,9 @@
 from flask import Blueprint, render_template, redirect, url_for
 from flask_login import login_required, current_user
 from .. import db
-from ..models import Transaction, Account, Category
+from ..dashboard import dashboard_summary
+from ..models import Account, Category
+from ..reference_data import reference_data
 
 web_bp = Blueprint("web", __name__)
 
@@ -12,15 +14,21 @@ def home():
 @web_bp.get("/dashboard")
 @login_required
 def dashboard():
-    # Minimal dashboard data
-    txs = Transaction.query.filter_by(user_id=current_user.id).order_by(Transaction.date.desc()).limit(10).all()
-    accounts = Account.query.filter_by(user_id=current_user.id).all()
-    categories = Category.query.filter_by(user_id=current_user.id).all()
-    total = sum([float(t.amount) for t in txs]) if txs else 0.0
-    return render_template("dashboard.html", recent=txs, total=total, accounts=accounts, categories=categories)
+    return render_template("dashboard.html", summary=dashboard_summary(current_user.id))
 
 @web_bp.get("/upload")
 @login_required
 def upload_page():
-    accounts = Account.query.filter_by(user_id=current_user.id).all()
+    accounts = reference_data(current_user.id)["accounts"]
     return render_template("upload.html", accounts=accounts)
+
+@web_bp.get("/transactions")
+@login_required
+def transactions_page():
+    accounts = Account.query.filter_by(user_id=current_user.id).all()
+    categories = Category.query.filter_by(user_id=current_user.id).all()
+    return render_template(
+        "transactions/list.html",
+        account_names={a.id: a.name for a in accounts},
+        category_names={c.id: c.name for c in categories},
+    )
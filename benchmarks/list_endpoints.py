@@ -0,0 +1,97 @@
+"""Compare the entity and projection read paths of the list endpoints.
+
+For accounts, categories and rules this times loading the user's live rows
+as ORM entities (the previous ``*_list`` implementation) against selecting
+only the serialised columns as Core rows (``_list_rows``), and reports the
+peak memory allocated while building the JSON-ready list.
+
+    python benchmarks/list_endpoints.py --rows 5000 --repeat 20
+
+Runs against a throwaway SQLite database; nothing else is touched.
+"""
+import argparse
+import os
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+
+def _seed(db, models, user_id, rows):
+    Account, Category, Rule = models
+    db.session.add_all(Account(user_id=user_id, name=f"Account {i}", type="cash") for i in range(rows))
+    db.session.add_all(Category(user_id=user_id, name=f"Category {i}", kind="expense") for i in range(rows))
+    db.session.add_all(Rule(user_id=user_id, pattern=f"Shop {i}", priority=i) for i in range(rows))
+    db.session.commit()
+
+
+def _measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000, help="rows per table (default 5000)")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per path (default 20)")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="fintrack-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from flask_login import login_user
+
+    from app import create_app, db
+    from app.api import routes
+    from app.models import Account, Category, Rule, User
+
+    app = create_app()
+    with app.app_context():
+        user = User(email="bench@example.com", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        _seed(db, (Account, Category, Rule), user_id, args.rows)
+
+    cases = [
+        ("accounts", Account, routes._ACCOUNT_COLUMNS, routes._account_to_dict),
+        ("categories", Category, routes._CATEGORY_COLUMNS, routes._category_to_dict),
+        ("rules", Rule, routes._RULE_COLUMNS, routes._rule_to_dict),
+    ]
+    print(f"{args.rows} rows per table, median of {args.repeat} runs")
+    print(f"{'list':<12}{'path':<12}{'time ms':>10}{'peak KiB':>12}")
+    with app.test_request_context():
+        login_user(db.session.get(User, user_id))
+        for name, model, columns, to_dict in cases:
+            def entities():
+                # A fresh session each run, as in a request
+                db.session.remove()
+                items = model.query.filter_by(user_id=user_id).filter(model.deleted_at.is_(None)).all()
+                return [to_dict(i) for i in items]
+
+            def projection():
+                db.session.remove()
+                return [to_dict(r) for r in routes._list_rows(model, columns)]
+
+            assert entities() == projection()
+            results = {path: _measure(fn, args.repeat) for path, fn in (("entities", entities), ("projection", projection))}
+            for path, (seconds, peak) in results.items():
+                print(f"{name:<12}{path:<12}{seconds * 1000:>10.1f}{peak / 1024:>12.0f}")
+            (t_old, m_old), (t_new, m_new) = results["entities"], results["projection"]
+            print(f"{'':<12}{'ratio':<12}{t_new / t_old:>10.2f}{m_new / m_old:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""move attachment.ocr_text to a compressed side table
+
+Revision ID: 20240506
+Revises: 20240505
+Create Date: 2024-05-06 00:00:00
+"""
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20240506'
+down_revision = '20240505'
+branch_labels = None
+depends_on = None
+
+
+def _is_postgres():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def upgrade():
+    content_type = sa.Text() if _is_postgres() else sa.LargeBinary()
+    op.create_table(
+        'attachment_text',
+        sa.Column('attachment_id', sa.Integer(), sa.ForeignKey('attachment.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('content', content_type, nullable=False),
+    )
+    bind = op.get_bind()
+    columns = {c['name'] for c in sa.inspect(bind).get_columns('attachment')}
+    if 'ocr_text' not in columns:
+        return
+    if _is_postgres():
+        op.execute(
+            "INSERT INTO attachment_text (attachment_id, content) "
+            "SELECT id, ocr_text FROM attachment WHERE ocr_text IS NOT NULL"
+        )
+    else:
+        rows = bind.execute(sa.text("SELECT id, ocr_text FROM attachment WHERE ocr_text IS NOT NULL"))
+        for att_id, text in rows.fetchall():
+            bind.execute(
+                sa.text("INSERT INTO attachment_text (attachment_id, content) VALUES (:id, :content)"),
+                {'id': att_id, 'content': zlib.compress(text.encode('utf-8'))},
+            )
+    with op.batch_alter_table('attachment') as batch:
+        batch.drop_column('ocr_text')
+
+
+def downgrade():
+    op.add_column('attachment', sa.Column('ocr_text', sa.Text(), nullable=True))
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT attachment_id, content FROM attachment_text")).fetchall()
+    for att_id, content in rows:
+        text = content if _is_postgres() else zlib.decompress(content).decode('utf-8')
+        bind.execute(
+            sa.text("UPDATE attachment SET ocr_text = :text WHERE id = :id"),
+            {'id': att_id, 'text': text},
+        )
+    op.drop_table('attachment_text')
@@ -0,0 +1,36 @@
+"""add upload_job table for asynchronous OCR
+
+Revision ID: 20240507
+Revises: 20240506
+Create Date: 2024-05-07 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20240507'
+down_revision = '20240506'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'upload_job',
+        sa.Column('id', sa.String(length=32), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), nullable=False),
+        sa.Column('attachment_id', sa.Integer(), sa.ForeignKey('attachment.id'), nullable=False),
+        sa.Column('transaction_id', sa.Integer(), sa.ForeignKey('transaction.id'), nullable=True),
+        sa.Column('status', sa.String(length=16), nullable=False, server_default='queued'),
+        sa.Column('error', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_upload_job_user_id', 'upload_job', ['user_id'])
+    op.create_index('ix_upload_job_transaction_id', 'upload_job', ['transaction_id'])
+
+
+def downgrade():
+    op.drop_index('ix_upload_job_transaction_id', table_name='upload_job')
+    op.drop_index('ix_upload_job_user_id', table_name='upload_job')
+    op.drop_table('upload_job')
@@ -0,0 +1,42 @@
+"""add category_closure table for the category hierarchy
+
+Revision ID: 20240508
+Revises: 20240507
+Create Date: 2024-05-08 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20240508'
+down_revision = '20240507'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'category_closure',
+        sa.Column('ancestor_id', sa.Integer(), sa.ForeignKey('category.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('descendant_id', sa.Integer(), sa.ForeignKey('category.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('depth', sa.Integer(), nullable=False),
+    )
+    op.create_index('ix_category_closure_descendant_id', 'category_closure', ['descendant_id'])
+    # Every category with itself, then each ancestor reached through parent_id
+    op.execute(
+        """
+        INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM category
+            UNION ALL
+            SELECT tree.ancestor_id, category.id, tree.depth + 1
+            FROM tree JOIN category ON category.parent_id = tree.descendant_id
+        )
+        SELECT ancestor_id, descendant_id, depth FROM tree
+        """
+    )
+
+
+def downgrade():
+    op.drop_index('ix_category_closure_descendant_id', table_name='category_closure')
+    op.drop_table('category_closure')
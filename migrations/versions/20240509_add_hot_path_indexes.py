@@ -0,0 +1,35 @@
+"""add indexes for the hot transaction, attachment and rule queries
+
+Revision ID: 20240509
+Revises: 20240508
+Create Date: 2024-05-09 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20240509'
+down_revision = '20240508'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_transaction_user_id_date', 'transaction', ['user_id', 'date', 'id']),
+    ('ix_transaction_date', 'transaction', ['date', 'id']),
+    ('ix_transaction_account_id', 'transaction', ['account_id']),
+    ('ix_transaction_category_id', 'transaction', ['category_id']),
+    ('ix_attachment_transaction_id', 'attachment', ['transaction_id']),
+    ('ix_attachment_user_id_sha256', 'attachment', ['user_id', 'sha256']),
+    ('ix_rule_category_id', 'rule', ['category_id']),
+    ('ix_rule_scope_account_id', 'rule', ['scope_account_id']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
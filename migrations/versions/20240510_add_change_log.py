@@ -0,0 +1,36 @@
+"""add change_log table for delta sync
+
+Revision ID: 20240510
+Revises: 20240509
+Create Date: 2024-05-10 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20240510'
+down_revision = '20240509'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'change_log',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), nullable=False),
+        sa.Column('entity', sa.String(length=16), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+    )
+    op.create_index('ix_change_log_user_id_id', 'change_log', ['user_id', 'id'])
+    # Existing rows get a version so a first sync (since=0) returns them
+    for entity in ('account', 'category', 'rule'):
+        op.execute(
+            f"INSERT INTO change_log (user_id, entity, entity_id) "
+            f"SELECT user_id, '{entity}', id FROM {entity} ORDER BY id"
+        )
+
+
+def downgrade():
+    op.drop_index('ix_change_log_user_id_id', table_name='change_log')
+    op.drop_table('change_log')
@@ -0,0 +1,40 @@
+"""add blob table for content-addressed attachment storage
+
+Revision ID: 20240511
+Revises: 20240510
+Create Date: 2024-05-11 00:00:00
+
+Existing files stay in the flat {sha}_{name} layout (and keep being served)
+until `flask blobs migrate` moves them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20240511'
+down_revision = '20240510'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'blob',
+        sa.Column('sha256', sa.String(length=64), primary_key=True),
+        sa.Column('size', sa.Integer(), nullable=True),
+        sa.Column('refcount', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    op.execute(
+        """
+        INSERT INTO blob (sha256, size, refcount, created_at)
+        SELECT sha256, MAX(size), COUNT(*), MIN(created_at)
+        FROM attachment
+        WHERE sha256 IS NOT NULL
+        GROUP BY sha256
+        """
+    )
+
+
+def downgrade():
+    op.drop_table('blob')
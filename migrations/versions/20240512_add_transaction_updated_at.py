@@ -0,0 +1,30 @@
+"""add transaction.updated_at and an (account_id, date, id) index for statements
+
+Revision ID: 20240512
+Revises: 20240511
+Create Date: 2024-05-12 00:00:00
+
+The composite index replaces ix_transaction_account_id, whose lookups it
+covers as a prefix.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20240512'
+down_revision = '20240511'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('transaction', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE "transaction" SET updated_at = created_at')
+    op.create_index('ix_transaction_account_id_date', 'transaction', ['account_id', 'date', 'id'])
+    op.drop_index('ix_transaction_account_id', table_name='transaction')
+
+
+def downgrade():
+    op.create_index('ix_transaction_account_id', 'transaction', ['account_id'])
+    op.drop_index('ix_transaction_account_id_date', table_name='transaction')
+    op.drop_column('transaction', 'updated_at')
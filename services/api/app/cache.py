@@ -0,0 +1,45 @@
+"""Invalidation of the web app's Redis-cached per-user data.
+
+The Flask app caches each user's dashboard summary under
+``cache:dashboard:<user_id>`` (see app/dashboard.py) and drops the key after
+its own commits only. Writes made here drop it too; each web process also
+keeps a local copy for up to ``DASHBOARD_CACHE_TTL`` seconds, which is the
+remaining staleness window.
+"""
+from __future__ import annotations
+
+import logging
+
+import redis
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: redis.Redis | None = None
+
+
+def _get_client() -> redis.Redis:
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.redis_url,
+            socket_timeout=1,
+            socket_connect_timeout=1,
+        )
+    return _client
+
+
+def dashboard_key(user_id: int) -> str:
+    return f"cache:dashboard:{user_id}"
+
+
+def invalidate_dashboard(user_id: int) -> None:
+    """Drop the user's cached dashboard after a committed write.
+
+    Best effort, like :func:`events.publish`: the entry expires on its own.
+    """
+    try:
+        _get_client().delete(dashboard_key(user_id))
+    except Exception:
+        logger.warning("Could not invalidate the dashboard of user %s", user_id)
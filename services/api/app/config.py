@@ -5,6 +5,7 @@ class Settings(BaseSettings):
     """Application configuration loaded from environment variables."""
 
     database_url: str = "sqlite:///./fintrack.db"
+    database_replica_url: str | None = None
     enable_notion: bool = False
     notion_token: str | None = None
     notion_database_id: str | None = None
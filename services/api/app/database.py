@@ -1,14 +1,33 @@
+from fastapi import Request
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from .config import settings
 
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
 engine = create_engine(settings.database_url, future=True)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
+# Reads fall back to the primary when no replica is configured
+replica_engine = (
+    create_engine(settings.database_replica_url, future=True)
+    if settings.database_replica_url
+    else engine
+)
+ReplicaSessionLocal = sessionmaker(
+    bind=replica_engine, autoflush=False, autocommit=False, future=True
+)
+
+
+def get_db(request: Request):
+    """Yield a session for the request.
 
-def get_db():
-    db = SessionLocal()
+    Safe (read-only) methods are served from the replica so reporting traffic
+    does not compete with ingest on the primary; everything else uses the primary.
+    """
+    factory = ReplicaSessionLocal if request.method in READ_METHODS else SessionLocal
+    db = factory()
     try:
         yield db
     finally:
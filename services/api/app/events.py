@@ -0,0 +1,79 @@
+"""Per-user server-sent events fed by Redis pub/sub.
+
+Writers call :func:`publish` after committing; every open dashboard holds one
+``text/event-stream`` connection produced by :func:`stream` instead of polling.
+"""
+from __future__ import annotations
+
+import json
+import logging
+
+import redis
+
+from .config import settings
+
+HEARTBEAT_SECONDS = 15
+RETRY_MS = 3000
+
+logger = logging.getLogger(__name__)
+
+_publisher: redis.Redis | None = None
+
+
+def channel(user_id: int) -> str:
+    return f"events:user:{user_id}"
+
+
+def _get_publisher() -> redis.Redis:
+    global _publisher
+    if _publisher is None:
+        _publisher = redis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            socket_timeout=1,
+            socket_connect_timeout=1,
+        )
+    return _publisher
+
+
+def publish(user_id: int, event: str, data: dict) -> None:
+    """Publish ``event`` to the user's channel.
+
+    Best effort: a Redis outage must not fail the write that triggered it.
+    """
+    message = json.dumps({"event": event, "data": data}, default=str)
+    try:
+        _get_publisher().publish(channel(user_id), message)
+    except Exception:
+        logger.warning("Could not publish %s event for user %s", event, user_id)
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def stream(user_id: int, client, is_disconnected):
+    """Yield SSE frames for ``user_id`` until the client disconnects.
+
+    Args:
+        user_id: User whose channel is followed.
+        client: ``redis.asyncio`` client used to subscribe.
+        is_disconnected: Coroutine function telling whether the client left.
+    """
+    pubsub = client.pubsub()
+    await pubsub.subscribe(channel(user_id))
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while not await is_disconnected():
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=HEARTBEAT_SECONDS
+            )
+            if message is None:
+                # Comment frame keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            payload = json.loads(message["data"])
+            yield format_sse(payload["event"], payload["data"])
+    finally:
+        await pubsub.unsubscribe(channel(user_id))
+        await pubsub.aclose()
@@ -6,8 +6,8 @@ from typing import Optional
 import json
 
 
-from fastapi import Depends, FastAPI, Request, Header, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import Depends, FastAPI, Request, Header, HTTPException, Query
+from fastapi.responses import HTMLResponse, StreamingResponse
 
 import redis.asyncio as redis
 from fastapi.templating import Jinja2Templates
@@ -15,12 +15,15 @@ from sqlalchemy import select, func
 from sqlalchemy.orm import Session
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from .cache import invalidate_dashboard
 from .classify import apply_rules
 from .config import settings
 from .database import engine, get_db
+from .events import publish as publish_event, stream as stream_events
 from .models import Base, Rule, Transaction, Attachment
 from .notion import NotionClient
-from .schemas import TransactionCreate, TransactionRead
+from .schemas import TransactionCreate, TransactionRead, TransactionSearchPage
+from .search import search_transactions
 from .security import verify_hmac
 
 try:
@@ -126,6 +129,13 @@ def create_transaction(payload: TransactionCreate, db: Session = Depends(get_db)
             db.commit()
             db.refresh(tx)
 
+    invalidate_dashboard(tx.user_id)
+    publish_event(
+        tx.user_id,
+        "transaction.created",
+        TransactionRead.model_validate(tx, from_attributes=True).model_dump(mode="json"),
+    )
+
     if notion_client:
         notion_client.create_transaction({"id": tx.id, "amount": float(tx.amount), "merchant": tx.merchant})
 
@@ -141,6 +151,35 @@ def list_transactions(db: Session = Depends(get_db), user_id: Optional[int] = No
     return items
 
 
+@app.get("/transactions/search", response_model=TransactionSearchPage)
+def search(
+    q: str = Query(..., min_length=1),
+    user_id: Optional[int] = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    try:
+        ids, next_cursor = search_transactions(db, q, user_id=user_id, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="invalid cursor")
+    by_id = {
+        tx.id: tx
+        for tx in db.execute(select(Transaction).where(Transaction.id.in_(ids))).scalars()
+    } if ids else {}
+    return {"items": [by_id[i] for i in ids if i in by_id], "next_cursor": next_cursor}
+
+
+@app.get("/events")
+async def events(request: Request, user_id: int):
+    """Server-sent event stream of a user's new transactions and finished OCR jobs."""
+    return StreamingResponse(
+        stream_events(user_id, redis_client, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/webhooks/ocr")
 async def webhook_ocr(
     request: Request,
@@ -164,33 +203,31 @@ async def webhook_ocr(
     att.ocr_text = text
     db.add(att)
 
-    if att.transaction_id:
-        tx = db.get(Transaction, att.transaction_id)
-        if tx and tx.category_id is None:
-            rules = db.execute(select(Rule).where(Rule.user_id == tx.user_id)).scalars().all()
-            rule_dicts = [r.__dict__ for r in rules]
-            cat = apply_rules(
-                rule_dicts,
-                {"merchant": tx.merchant, "note": tx.note, "amount": float(tx.amount)},
-            )
-            if cat:
-                tx.category_id = cat
-                db.add(tx)
-
-
-    if tx.category_id is None:
+    tx = db.get(Transaction, att.transaction_id) if att.transaction_id else None
+    if tx and tx.category_id is None:
         rules = db.execute(select(Rule).where(Rule.user_id == tx.user_id)).scalars().all()
         rule_dicts = [r.__dict__ for r in rules]
         cat = apply_rules(
-            rule_dicts, {"merchant": tx.merchant, "note": tx.note, "amount": float(tx.amount)}
+            rule_dicts,
+            {"merchant": tx.merchant, "note": tx.note, "amount": float(tx.amount)},
         )
         if cat:
             tx.category_id = cat
             db.add(tx)
-            db.commit()
-            db.refresh(tx)
+    db.commit()
 
-    if notion_client:
+    invalidate_dashboard(att.user_id)
+    publish_event(
+        att.user_id,
+        "ocr.completed",
+        {
+            "attachment_id": att.id,
+            "transaction_id": att.transaction_id,
+            "category_id": tx.category_id if tx else None,
+        },
+    )
+
+    if tx and notion_client:
         notion_client.create_transaction({"id": tx.id, "amount": float(tx.amount), "merchant": tx.merchant})
 
     return {"status": "ok"}
@@ -1,23 +1,70 @@
 from __future__ import annotations
 
+import sqlite3
+import zlib
 from datetime import datetime, date
+from typing import Optional
+
 from sqlalchemy import (
     Boolean,
     CheckConstraint,
     Date,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     Numeric,
     String,
+    Text,
+    event,
 )
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy.types import TypeDecorator
 
 
 class Base(DeclarativeBase):
     pass
 
 
+class CompressedText(TypeDecorator):
+    """Unicode text stored zlib-compressed.
+
+    PostgreSQL keeps plain ``TEXT``: TOAST already compresses large values out
+    of line and the search triggers need to read the text.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(Text())
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        return zlib.compress(value.encode("utf-8"))
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        return zlib.decompress(value).decode("utf-8")
+
+
+def _inflate(value):
+    return zlib.decompress(value).decode("utf-8") if value is not None else None
+
+
+@event.listens_for(Engine, "connect")
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    # Lets SQL (e.g. the search triggers) read CompressedText columns
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function("inflate_text", 1, _inflate, deterministic=True)
+
+
 class User(Base):
     __tablename__ = "user"
 
@@ -67,8 +114,8 @@ class Rule(Base):
     user_id: Mapped[int] = mapped_column(ForeignKey("user.id"), index=True, nullable=False)
     pattern: Mapped[str] = mapped_column(String(160), nullable=False)
     field: Mapped[str] = mapped_column(String(16), default="merchant")
-    category_id: Mapped[int | None] = mapped_column(ForeignKey("category.id"))
-    scope_account_id: Mapped[int | None] = mapped_column(ForeignKey("account.id"))
+    category_id: Mapped[int | None] = mapped_column(ForeignKey("category.id"), index=True)
+    scope_account_id: Mapped[int | None] = mapped_column(ForeignKey("account.id"), index=True)
     min_amount: Mapped[str | None]
     max_amount: Mapped[str | None]
     priority: Mapped[int] = mapped_column(Integer, default=100)
@@ -78,28 +125,60 @@ class Rule(Base):
 
 class Transaction(Base):
     __tablename__ = "transaction"
+    __table_args__ = (
+        Index("ix_transaction_user_id_date", "user_id", "date", "id"),
+        Index("ix_transaction_date", "date", "id"),
+        Index("ix_transaction_account_id_date", "account_id", "date", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("user.id"), index=True, nullable=False)
     account_id: Mapped[int] = mapped_column(ForeignKey("account.id"), nullable=False)
-    category_id: Mapped[int | None] = mapped_column(ForeignKey("category.id"))
+    category_id: Mapped[int | None] = mapped_column(ForeignKey("category.id"), index=True)
     date: Mapped[date] = mapped_column(Date, nullable=False, default=date.today)
     amount: Mapped[Numeric] = mapped_column(Numeric(12, 2), nullable=False)
     merchant: Mapped[str | None] = mapped_column(String(160))
     note: Mapped[str | None] = mapped_column(String(255))
     source: Mapped[str] = mapped_column(String(16), default="manual")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
 class Attachment(Base):
     __tablename__ = "attachment"
+    __table_args__ = (Index("ix_attachment_user_id_sha256", "user_id", "sha256"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("user.id"), index=True, nullable=False)
-    transaction_id: Mapped[int | None] = mapped_column(ForeignKey("transaction.id"))
+    transaction_id: Mapped[int | None] = mapped_column(ForeignKey("transaction.id"), index=True)
     filename: Mapped[str] = mapped_column(String(255), nullable=False)
     mime: Mapped[str | None] = mapped_column(String(64))
     size: Mapped[int | None] = mapped_column(Integer)
     sha256: Mapped[str | None] = mapped_column(String(64), index=True)
-    ocr_text: Mapped[str | None] = mapped_column(String, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # OCR output lives in a side table and is only loaded when accessed
+    ocr_blob: Mapped[Optional["AttachmentText"]] = relationship(
+        lazy="select", uselist=False, cascade="all, delete-orphan"
+    )
+
+    @property
+    def ocr_text(self) -> str | None:
+        return self.ocr_blob.content if self.ocr_blob is not None else None
+
+    @ocr_text.setter
+    def ocr_text(self, value: str | None) -> None:
+        if value is None:
+            self.ocr_blob = None
+        elif self.ocr_blob is None:
+            self.ocr_blob = AttachmentText(content=value)
+        else:
+            self.ocr_blob.content = value
+
+
+class AttachmentText(Base):
+    __tablename__ = "attachment_text"
+
+    attachment_id: Mapped[int] = mapped_column(
+        ForeignKey("attachment.id", ondelete="CASCADE"), primary_key=True
+    )
+    content: Mapped[str] = mapped_column(CompressedText, nullable=False)
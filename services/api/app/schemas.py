@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -27,6 +27,11 @@ class TransactionRead(TransactionBase):
         orm_mode = True
 
 
+class TransactionSearchPage(BaseModel):
+    items: List[TransactionRead]
+    next_cursor: Optional[str] = None
+
+
 class OCRWebhook(TransactionBase):
     """Payload sent by OCR service via webhook."""
 
@@ -0,0 +1,265 @@
+"""Full-text search over transaction merchant, note and attachment OCR text.
+
+SQLite uses an FTS5 table and PostgreSQL a tsvector side table with a GIN
+index. Both are kept in sync by database triggers, so every write path
+(ORM, bulk SQL, other services) is indexed without application code.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import re
+
+from sqlalchemy import DDL, event, text
+
+from .models import Base
+
+# Concatenated OCR text of one transaction's attachments (stored zlib-compressed)
+_SQLITE_OCR_TEXT = """(
+    SELECT group_concat(inflate_text(x.content), ' ')
+    FROM attachment a JOIN attachment_text x ON x.attachment_id = a.id
+    WHERE a.transaction_id = {tx_id}
+)"""
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS transaction_fts USING fts5(
+        merchant, note, ocr_text, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transaction_fts_ai AFTER INSERT ON "transaction" BEGIN
+        INSERT INTO transaction_fts (rowid, merchant, note, ocr_text)
+        VALUES (new.id, new.merchant, new.note, {_SQLITE_OCR_TEXT.format(tx_id="new.id")});
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS transaction_fts_au AFTER UPDATE OF merchant, note ON "transaction" BEGIN
+        UPDATE transaction_fts SET merchant = new.merchant, note = new.note WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS transaction_fts_ad AFTER DELETE ON "transaction" BEGIN
+        DELETE FROM transaction_fts WHERE rowid = old.id;
+    END
+    """,
+    # Backfill rows written before the index existed
+    f"""
+    INSERT INTO transaction_fts (rowid, merchant, note, ocr_text)
+    SELECT t.id, t.merchant, t.note, {_SQLITE_OCR_TEXT.format(tx_id="t.id")}
+    FROM "transaction" t
+    WHERE t.id NOT IN (SELECT rowid FROM transaction_fts)
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS attachment_fts_au AFTER UPDATE OF transaction_id ON attachment BEGIN
+        UPDATE transaction_fts
+        SET ocr_text = {_SQLITE_OCR_TEXT.format(tx_id="transaction_fts.rowid")}
+        WHERE rowid IN (old.transaction_id, new.transaction_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS attachment_fts_ad AFTER DELETE ON attachment
+    WHEN old.transaction_id IS NOT NULL BEGIN
+        UPDATE transaction_fts
+        SET ocr_text = {_SQLITE_OCR_TEXT.format(tx_id="old.transaction_id")}
+        WHERE rowid = old.transaction_id;
+    END
+    """,
+]
+for _op, _row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+    _SQLITE_DDL.append(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS attachment_text_fts_{_op.lower()} AFTER {_op} ON attachment_text BEGIN
+            UPDATE transaction_fts
+            SET ocr_text = {_SQLITE_OCR_TEXT.format(tx_id="transaction_fts.rowid")}
+            WHERE rowid = (SELECT transaction_id FROM attachment WHERE id = {_row}.attachment_id);
+        END
+        """
+    )
+
+_SQLITE_DROP = ["DROP TABLE IF EXISTS transaction_fts"]
+
+_POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS transaction_search (
+        transaction_id INTEGER PRIMARY KEY REFERENCES "transaction" (id) ON DELETE CASCADE,
+        document TSVECTOR NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_transaction_search_document
+    ON transaction_search USING GIN (document)
+    """,
+    """
+    CREATE OR REPLACE FUNCTION transaction_search_refresh(tx_id INTEGER) RETURNS VOID AS $$
+        INSERT INTO transaction_search (transaction_id, document)
+        SELECT t.id,
+               setweight(to_tsvector('simple', coalesce(t.merchant, '')), 'A')
+               || setweight(to_tsvector('simple', coalesce(t.note, '')), 'B')
+               || setweight(to_tsvector('simple', coalesce(
+                      (SELECT string_agg(x.content, ' ')
+                       FROM attachment a JOIN attachment_text x ON x.attachment_id = a.id
+                       WHERE a.transaction_id = t.id), ''
+                  )), 'C')
+        FROM "transaction" t
+        WHERE t.id = tx_id
+        ON CONFLICT (transaction_id) DO UPDATE SET document = EXCLUDED.document;
+    $$ LANGUAGE sql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION transaction_search_transaction_trg() RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM transaction_search_refresh(NEW.id);
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION transaction_search_attachment_trg() RETURNS TRIGGER AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.transaction_id IS NOT NULL THEN
+            PERFORM transaction_search_refresh(OLD.transaction_id);
+        END IF;
+        IF TG_OP = 'UPDATE' AND NEW.transaction_id IS NOT NULL THEN
+            PERFORM transaction_search_refresh(NEW.transaction_id);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION transaction_search_attachment_text_trg() RETURNS TRIGGER AS $$
+    BEGIN
+        PERFORM transaction_search_refresh(a.transaction_id)
+        FROM attachment a
+        WHERE a.id = COALESCE(NEW.attachment_id, OLD.attachment_id) AND a.transaction_id IS NOT NULL;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER transaction_search_tx
+    AFTER INSERT OR UPDATE OF merchant, note ON "transaction"
+    FOR EACH ROW EXECUTE FUNCTION transaction_search_transaction_trg()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER transaction_search_att
+    AFTER UPDATE OF transaction_id OR DELETE ON attachment
+    FOR EACH ROW EXECUTE FUNCTION transaction_search_attachment_trg()
+    """,
+    """
+    CREATE OR REPLACE TRIGGER transaction_search_att_text
+    AFTER INSERT OR UPDATE OR DELETE ON attachment_text
+    FOR EACH ROW EXECUTE FUNCTION transaction_search_attachment_text_trg()
+    """,
+    """
+    SELECT transaction_search_refresh(t.id)
+    FROM "transaction" t
+    WHERE NOT EXISTS (SELECT 1 FROM transaction_search s WHERE s.transaction_id = t.id)
+    """,
+]
+
+_POSTGRES_DROP = [
+    "DROP TABLE IF EXISTS transaction_search",
+    "DROP FUNCTION IF EXISTS transaction_search_transaction_trg() CASCADE",
+    "DROP FUNCTION IF EXISTS transaction_search_attachment_trg() CASCADE",
+    "DROP FUNCTION IF EXISTS transaction_search_attachment_text_trg() CASCADE",
+    "DROP FUNCTION IF EXISTS transaction_search_refresh(INTEGER)",
+]
+
+for _stmt in _SQLITE_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+for _stmt in _POSTGRES_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_stmt).execute_if(dialect="postgresql"))
+for _stmt in _SQLITE_DROP:
+    event.listen(Base.metadata, "before_drop", DDL(_stmt).execute_if(dialect="sqlite"))
+for _stmt in _POSTGRES_DROP:
+    event.listen(Base.metadata, "before_drop", DDL(_stmt).execute_if(dialect="postgresql"))
+
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _fts5_query(q: str) -> str | None:
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    tokens = _TOKEN_RE.findall(q)
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def _tsquery(q: str) -> str | None:
+    tokens = _TOKEN_RE.findall(q)
+    if not tokens:
+        return None
+    return " & ".join(f"{t}:*" for t in tokens)
+
+
+def encode_cursor(score: float, tx_id: int) -> str:
+    raw = json.dumps([score, tx_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    """Decode a cursor produced by :func:`encode_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, tx_id = json.loads(base64.urlsafe_b64decode(padded))
+        return float(score), int(tx_id)
+    except Exception as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def search_transactions(db, q: str, user_id: int | None = None, limit: int = 20, cursor: str | None = None):
+    """Return ``(transaction_ids, next_cursor)`` ranked by relevance.
+
+    Results are ordered by ascending score (best match first) then id, and
+    paginated with a keyset on that pair so deep pages cost the same as the first.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        query = _tsquery(q)
+        matches = """
+            SELECT s.transaction_id AS id,
+                   -- ts_rank is float4; as float8 it survives the cursor's
+                   -- round trip through a Python float and compares exactly
+                   (-ts_rank(s.document, to_tsquery('simple', :q)))::float8 AS score
+            FROM transaction_search s
+            WHERE s.document @@ to_tsquery('simple', :q)
+        """
+    else:
+        query = _fts5_query(q)
+        matches = """
+            SELECT rowid AS id, bm25(transaction_fts, 10.0, 5.0, 1.0) AS score
+            FROM transaction_fts
+            WHERE transaction_fts MATCH :q
+        """
+    if query is None:
+        return [], None
+
+    params = {"q": query, "limit": limit + 1}
+    where = []
+    if user_id is not None:
+        where.append("t.user_id = :user_id")
+        params["user_id"] = user_id
+    if cursor:
+        params["after_score"], params["after_id"] = decode_cursor(cursor)
+        where.append("(m.score > :after_score OR (m.score = :after_score AND m.id > :after_id))")
+    sql = f"""
+        SELECT m.id, m.score
+        FROM ({matches}) AS m
+        JOIN "transaction" t ON t.id = m.id
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY m.score, m.id
+        LIMIT :limit
+    """
+    rows = db.execute(text(sql), params).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].score, rows[-1].id)
+    return [r.id for r in rows], next_cursor
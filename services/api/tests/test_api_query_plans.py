@@ -0,0 +1,78 @@
+import os
+import pathlib
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test_api.db")
+
+from services.api.app.main import app
+from services.api.app.database import SessionLocal, engine
+from services.api.app import models
+
+# A bare "SCAN <table>" line is a full table scan
+_FULL_SCAN_RE = re.compile(r"^SCAN (\w+)$")
+
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    yield
+    models.Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    db_path = pathlib.Path("./test_api.db")
+    if db_path.exists():
+        db_path.unlink()
+
+
+def seed():
+    db = SessionLocal()
+    for user_id in range(1, 21):
+        db.add(models.User(id=user_id, email=f"u{user_id}@example.com", password_hash="x"))
+        db.add(models.Account(id=user_id, user_id=user_id, name="Cash", type="cash", opening_balance=0))
+        db.add(models.Rule(user_id=user_id, pattern="Shop", priority=1))
+    db.flush()
+    for i in range(800):
+        user_id = i % 20 + 1
+        db.add(models.Transaction(user_id=user_id, account_id=user_id, amount=-1, merchant=f"Shop {i}"))
+    db.flush()
+    db.add(models.Attachment(id=1, user_id=1, transaction_id=1, filename="r.jpg"))
+    db.commit()
+    db.execute(text("ANALYZE"))
+    db.commit()
+    db.close()
+
+
+def test_hot_queries_use_indexes():
+    seed()
+    client = TestClient(app)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        # Unfiltered reads (e.g. the index page's global balance) scan by design
+        if not executemany and statement.lstrip().upper().startswith("SELECT") and " WHERE " in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        client.get("/")
+        client.get("/transactions", params={"user_id": 3})
+        client.get("/transactions/search", params={"q": "shop", "user_id": 3})
+        client.post("/transactions", json={"user_id": 3, "account_id": 3, "amount": -2, "merchant": "Shop"})
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert statements
+
+    tables = set(models.Base.metadata.tables)
+    scans = []
+    with engine.connect() as conn:
+        raw = conn.connection.driver_connection
+        for statement, parameters in statements:
+            for row in raw.execute(f"EXPLAIN QUERY PLAN {statement}", parameters):
+                m = _FULL_SCAN_RE.match(row[-1])
+                if m and m.group(1) in tables:
+                    scans.append(f"{row[-1]} in: {' '.join(statement.split())}")
+    assert not scans, "full table scans:\n" + "\n".join(scans)
@@ -0,0 +1,58 @@
+import os
+import pathlib
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test_api.db")
+
+from services.api.app.main import app
+from services.api.app import database, models
+from services.api.app.database import SessionLocal, engine
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    replica_engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}", future=True)
+    monkeypatch.setattr(database, "ReplicaSessionLocal", sessionmaker(bind=replica_engine, future=True))
+    yield replica_engine
+    replica_engine.dispose()
+    models.Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    db_path = pathlib.Path("./test_api.db")
+    if db_path.exists():
+        db_path.unlink()
+
+
+def sync_replica(replica_engine):
+    src = engine.raw_connection()
+    dst = replica_engine.raw_connection()
+    try:
+        src.driver_connection.backup(dst.driver_connection)
+    finally:
+        src.close()
+        dst.close()
+
+
+def test_get_reads_from_replica(replica):
+    db = SessionLocal()
+    db.add_all([
+        models.User(id=1, email="test@example.com", password_hash="x"),
+        models.Account(id=1, user_id=1, name="Cash", type="cash", opening_balance=0),
+    ])
+    db.commit()
+    db.close()
+    sync_replica(replica)
+
+    client = TestClient(app)
+    res = client.post("/transactions", json={"user_id": 1, "account_id": 1, "amount": -5, "merchant": "Cafe"})
+    assert res.status_code == 200
+    assert client.get("/transactions").json() == []
+
+    sync_replica(replica)
+    items = client.get("/transactions").json()
+    assert [t["merchant"] for t in items] == ["Cafe"]
@@ -0,0 +1,83 @@
+import os
+import pathlib
+import zlib
+
+import pytest
+from sqlalchemy import event, select, text
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test_api.db")
+
+from services.api.app.database import SessionLocal, engine
+from services.api.app import models
+
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    yield
+    models.Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    db_path = pathlib.Path("./test_api.db")
+    if db_path.exists():
+        db_path.unlink()
+
+
+def seed(ocr_text):
+    db = SessionLocal()
+    db.add(models.User(id=1, email="a@example.com", password_hash="x"))
+    db.flush()
+    att = models.Attachment(user_id=1, filename="r.jpg", ocr_text=ocr_text)
+    db.add(att)
+    db.commit()
+    att_id = att.id
+    db.close()
+    return att_id
+
+
+def test_ocr_text_is_stored_compressed_in_side_table():
+    ocr = "TOTAL 123.45\n" * 500
+    att_id = seed(ocr)
+    with engine.connect() as conn:
+        raw = conn.execute(
+            text("SELECT content FROM attachment_text WHERE attachment_id = :id"), {"id": att_id}
+        ).scalar_one()
+    assert len(raw) < len(ocr) // 10
+    assert zlib.decompress(raw).decode() == ocr
+
+    db = SessionLocal()
+    assert db.get(models.Attachment, att_id).ocr_text == ocr
+    db.close()
+
+
+def test_attachment_queries_do_not_load_ocr_text():
+    att_id = seed("x" * 10000)
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        db = SessionLocal()
+        atts = db.execute(select(models.Attachment)).scalars().all()
+        assert [a.id for a in atts] == [att_id]
+        assert not any("attachment_text" in s for s in statements)
+        assert atts[0].ocr_text == "x" * 10000
+        assert any("attachment_text" in s for s in statements)
+        db.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def test_clearing_ocr_text_removes_side_row():
+    att_id = seed("hello")
+    db = SessionLocal()
+    att = db.get(models.Attachment, att_id)
+    att.ocr_text = "bye"
+    db.commit()
+    assert db.get(models.Attachment, att_id).ocr_text == "bye"
+    att.ocr_text = None
+    db.commit()
+    assert db.execute(select(models.AttachmentText)).first() is None
+    db.close()
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+import pathlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test_api.db")
+
+from services.api.app import events, main, models
+from services.api.app.database import SessionLocal, engine
+
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    yield
+    models.Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    db_path = pathlib.Path("./test_api.db")
+    if db_path.exists():
+        db_path.unlink()
+
+
+@pytest.fixture
+def published(monkeypatch):
+    sent = []
+    monkeypatch.setattr(main, "publish_event", lambda user_id, event, data: sent.append((user_id, event, data)))
+    return sent
+
+
+def test_create_transaction_publishes_event(published):
+    db = SessionLocal()
+    db.add_all([
+        models.User(id=1, email="a@example.com", password_hash="x"),
+        models.Account(id=1, user_id=1, name="Cash", type="cash", opening_balance=0),
+    ])
+    db.commit()
+    db.close()
+
+    res = TestClient(main.app).post("/transactions", json={"user_id": 1, "account_id": 1, "amount": -5, "merchant": "Cafe"})
+    assert res.status_code == 200
+    assert len(published) == 1
+    user_id, event, data = published[0]
+    assert (user_id, event) == (1, "transaction.created")
+    assert data["id"] == res.json()["id"]
+    assert data["merchant"] == "Cafe"
+
+
+class FakePubSub:
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.subscribed = []
+        self.closed = False
+
+    async def subscribe(self, name):
+        self.subscribed.append(name)
+
+    async def unsubscribe(self, name):
+        self.subscribed.remove(name)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0):
+        return self.messages.pop(0) if self.messages else None
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FakeRedis:
+    def __init__(self, messages):
+        self.ps = FakePubSub(messages)
+
+    def pubsub(self):
+        return self.ps
+
+
+def test_stream_formats_messages_and_heartbeats():
+    message = {"data": json.dumps({"event": "ocr.completed", "data": {"attachment_id": 7}})}
+    client = FakeRedis([message])
+    polls = iter([False, False, True])
+
+    async def is_disconnected():
+        return next(polls)
+
+    async def collect():
+        return [frame async for frame in events.stream(3, client, is_disconnected)]
+
+    frames = asyncio.run(collect())
+    assert frames[0].startswith("retry:")
+    assert frames[1] == 'event: ocr.completed\ndata: {"attachment_id": 7}\n\n'
+    assert frames[2] == ": keepalive\n\n"
+    assert client.ps.subscribed == []
+    assert client.ps.closed
+
+
+def test_publish_ignores_redis_errors(monkeypatch):
+    class Broken:
+        def publish(self, *args):
+            raise ConnectionError("down")
+
+    monkeypatch.setattr(events, "_get_publisher", lambda: Broken())
+    events.publish(1, "transaction.created", {"id": 1})
+
+
+def test_writes_invalidate_the_cached_dashboard(monkeypatch, published):
+    from app.cache import TwoTierCache
+    from services.api.app import cache
+
+    deleted = []
+
+    class Recording:
+        def delete(self, key):
+            deleted.append(key)
+
+    monkeypatch.setattr(cache, "_get_client", lambda: Recording())
+    db = SessionLocal()
+    db.add_all([
+        models.User(id=1, email="a@example.com", password_hash="x"),
+        models.Account(id=1, user_id=1, name="Cash", type="cash", opening_balance=0),
+    ])
+    db.commit()
+    db.close()
+
+    TestClient(main.app).post("/transactions", json={"user_id": 1, "account_id": 1, "amount": -5, "merchant": "Cafe"})
+    # The key the Flask app's dashboard cache reads
+    assert deleted == [TwoTierCache("dashboard", 1, 1)._key(1)]
+
+    monkeypatch.setattr(cache, "_get_client", lambda: None)
+    cache.invalidate_dashboard(1)  # Redis errors are only logged
@@ -0,0 +1,100 @@
+import os
+import pathlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test_api.db")
+
+from services.api.app.main import app
+from services.api.app.database import SessionLocal, engine
+from services.api.app import models
+
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    yield
+    models.Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    db_path = pathlib.Path("./test_api.db")
+    if db_path.exists():
+        db_path.unlink()
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def seed():
+    db = SessionLocal()
+    db.add_all([
+        models.User(id=1, email="a@example.com", password_hash="x"),
+        models.User(id=2, email="b@example.com", password_hash="x"),
+        models.Account(id=1, user_id=1, name="Cash", type="cash", opening_balance=0),
+        models.Account(id=2, user_id=2, name="Cash", type="cash", opening_balance=0),
+    ])
+    db.flush()
+    db.add_all([
+        models.Transaction(id=1, user_id=1, account_id=1, amount=-5, merchant="Starbucks", note="latte"),
+        models.Transaction(id=2, user_id=1, account_id=1, amount=-9, merchant="Oxxo", note="snacks"),
+        models.Transaction(id=3, user_id=1, account_id=1, amount=-3, merchant="Cafe Punta", note="cafe starbucks-style"),
+        models.Transaction(id=4, user_id=2, account_id=2, amount=-5, merchant="Starbucks"),
+    ])
+    db.flush()
+    db.add(models.Attachment(user_id=1, transaction_id=2, filename="r.jpg", ocr_text="TICKET Oxxo refresco"))
+    db.commit()
+    db.close()
+
+
+def test_search_matches_merchant_note_and_ocr_text(client):
+    seed()
+    res = client.get("/transactions/search", params={"q": "starb", "user_id": 1})
+    assert res.status_code == 200
+    ids = [t["id"] for t in res.json()["items"]]
+    # merchant matches rank above note matches; other users are excluded
+    assert ids == [1, 3]
+
+    res = client.get("/transactions/search", params={"q": "refresco", "user_id": 1})
+    assert [t["id"] for t in res.json()["items"]] == [2]
+
+
+def test_search_index_follows_updates_and_deletes():
+    seed()
+    db = SessionLocal()
+    tx = db.get(models.Transaction, 2)
+    tx.merchant = "Walmart"
+    att = db.query(models.Attachment).one()
+    att.ocr_text = "despensa"
+    db.delete(db.get(models.Transaction, 1))
+    db.commit()
+    db.close()
+    client = TestClient(app)
+
+    def ids(q):
+        return [t["id"] for t in client.get("/transactions/search", params={"q": q, "user_id": 1}).json()["items"]]
+
+    assert ids("walmart") == [2]
+    assert ids("despensa") == [2]
+    assert ids("refresco") == []
+    assert ids("latte") == []
+
+
+def test_search_keyset_pagination(client):
+    seed()
+    res = client.get("/transactions/search", params={"q": "starbucks", "limit": 1})
+    page = res.json()
+    assert len(page["items"]) == 1
+    seen = [page["items"][0]["id"]]
+    while page["next_cursor"]:
+        page = client.get(
+            "/transactions/search",
+            params={"q": "starbucks", "limit": 1, "cursor": page["next_cursor"]},
+        ).json()
+        seen += [t["id"] for t in page["items"]]
+    assert sorted(seen) == [1, 3, 4]
+
+    res = client.get("/transactions/search", params={"q": "starbucks", "cursor": "bogus"})
+    assert res.status_code == 422
@@ -4,18 +4,48 @@ import hmac
 import hashlib
 import uuid
 import logging
-from io import BytesIO
+import tempfile
+from datetime import date
 
 try:  # pragma: no cover - optional dependency in tests
     import httpx
 except Exception:  # httpx may not be installed in test environment
     httpx = None
-from PIL import Image
-import pytesseract
+
+# OCR and statements are shared with the web app (the repo root is on PYTHONPATH);
+# OCR is configured by the same OCR_* environment variables
+from app.ocr import recognize_text
+from app.statements import render_statement
 
 QUEUE_NAME = os.getenv("OCR_QUEUE", "ocr")
 DEAD_LETTER_QUEUE = os.getenv("OCR_DEAD_LETTER_QUEUE", "ocr_dead")
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Signs result callbacks; derived the same way as the web app's OCR_WEBHOOK_SECRET
+WEBHOOK_SECRET = os.getenv("HMAC_SECRET") or hmac.new(
+    os.getenv("SECRET_KEY", "dev-secret").encode(), b"ocr-webhook", hashlib.sha256
+).hexdigest()
+STATEMENT_QUEUE = os.getenv("STATEMENT_QUEUE", "statements")
+# Statements are rendered straight from the database
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+_engine = None
+
+
+def _get_engine():
+    global _engine
+    if _engine is None:
+        from sqlalchemy import create_engine
+
+        _engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+    return _engine
+
+
+def _post_result(http_client, job: dict, payload: dict, secret: str):
+    signature = hmac.new(
+        secret.encode(), json.dumps(payload).encode(), hashlib.sha256
+    ).hexdigest()
+    headers = {"X-Hub-Signature": signature}
+    http_client.post(job["webhook_url"], json=payload, headers=headers)
 
 
 def process_ocr(
@@ -25,6 +55,7 @@ def process_ocr(
     ocr_func=None,
     queue_name: str = QUEUE_NAME,
     dead_letter_queue: str = DEAD_LETTER_QUEUE,
+    webhook_secret: str | None = None,
 ):
     """Process a single OCR job.
 
@@ -40,13 +71,24 @@ def process_ocr(
         Optional OCR function. If provided, it's called with job and should
         return extracted text. If not provided and job contains ``n8n_url``,
         an HTTP POST is performed to that URL to get OCR result. Otherwise
-        pytesseract is used on the image at ``image_url``.
+        the local file at ``image_path`` (uploads shared with the web app) or
+        the file downloaded from ``image_url`` goes through
+        ``app.ocr.recognize_text``, the same pipeline the web app uses.
     queue_name: str
         Name of the main queue for retries.
     dead_letter_queue: str
         Name of the dead-letter queue.
+    webhook_secret: str
+        Key signing the result callback when the job carries no
+        ``webhook_secret`` of its own. Defaults to ``WEBHOOK_SECRET``.
+
+    A job that fails ``max_retries`` times is dead-lettered and its
+    ``webhook_url`` is sent ``{"id", "error"}`` so the web app can mark it
+    failed.
     """
     http_client = http_client or httpx
+    # Producers other than the web app (e.g. services/api) sign with their own secret
+    secret = job.get("webhook_secret") or webhook_secret or WEBHOOK_SECRET
 
     job_id = job.get("id") or str(uuid.uuid4())
     max_retries = int(job.get("max_retries", 3))
@@ -60,19 +102,17 @@ def process_ocr(
             resp = http_client.post(job["n8n_url"], json=job)
             resp.raise_for_status()
             text = resp.json().get("text", "")
+        elif job.get("image_path"):
+            text = recognize_text(job["image_path"])
         else:
             resp = http_client.get(job["image_url"])
             resp.raise_for_status()
-            image = Image.open(BytesIO(resp.content))
-            text = pytesseract.image_to_string(image)
+            with tempfile.NamedTemporaryFile(suffix=".upload") as fh:
+                fh.write(resp.content)
+                fh.flush()
+                text = recognize_text(fh.name)
 
-        payload = {"id": job_id, "text": text}
-        secret = job.get("webhook_secret", "")
-        signature = hmac.new(
-            secret.encode(), json.dumps(payload).encode(), hashlib.sha256
-        ).hexdigest()
-        headers = {"X-Hub-Signature": signature}
-        http_client.post(job["webhook_url"], json=payload, headers=headers)
+        _post_result(http_client, job, {"id": job_id, "text": text}, secret)
 
         if job.get("notion_token") and job.get("notion_page_id"):
             notion_headers = {
@@ -92,30 +132,53 @@ def process_ocr(
             )
 
         redis_conn.delete(retries_key)
-    except Exception:
+    except Exception as exc:
         attempt += 1
         if attempt >= max_retries:
             redis_conn.lpush(dead_letter_queue, json.dumps(job))
             redis_conn.delete(retries_key)
+            if job.get("webhook_url"):
+                try:
+                    _post_result(http_client, job, {"id": job_id, "error": str(exc) or type(exc).__name__}, secret)
+                except Exception:
+                    logging.exception("Could not report failed job %s", job_id)
         else:
             redis_conn.set(retries_key, attempt)
             redis_conn.rpush(queue_name, json.dumps(job))
         raise
 
 
+def process_statement(job: dict, redis_conn, engine=None):
+    """Render an account statement PDF queued by the web app.
+
+    The job names the account, the month and the cache path to write; its
+    ``lock_key`` is released afterwards, whether rendering worked or not,
+    so a failed statement can be requested again.
+    """
+    engine = engine or _get_engine()
+    try:
+        with engine.connect() as conn:
+            render_statement(conn, job["account_id"], date.fromisoformat(job["month"]), job["path"])
+    finally:
+        redis_conn.delete(job["lock_key"])
+
+
 def run():
     """Run worker loop consuming jobs from Redis."""
     import redis  # imported lazily for test environments without the package
 
     redis_conn = redis.from_url(REDIS_URL)
-    logging.info("Worker started, listening to %s", QUEUE_NAME)
+    logging.info("Worker started, listening to %s and %s", QUEUE_NAME, STATEMENT_QUEUE)
     while True:
-        _, job_data = redis_conn.blpop(QUEUE_NAME)
+        queue, job_data = redis_conn.blpop([QUEUE_NAME, STATEMENT_QUEUE])
         job = json.loads(job_data)
         try:
-            process_ocr(job, redis_conn)
+            if queue.decode() == STATEMENT_QUEUE:
+                process_statement(job, redis_conn)
+            else:
+                process_ocr(job, redis_conn)
         except Exception:
-            logging.exception("Failed to process job %s", job.get("id"))
+            logging.exception("Failed to process job %s", job.get("id") or job.get("path"))
 
 
 if __name__ == "__main__":
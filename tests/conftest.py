@@ -0,0 +1,14 @@
+import sys
+import pathlib
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from app.config import Config
+
+
+@pytest.fixture(autouse=True)
+def _database_in_tmp_path(tmp_path, monkeypatch):
+    # A relative sqlite:/// URL would be created in the app's instance folder
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'test.db'}")
@@ -0,0 +1,200 @@
+import io
+import json
+import os
+import sys
+import pathlib
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+os.environ['DATABASE_URL'] = 'sqlite:///test.db'
+
+from app import create_app, db
+from app.api import routes
+from app.models import Transaction
+from services.worker.worker import process_ocr
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app()
+    app.config.update(TESTING=True, UPLOAD_FOLDER=str(tmp_path / 'uploads'), OCR_WEBHOOK_SECRET='s3cret')
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    if os.path.exists('test.db'):
+        os.remove('test.db')
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    jobs = []
+
+    def fake_enqueue(job, path):
+        jobs.append({'id': job.id, 'image_path': path, 'webhook_url': f'/api/uploads/{job.id}/result'})
+        return True
+
+    monkeypatch.setattr(routes, '_enqueue_ocr', fake_enqueue)
+    return jobs
+
+
+class FakeRedis:
+    def get(self, key):
+        return None
+
+    def delete(self, key):
+        pass
+
+    def lpush(self, name, value):
+        pass
+
+
+class FlaskHTTP:
+    """Routes the worker's webhook POST into the Flask test client."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def post(self, url, json=None, headers=None):
+        import json as _json
+        return self.client.post(url, data=_json.dumps(json), headers=headers, content_type='application/json')
+
+
+def setup_user(client):
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    return client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+
+
+def upload(client, account_id, data=b'receipt-bytes'):
+    return client.post(
+        '/api/upload',
+        data={'file': (io.BytesIO(data), 'receipt.jpg'), 'account_id': str(account_id)},
+        content_type='multipart/form-data',
+    )
+
+
+def test_upload_is_queued_and_filled_by_worker(app, queue):
+    client = app.test_client()
+    acc_id = setup_user(client)
+    res = upload(client, acc_id)
+    assert res.status_code == 202
+    body = res.get_json()
+    assert body['status'] == 'queued'
+    job_id = body['job_id']
+    assert queue[0]['id'] == job_id
+
+    status = client.get(f'/api/uploads/{job_id}').get_json()['data']
+    assert status['status'] == 'queued'
+
+    text = 'CAFE LA PARROQUIA\n12/04/2024\nTOTAL 87.50'
+    process_ocr(queue[0], FakeRedis(), http_client=FlaskHTTP(client), ocr_func=lambda job: text,
+                webhook_secret='s3cret')
+
+    status = client.get(f'/api/uploads/{job_id}').get_json()['data']
+    assert status['status'] == 'done'
+    with app.app_context():
+        tx = db.session.get(Transaction, body['transaction_id'])
+        assert tx.merchant == 'CAFE LA PARROQUIA'
+        assert tx.amount == Decimal('87.50')
+        assert tx.date == date(2024, 4, 12)
+
+    # Identical bytes reuse the finished result without queueing again
+    res = upload(client, acc_id)
+    assert res.status_code == 200
+    assert res.get_json()['deduplicated'] is True
+    assert len(queue) == 1
+
+
+def test_pending_job_is_not_reused(app, queue):
+    client = app.test_client()
+    acc_id = setup_user(client)
+    assert upload(client, acc_id).status_code == 202
+    assert upload(client, acc_id).status_code == 202
+    assert len(queue) == 2
+
+
+def test_result_callback_requires_signature(app, queue):
+    client = app.test_client()
+    acc_id = setup_user(client)
+    job_id = upload(client, acc_id).get_json()['job_id']
+    res = client.post(
+        f'/api/uploads/{job_id}/result',
+        data=json.dumps({'id': job_id, 'text': 'x'}),
+        headers={'X-Hub-Signature': 'bad'},
+        content_type='application/json',
+    )
+    assert res.status_code == 403
+    assert client.get(f'/api/uploads/{job_id}').get_json()['data']['status'] == 'queued'
+
+
+def test_status_is_private_to_owner(app, queue):
+    client = app.test_client()
+    acc_id = setup_user(client)
+    job_id = upload(client, acc_id).get_json()['job_id']
+    client.post('/auth/logout')
+    client.post('/auth/register', data={'email': 'other@example.com', 'password': 'pass'})
+    assert client.get(f'/api/uploads/{job_id}').status_code == 404
+
+
+def test_dead_lettered_job_is_reported_failed(app, queue):
+    client = app.test_client()
+    acc_id = setup_user(client)
+    job_id = upload(client, acc_id).get_json()['job_id']
+
+    def broken(job):
+        raise RuntimeError('tesseract crashed')
+
+    job = dict(queue[0], max_retries=1)
+    with pytest.raises(RuntimeError):
+        process_ocr(job, FakeRedis(), http_client=FlaskHTTP(client), ocr_func=broken, webhook_secret='s3cret')
+
+    status = client.get(f'/api/uploads/{job_id}').get_json()['data']
+    assert status['status'] == 'failed'
+    assert status['error'] == 'tesseract crashed'
+
+
+def test_queued_job_carries_no_secret(app, monkeypatch):
+    pushed = []
+
+    class CapturingRedis:
+        def rpush(self, name, value):
+            pushed.append(json.loads(value))
+
+    monkeypatch.setattr(routes, 'get_redis', lambda: CapturingRedis())
+    client = app.test_client()
+    assert upload(client, setup_user(client)).status_code == 202
+    assert set(pushed[0]) == {'id', 'image_path', 'webhook_url'}
+    assert app.config['SECRET_KEY'] not in json.dumps(pushed[0])
+
+
+def test_deleting_the_transaction_fails_its_queued_job(app, queue):
+    client = app.test_client()
+    acc_id = setup_user(client)
+    body = upload(client, acc_id).get_json()
+    assert client.delete(f"/api/transactions/{body['transaction_id']}").status_code == 200
+
+    status = client.get(f"/api/uploads/{body['job_id']}").get_json()['data']
+    assert (status['status'], status['error'], status['transaction_id']) == ('failed', 'transaction deleted', None)
+
+    # A result arriving afterwards is acknowledged and changes nothing
+    process_ocr(queue[0], FakeRedis(), http_client=FlaskHTTP(client), ocr_func=lambda job: 'TOTAL 1.00',
+                webhook_secret='s3cret')
+    assert client.get(f"/api/uploads/{body['job_id']}").get_json()['data']['status'] == 'failed'
+
+
+def test_result_for_an_unlinked_job_marks_it_failed(app, queue):
+    client = app.test_client()
+    acc_id = setup_user(client)
+    job_id = upload(client, acc_id).get_json()['job_id']
+    with app.app_context():
+        from app.models import UploadJob
+        db.session.execute(db.update(UploadJob).values(transaction_id=None))
+        db.session.commit()
+
+    process_ocr(queue[0], FakeRedis(), http_client=FlaskHTTP(client), ocr_func=lambda job: 'TOTAL 1.00',
+                webhook_secret='s3cret')
+    status = client.get(f'/api/uploads/{job_id}').get_json()['data']
+    assert (status['status'], status['error']) == ('failed', 'transaction deleted')
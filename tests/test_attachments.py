@@ -0,0 +1,133 @@
+import io
+import os
+import sys
+import pathlib
+import hashlib
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+os.environ['DATABASE_URL'] = 'sqlite:///test.db'
+
+from app import create_app, db
+from app.api import routes
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = create_app()
+    app.config.update(
+        TESTING=True,
+        UPLOAD_FOLDER=str(tmp_path / 'uploads'),
+        THUMBNAIL_FOLDER=str(tmp_path / 'thumbs'),
+    )
+    monkeypatch.setattr(
+        routes, 'extract_fields',
+        lambda path, **kwargs: {'merchant': 'OXXO', 'amount': Decimal('12.50'), 'date': date(2024, 5, 1)},
+    )
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    if os.path.exists('test.db'):
+        os.remove('test.db')
+
+
+def _png_bytes(size=(1200, 800)):
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new('RGB', size, 'orange').save(buf, 'PNG')
+    return buf.getvalue()
+
+
+def upload(client, data, name='receipt.png', email='test@example.com'):
+    client.post('/auth/register', data={'email': email, 'password': 'pass'})
+    acc_id = client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+    res = client.post(
+        '/api/upload',
+        data={'file': (io.BytesIO(data), name), 'account_id': str(acc_id)},
+        content_type='multipart/form-data',
+    )
+    return res.get_json()['attachment_id']
+
+
+def test_download_supports_range_and_caching(app):
+    client = app.test_client()
+    data = _png_bytes()
+    att_id = upload(client, data)
+
+    res = client.get(f'/api/attachments/{att_id}')
+    assert res.status_code == 200
+    assert res.data == data
+    assert res.headers['Content-Type'] == 'image/png'
+    assert res.headers['X-Content-Type-Options'] == 'nosniff'
+    assert res.headers['Content-Disposition'] == 'inline; filename=receipt.png'
+    assert 'immutable' in res.headers['Cache-Control']
+    assert 'private' in res.headers['Cache-Control']
+    assert 'public' not in res.headers['Cache-Control']
+
+    res = client.get(f'/api/attachments/{att_id}', headers={'Range': 'bytes=0-9'})
+    assert res.status_code == 206
+    assert res.data == data[:10]
+
+    etag = hashlib.sha256(data).hexdigest()
+    res = client.get(f'/api/attachments/{att_id}', headers={'If-None-Match': f'"{etag}"'})
+    assert res.status_code == 304
+
+
+def test_attachments_are_private(app):
+    client = app.test_client()
+    att_id = upload(client, _png_bytes())
+    client.post('/auth/logout')
+    client.post('/auth/register', data={'email': 'other@example.com', 'password': 'pass'})
+    assert client.get(f'/api/attachments/{att_id}').status_code == 404
+    assert client.get(f'/api/attachments/{att_id}/thumb').status_code == 404
+
+
+def test_thumbnail_is_generated_once(app, monkeypatch):
+    from PIL import Image
+
+    client = app.test_client()
+    att_id = upload(client, _png_bytes())
+
+    res = client.get(f'/api/attachments/{att_id}/thumb?size=128')
+    assert res.status_code == 200
+    assert res.headers['Content-Type'] == 'image/jpeg'
+    with Image.open(io.BytesIO(res.data)) as thumb:
+        assert max(thumb.size) == 128
+    assert len(os.listdir(app.config['THUMBNAIL_FOLDER'])) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError('cached thumbnail should be reused')
+
+    monkeypatch.setattr(routes, '_thumbnail', fail)
+    assert client.get(f'/api/attachments/{att_id}/thumb?size=128').status_code == 200
+    assert client.get(f'/api/attachments/{att_id}/thumb?size=100').status_code == 400
+
+
+def test_pdf_has_no_thumbnail(app):
+    client = app.test_client()
+    att_id = upload(client, b'%PDF-1.4 not really', name='statement.pdf')
+    assert client.get(f'/api/attachments/{att_id}/thumb').status_code == 404
+    assert client.get(f'/api/attachments/{att_id}').status_code == 200
+
+
+def test_non_images_are_downloaded(app):
+    client = app.test_client()
+    att_id = upload(client, b'%PDF-1.4 not really', name='statement.pdf')
+    res = client.get(f'/api/attachments/{att_id}')
+    assert res.headers['Content-Disposition'] == 'attachment; filename=statement.pdf'
+    assert res.headers['X-Content-Type-Options'] == 'nosniff'
+
+
+def test_decompression_bomb_has_no_thumbnail(app, monkeypatch):
+    from PIL import Image
+
+    client = app.test_client()
+    att_id = upload(client, _png_bytes())
+    # 1200x800 is over twice this limit, so Pillow refuses to open it
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 400 * 400)
+    assert client.get(f'/api/attachments/{att_id}/thumb').status_code == 404
@@ -0,0 +1,153 @@
+import io
+import os
+import sys
+import pathlib
+import hashlib
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+os.environ['DATABASE_URL'] = 'sqlite:///test.db'
+
+from app import create_app, db
+from app.api import routes
+from app.models import Attachment, Blob, User
+from app.storage import BlobStore, blob_store, collect_garbage, migrate_legacy_files
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = create_app()
+    app.config.update(
+        TESTING=True,
+        UPLOAD_FOLDER=str(tmp_path / 'uploads'),
+        THUMBNAIL_FOLDER=str(tmp_path / 'thumbs'),
+    )
+    monkeypatch.setattr(
+        routes, 'extract_fields',
+        lambda path, **kwargs: {'merchant': 'OXXO', 'amount': Decimal('12.50'), 'date': date(2024, 5, 1)},
+    )
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    if os.path.exists('test.db'):
+        os.remove('test.db')
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'})
+    return client
+
+
+def upload(client, data, name):
+    return client.post(
+        '/api/upload',
+        data={'file': (io.BytesIO(data), name), 'account_id': '1'},
+        content_type='multipart/form-data',
+    ).get_json()
+
+
+def test_identical_bytes_share_one_counted_blob(app, client):
+    data = b'receipt bytes'
+    sha = hashlib.sha256(data).hexdigest()
+    first = upload(client, data, 'a.png')
+    upload(client, data, 'b.png')
+    with app.app_context():
+        path = pathlib.Path(blob_store().path(sha))
+        assert path.read_bytes() == data
+        assert path.parent.parent.name == sha[:2] and path.parent.name == sha[2:4]
+        assert db.session.get(Blob, sha).refcount == 2
+        assert db.session.get(Attachment, first['attachment_id']).filename == 'a.png'
+    assert client.get(f'/api/attachments/{first["attachment_id"]}').data == data
+
+
+def test_gc_removes_only_unreferenced_blobs(app, client):
+    kept, dropped = b'kept receipt', b'dropped receipt'
+    upload(client, kept, 'kept.png')
+    upload(client, dropped, 'dropped.png')
+    upload(client, dropped, 'again.png')
+    with app.app_context():
+        store = blob_store()
+        stray = os.path.join(store.root, 'ff', 'ff', 'f' * 64)
+        os.makedirs(os.path.dirname(stray))
+        pathlib.Path(stray).write_bytes(b'left by a rolled back upload')
+        thumbs = pathlib.Path(app.config['THUMBNAIL_FOLDER'])
+        thumbs.mkdir()
+        drop_sha = hashlib.sha256(dropped).hexdigest()
+        (thumbs / f'{drop_sha}_128.jpg').write_bytes(b'thumb')
+
+        for att in Attachment.query.filter_by(sha256=drop_sha):
+            db.session.delete(att)
+        db.session.commit()
+        assert db.session.get(Blob, drop_sha).refcount == 0
+
+        # Recently touched blobs survive the grace period
+        assert collect_garbage(grace_seconds=3600) == 0
+        assert collect_garbage(grace_seconds=0) == 2
+        assert not os.path.exists(store.path(drop_sha))
+        assert not os.path.exists(stray)
+        assert db.session.get(Blob, drop_sha) is None
+        assert list(thumbs.iterdir()) == []
+        assert os.path.exists(store.path(hashlib.sha256(kept).hexdigest()))
+
+
+def test_gc_keeps_a_blob_reused_while_it_is_collected(app, client, monkeypatch):
+    data = b'reused receipt'
+    sha = hashlib.sha256(data).hexdigest()
+    upload(client, data, 'old.png')
+    with app.app_context():
+        for att in Attachment.query.all():
+            db.session.delete(att)
+        db.session.commit()
+
+    purge = BlobStore.purge
+
+    def upload_then_purge(store, purged_sha, cutoff):
+        # The same bytes are uploaded after the Blob row is deleted, before the unlink
+        assert upload(client, data, 'new.png')['deduplicated'] is False
+        return purge(store, purged_sha, cutoff)
+
+    monkeypatch.setattr(BlobStore, 'purge', upload_then_purge)
+    with app.app_context():
+        assert collect_garbage(grace_seconds=0) == 0
+        path = pathlib.Path(blob_store().path(sha))
+        assert path.read_bytes() == data
+        assert not pathlib.Path(f'{path}.deleting').exists()
+        assert db.session.get(Blob, sha).refcount == 1
+
+
+def test_migrate_moves_flat_layout_files(app, client):
+    data = b'legacy receipt'
+    sha = hashlib.sha256(data).hexdigest()
+    with app.app_context():
+        updir = pathlib.Path(app.config['UPLOAD_FOLDER'])
+        updir.mkdir(parents=True)
+        (updir / f'{sha}_old.png').write_bytes(data)
+        user = User.query.one()
+        for _ in range(2):
+            db.session.add(Attachment(user_id=user.id, filename=f'{sha}_old.png', sha256=sha, size=len(data)))
+        db.session.commit()
+        att_id = Attachment.query.first().id
+    # Served from the flat layout before the migration...
+    assert client.get(f'/api/attachments/{att_id}').data == data
+    with app.app_context():
+        assert migrate_legacy_files() == (1, 2)
+        assert not (updir / f'{sha}_old.png').exists()
+        assert pathlib.Path(blob_store().path(sha)).read_bytes() == data
+        assert {a.filename for a in Attachment.query} == {'old.png'}
+        assert db.session.get(Blob, sha).refcount == 2
+        assert migrate_legacy_files() == (0, 0)
+    # ...and from the store after it
+    assert client.get(f'/api/attachments/{att_id}').data == data
+
+
+def test_cli_commands(app):
+    runner = app.test_cli_runner()
+    assert 'removed 0' in runner.invoke(args=['blobs', 'gc']).output
+    assert 'moved 0' in runner.invoke(args=['blobs', 'migrate']).output
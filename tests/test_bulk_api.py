@@ -0,0 +1,220 @@
+import os
+import sys
+import pathlib
+
+import pytest
+from sqlalchemy import event
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+os.environ['DATABASE_URL'] = 'sqlite:///test.db'
+
+from app import create_app, db
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    if os.path.exists('test.db'):
+        os.remove('test.db')
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    return client
+
+
+def test_bulk_accounts_create_and_update(app, client):
+    existing = client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'FROM account' in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        res = client.post('/api/accounts/bulk', json={'items': [
+            {'name': f'Card {i}', 'type': 'credit', 'currency': 'USD'} for i in range(50)
+        ] + [{'id': existing, 'name': 'Wallet', 'opening_balance': 25}]})
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert res.status_code == 200
+    data = res.get_json()['data']
+    assert len(data) == 51
+    assert data[-1] == {**data[-1], 'id': existing, 'name': 'Wallet', 'opening_balance': 25.0, 'type': 'cash'}
+    # One IN query for the update targets; names come from the reference-data cache
+    assert len([s for s in statements if ' IN ' in s]) == 1
+    assert len(client.get('/api/accounts').get_json()['data']) == 51
+
+
+def test_bulk_is_atomic_with_per_item_errors(client):
+    client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'})
+    res = client.post('/api/accounts/bulk', json=[
+        {'name': 'Bank', 'type': 'checking'},
+        {'name': 'cash', 'type': 'cash'},
+        {'name': 'Bank', 'type': 'savings'},
+        {'name': 'Broker', 'type': 'yacht'},
+        {'id': 9999, 'name': 'Ghost'},
+    ])
+    assert res.status_code == 422
+    errors = res.get_json()['errors']
+    assert [(e['index'], e['status']) for e in errors] == [(1, 409), (2, 409), (3, 422), (4, 404)]
+    assert [a['name'] for a in client.get('/api/accounts').get_json()['data']] == ['Cash']
+
+    assert client.post('/api/accounts/bulk', json={'items': []}).status_code == 400
+
+
+def test_bulk_categories_and_rules(app, client):
+    res = client.post('/api/categories/bulk', json=[
+        {'name': 'Home', 'kind': 'expense'},
+        {'name': 'Food', 'kind': 'expense', 'color': '#ff0000'},
+    ])
+    assert res.status_code == 200
+    home, food = (c['id'] for c in res.get_json()['data'])
+
+    res = client.post('/api/categories/bulk', json=[
+        {'name': 'Power', 'kind': 'expense', 'parent_id': home},
+        {'id': food, 'parent_id': home},
+    ])
+    assert res.status_code == 200
+    with app.app_context():
+        from app.category_tree import descendant_ids
+        assert set(descendant_ids(home)) == {home, food, res.get_json()['data'][0]['id']}
+
+    # Moving Home under its own child is rejected
+    res = client.post('/api/categories/bulk', json=[{'id': home, 'parent_id': food}])
+    assert res.status_code == 422
+    assert res.get_json()['errors'][0]['message'] == 'invalid parent category'
+
+    acc_id = client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+    res = client.post('/api/rules/bulk', json=[
+        {'pattern': 'OXXO', 'category_id': food, 'scope_account_id': acc_id},
+        {'pattern': 'CFE', 'category_id': home, 'priority': 10},
+    ])
+    assert res.status_code == 200
+    assert [r['priority'] for r in res.get_json()['data']] == [100, 10]
+
+    res = client.post('/api/rules/bulk', json=[{'pattern': 'X', 'category_id': 9999}, {'field': 'note'}])
+    assert [e['message'] for e in res.get_json()['errors']] == ['invalid category', 'pattern required']
+
+
+def test_bulk_delete_and_restore_cascade_in_one_statement(app, client):
+    res = client.post('/api/categories/bulk', json=[{'name': f'Cat {i}', 'kind': 'expense'} for i in range(3)])
+    cat_ids = [c['id'] for c in res.get_json()['data']]
+    acc_id = client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+    client.post('/api/rules/bulk', json=[
+        {'pattern': f'M{i}', 'category_id': cat_ids[i % 2], 'scope_account_id': acc_id} for i in range(40)
+    ])
+
+    updates = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('UPDATE'):
+            updates.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        assert client.post('/api/categories/bulk/delete', json=cat_ids).get_json()['message'] == 'confirmation required'
+        res = client.post('/api/categories/bulk/delete?confirm=true', json={'ids': cat_ids[:2]})
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    data = res.get_json()
+    assert res.status_code == 200
+    assert data['data'] == {'ids': cat_ids[:2], 'deleted': 2, 'disabled_rules': 40}
+    # One UPDATE for the categories and one for their rules
+    assert len(updates) == 2
+    assert [c['id'] for c in client.get('/api/categories').get_json()['data']] == [cat_ids[2]]
+    assert not any(r['active'] for r in client.get('/api/rules').get_json()['data'])
+
+    res = client.post('/api/categories/bulk/restore', json={'ids': cat_ids})
+    assert res.get_json()['data'] == {'ids': cat_ids, 'restored': 2, 'reenabled_rules': 40}
+    assert all(r['active'] for r in client.get('/api/rules').get_json()['data'])
+
+    res = client.post('/api/accounts/bulk/delete', json=[acc_id])
+    assert res.get_json()['data']['disabled_rules'] == 40
+    assert client.get('/api/accounts').get_json()['data'] == []
+    res = client.post('/api/accounts/bulk/restore', json=[acc_id])
+    assert res.get_json()['data']['restored'] == 1
+
+
+def test_bulk_delete_and_restore_errors(client):
+    cash = client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+    res = client.post('/api/accounts/bulk/delete', json=[cash, 9999])
+    assert res.status_code == 422
+    assert res.get_json()['errors'] == [{'index': 1, 'message': 'not found', 'status': 404}]
+    assert len(client.get('/api/accounts').get_json()['data']) == 1
+    assert client.post('/api/accounts/bulk/delete', json=['x']).status_code == 400
+
+    client.post('/api/accounts/bulk/delete', json=[cash])
+    client.post('/api/accounts', json={'name': 'cash', 'type': 'cash'})
+    res = client.post('/api/accounts/bulk/restore', json=[cash])
+    assert res.status_code == 422
+    assert res.get_json()['errors'][0]['status'] == 409
+
+    rules = client.post('/api/rules/bulk', json=[{'pattern': 'A'}, {'pattern': 'B'}]).get_json()['data']
+    ids = [r['id'] for r in rules]
+    assert client.post('/api/rules/bulk/delete', json=ids).get_json()['data']['deleted'] == 2
+    assert client.get('/api/rules').get_json()['data'] == []
+    assert client.post('/api/rules/bulk/restore', json=ids).get_json()['data']['restored'] == 2
+
+
+def test_bulk_category_moves_are_checked_against_the_batch(app, client):
+    res = client.post('/api/categories/bulk', json=[
+        {'name': 'Home', 'kind': 'expense'},
+        {'name': 'Food', 'kind': 'expense'},
+        {'name': 'Power', 'kind': 'expense'},
+    ])
+    home, food, power = (c['id'] for c in res.get_json()['data'])
+
+    # Each move is fine against the current tree; together they are a cycle
+    res = client.post('/api/categories/bulk', json=[
+        {'id': home, 'parent_id': food},
+        {'id': food, 'parent_id': home},
+    ])
+    assert res.status_code == 422
+    assert [(e['index'], e['message']) for e in res.get_json()['errors']] == [
+        (0, 'invalid parent category'), (1, 'invalid parent category'),
+    ]
+
+    # Swapping parent and child is a valid batch
+    client.post('/api/categories/bulk', json=[{'id': food, 'parent_id': home}, {'id': power, 'parent_id': food}])
+    res = client.post('/api/categories/bulk', json=[
+        {'id': home, 'parent_id': food},
+        {'id': food, 'parent_id': None},
+    ])
+    assert res.status_code == 200
+    with app.app_context():
+        from app.category_tree import descendant_ids
+        assert set(descendant_ids(food)) == {food, home, power}
+        assert set(descendant_ids(home)) == {home}
+
+
+def test_bulk_rejects_null_ids_and_reports_other_conflicts(app, client, monkeypatch):
+    res = client.post('/api/accounts/bulk', json=[
+        {'name': 'Bank', 'type': 'checking'},
+        {'id': None, 'name': 'Cash', 'type': 'cash'},
+        {'id': 'x', 'name': 'Card'},
+    ])
+    assert res.status_code == 422
+    assert [(e['index'], e['status'], e['message']) for e in res.get_json()['errors']] == [
+        (1, 400, 'id must be an integer'), (2, 400, 'id must be an integer'),
+    ]
+    assert client.get('/api/accounts').get_json()['data'] == []
+
+    # A constraint other than the name index is not reported as a duplicate name
+    monkeypatch.setattr('app.api.routes._validate_account', lambda item, partial: ({'name': item['name']}, None))
+    res = client.post('/api/accounts/bulk', json=[{'name': 'Untyped'}])
+    assert res.status_code == 409
+    assert res.get_json() == {'success': False, 'message': 'no items were saved'}
@@ -0,0 +1,151 @@
+import os
+import sys
+import pathlib
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+os.environ['DATABASE_URL'] = 'sqlite:///test.db'
+
+from app import create_app, db
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    if os.path.exists('test.db'):
+        os.remove('test.db')
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    return client
+
+
+def _create(client, name, parent_id=None):
+    res = client.post('/api/categories', json={'name': name, 'kind': 'expense', 'parent_id': parent_id})
+    assert res.status_code == 201
+    return res.get_json()['data']['id']
+
+
+def _closure(app):
+    from app.models import CategoryClosure
+
+    with app.app_context():
+        return sorted(
+            (r.ancestor_id, r.descendant_id, r.depth) for r in CategoryClosure.query.all()
+        )
+
+
+def test_closure_follows_creates_and_moves(app, client):
+    home = _create(client, 'Home')
+    utilities = _create(client, 'Utilities', home)
+    power = _create(client, 'Power', utilities)
+    food = _create(client, 'Food')
+    assert _closure(app) == sorted([
+        (home, home, 0), (utilities, utilities, 0), (power, power, 0), (food, food, 0),
+        (home, utilities, 1), (home, power, 2), (utilities, power, 1),
+    ])
+
+    # Move the Utilities subtree under Food
+    res = client.put(f'/api/categories/{utilities}', json={'parent_id': food})
+    assert res.status_code == 200
+    assert _closure(app) == sorted([
+        (home, home, 0), (utilities, utilities, 0), (power, power, 0), (food, food, 0),
+        (food, utilities, 1), (food, power, 2), (utilities, power, 1),
+    ])
+
+    # Detach it again
+    assert client.put(f'/api/categories/{utilities}', json={'parent_id': None}).status_code == 200
+    assert (food, power, 2) not in _closure(app)
+    assert (utilities, power, 1) in _closure(app)
+
+
+def test_cycle_check_is_one_query(app, client):
+    top = _create(client, 'Top')
+    mid = _create(client, 'Mid', top)
+    leaf = _create(client, 'Leaf', mid)
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'category_closure' in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        res = client.put(f'/api/categories/{top}', json={'parent_id': leaf})
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert res.status_code == 400
+    assert len(statements) == 1
+    assert client.put(f'/api/categories/{top}', json={'parent_id': top}).status_code == 400
+
+
+def test_rollup_includes_subcategories(app, client):
+    from app.models import Transaction, User
+
+    home = _create(client, 'Home')
+    utilities = _create(client, 'Utilities', home)
+    power = _create(client, 'Power', utilities)
+    food = _create(client, 'Food')
+    acc_id = client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+    with app.app_context():
+        user_id = User.query.one().id
+        for category_id, amount, day in [
+            (home, '-10.00', date(2024, 5, 2)),
+            (utilities, '-20.00', date(2024, 5, 3)),
+            (power, '-30.00', date(2024, 5, 4)),
+            (power, '-500.00', date(2024, 4, 4)),
+            (food, '-5.00', date(2024, 5, 5)),
+        ]:
+            db.session.add(Transaction(
+                user_id=user_id, account_id=acc_id, category_id=category_id,
+                date=day, amount=Decimal(amount),
+            ))
+        db.session.commit()
+
+    res = client.get('/api/categories/rollup?from=2024-05-01&to=2024-05-31')
+    assert res.status_code == 200
+    totals = {c['name']: (Decimal(c['total']), c['count']) for c in res.get_json()['data']}
+    assert totals == {
+        'Home': (Decimal('-60.00'), 3),
+        'Utilities': (Decimal('-50.00'), 2),
+        'Power': (Decimal('-30.00'), 1),
+        'Food': (Decimal('-5.00'), 1),
+    }
+
+    res = client.get(f'/api/categories/rollup?root_id={utilities}')
+    names = {c['name'] for c in res.get_json()['data']}
+    assert names == {'Utilities', 'Power'}
+    assert client.get('/api/categories/rollup?from=May').status_code == 400
+
+
+def test_closure_is_backfilled_at_startup(app, client):
+    from app.models import CategoryClosure
+
+    food = _create(client, 'Food')
+    groceries = _create(client, 'Groceries', food)
+    # A database built by create_all() before the closure existed has no rows
+    with app.app_context():
+        db.session.execute(db.delete(CategoryClosure))
+        db.session.commit()
+
+    create_app()
+    res = client.put(f'/api/categories/{food}', json={'parent_id': groceries})
+    assert res.status_code == 400
+    assert res.get_json()['message'] == 'invalid parent category'
+    with app.app_context():
+        assert db.session.query(CategoryClosure).count() == 3
@@ -0,0 +1,130 @@
+import os
+import sys
+import pathlib
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+os.environ['DATABASE_URL'] = 'sqlite:///test.db'
+
+from app import create_app, db
+from app.dashboard import dashboard_summary, invalidate_dashboard
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    if os.path.exists('test.db'):
+        os.remove('test.db')
+
+
+@pytest.fixture
+def statements(app):
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield seen
+    event.remove(engine, 'before_cursor_execute', record)
+
+
+def _seed(client, app):
+    from app.models import Account, Category, Transaction, User
+
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    with app.app_context():
+        user = User.query.one()
+        today = date.today()
+        last_month = today.replace(day=1) - timedelta(days=1)
+        cash = Account(user_id=user.id, name='Cash', type='cash', currency='MXN', opening_balance=Decimal('100.00'))
+        bank = Account(user_id=user.id, name='Bank', type='checking', currency='MXN', opening_balance=Decimal('0'))
+        food = Category(user_id=user.id, name='Food', kind='expense')
+        fuel = Category(user_id=user.id, name='Fuel', kind='expense')
+        db.session.add_all([cash, bank, food, fuel])
+        db.session.flush()
+        db.session.add_all([
+            Transaction(user_id=user.id, account_id=bank.id, date=today, amount=Decimal('1000.00'), merchant='Payroll'),
+            Transaction(user_id=user.id, account_id=cash.id, category_id=food.id, date=today, amount=Decimal('-30.00'), merchant='Tacos'),
+            Transaction(user_id=user.id, account_id=bank.id, category_id=fuel.id, date=today, amount=Decimal('-50.00'), merchant='Gas'),
+            Transaction(user_id=user.id, account_id=cash.id, category_id=food.id, date=last_month, amount=Decimal('-999.00'), merchant='Old'),
+        ])
+        db.session.commit()
+        return user.id
+
+
+def test_summary_totals_come_from_one_query(app, statements):
+    client = app.test_client()
+    user_id = _seed(client, app)
+
+    with app.app_context():
+        statements.clear()
+        summary = dashboard_summary(user_id)
+        assert len(statements) == 1
+
+    balances = {a['name']: a['balance'] for a in summary['accounts']}
+    assert balances == {'Bank': '950.00', 'Cash': '-929.00'}
+    assert summary['totals'] == {'MXN': '21.00'}
+    assert summary['month']['income'] == '1000.00'
+    assert summary['month']['expense'] == '80.00'
+    assert [c['name'] for c in summary['top_categories']] == ['Fuel', 'Food']
+    assert [c['spent'] for c in summary['top_categories']] == ['50.00', '30.00']
+    assert [t['merchant'] for t in summary['recent']][-1] == 'Old'
+    assert len(summary['recent']) == 4
+
+
+def test_future_transactions_count_from_their_day(app):
+    from app.models import Transaction
+
+    client = app.test_client()
+    user_id = _seed(client, app)
+    with app.app_context():
+        cash_id = Transaction.query.filter_by(merchant='Tacos').one().account_id
+        db.session.add(Transaction(user_id=user_id, account_id=cash_id, date=date(2024, 5, 20),
+                                   amount=Decimal('-40.00'), merchant='Rent'))
+        db.session.commit()
+
+        summary = dashboard_summary(user_id, today=date(2024, 5, 10))
+        assert summary['month'] == {'start': '2024-05-01', 'end': '2024-05-10', 'income': '0.00', 'expense': '0.00'}
+        assert summary['top_categories'] == []
+        # The cached summary is rebuilt once that day arrives
+        assert dashboard_summary(user_id, today=date(2024, 5, 20))['month']['expense'] == '40.00'
+
+
+def test_summary_is_cached_until_a_write(app, statements):
+    from app.models import Transaction
+
+    client = app.test_client()
+    user_id = _seed(client, app)
+    assert client.get('/dashboard').status_code == 200
+
+    statements.clear()
+    res = client.get('/dashboard')
+    assert res.status_code == 200
+    assert b'950.00' in res.data
+    assert statements == []
+
+    with app.app_context():
+        tx = Transaction.query.filter_by(merchant='Gas').one()
+        tx.amount = Decimal('-70.00')
+        db.session.commit()
+    res = client.get('/dashboard')
+    assert b'930.00' in res.data
+
+    # Writes that bypass the ORM invalidate explicitly
+    with app.app_context():
+        db.session.execute(db.update(Transaction).where(Transaction.merchant == 'Gas').values(amount=Decimal('-10.00')))
+        db.session.commit()
+        invalidate_dashboard(user_id)
+    assert b'990.00' in client.get('/dashboard').data
@@ -0,0 +1,117 @@
+import os
+import sys
+import time
+import pathlib
+
+import pytest
+from sqlalchemy import event
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+os.environ['DATABASE_URL'] = 'sqlite:///test.db'
+
+from app import create_app, db
+from app.merchants import MerchantIndex
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    if os.path.exists('test.db'):
+        os.remove('test.db')
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    return client
+
+
+def _account(client):
+    return client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+
+
+def _create(client, acc_id, merchant):
+    res = client.post('/api/transactions', json={'account_id': acc_id, 'amount': '-1.00', 'merchant': merchant})
+    return res.get_json()['data']['id']
+
+
+def _suggest(client, prefix, **params):
+    res = client.get('/api/merchants/suggest', query_string={'prefix': prefix, **params})
+    assert res.status_code == 200
+    return [(item['merchant'], item['count']) for item in res.get_json()['data']['items']]
+
+
+def test_suggestions_ranked_by_use_and_case_insensitive(client):
+    acc_id = _account(client)
+    for merchant in ['Oxxo', 'OXXO', 'OXXO', 'Oxford Books', 'Walmart', 'oxxo gas', None]:
+        _create(client, acc_id, merchant)
+
+    assert _suggest(client, 'ox') == [('OXXO', 3), ('Oxford Books', 1), ('oxxo gas', 1)]
+    assert _suggest(client, 'OXXO ') == [('oxxo gas', 1)]
+    assert _suggest(client, 'oxxo', limit=1) == [('OXXO', 3)]
+    assert _suggest(client, '')[0] == ('OXXO', 3)
+    assert _suggest(client, 'z') == []
+    assert client.get('/api/merchants/suggest?prefix=o&limit=0').status_code == 400
+
+
+def test_index_follows_writes_without_rebuilding(app, client):
+    acc_id = _account(client)
+    first = _create(client, acc_id, 'Starbucks')
+    assert _suggest(client, 'star') == [('Starbucks', 1)]
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        second = _create(client, acc_id, 'Stardust Cafe')
+        _create(client, acc_id, 'Stardust Cafe')
+        client.put(f'/api/transactions/{first}', json={'merchant': 'Stark Industries'})
+        client.delete(f'/api/transactions/{second}')
+        statements.clear()
+        assert _suggest(client, 'sta') == [('Stardust Cafe', 1), ('Stark Industries', 1)]
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert not any('merchant' in s for s in statements)
+
+    # Another user has their own index
+    client.post('/auth/logout')
+    client.post('/auth/register', data={'email': 'other@example.com', 'password': 'pass'})
+    assert _suggest(client, 'sta') == []
+
+
+def test_indexes_are_evicted_least_recently_used(app, client):
+    app.config.update(MERCHANT_INDEX_USERS=1)
+    acc_id = _account(client)
+    _create(client, acc_id, 'Costco')
+    assert _suggest(client, 'co') == [('Costco', 1)]
+    client.post('/auth/logout')
+    client.post('/auth/register', data={'email': 'other@example.com', 'password': 'pass'})
+    assert _suggest(client, 'co') == []
+    with app.app_context():
+        indexes = app.extensions['merchant_indexes']
+        assert indexes.get(1) is None and indexes.get(2) is not None
+
+
+def test_prefix_lookup_is_fast():
+    names = [f'{a}{b} Store {n}' for a in 'abcdefghij' for b in 'abcdefghij' for n in range(50)]
+    index = MerchantIndex((name, len(name) % 7 + 1) for name in names)
+    assert len(index) == 5000
+
+    started = time.perf_counter()
+    for prefix in ['a', 'ab', 'abc', 'j', 'cd store 4']:
+        for _ in range(20):
+            result = index.suggest(prefix)
+    per_call = (time.perf_counter() - started) / 100
+    assert result and all(r['merchant'].startswith('cd Store 4') for r in result)
+    assert per_call < 0.01
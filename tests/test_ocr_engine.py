@@ -0,0 +1,159 @@
+import os
+import sys
+import pathlib
+import shutil
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from flask import Flask
+
+from app import ocr
+
+
+RECEIPT = [
+    "SUPER ABARROTES LUNA",
+    "Fecha: 14/03/2024",
+    "Leche 1L 24.50",
+    "Pan 38.00",
+    "TOTAL 62.50",
+]
+
+
+def fake_ocr_image(path):
+    # Module-level so the forked pool worker can unpickle it by reference
+    return "\n".join(RECEIPT)
+
+
+def fake_page_ocr(path):
+    return f"page {os.path.basename(path)}"
+
+
+@pytest.fixture
+def ocr_app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(OCR_CACHE_DIR=str(tmp_path / 'cache'), OCR_WORKERS=1, OCR_TIMEOUT=30)
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def fresh_pool(monkeypatch):
+    monkeypatch.setattr(ocr, '_pool', None)
+    yield
+    if ocr._pool is not None:
+        ocr._pool.shutdown()
+
+
+def _receipt_image(path):
+    from PIL import Image, ImageDraw, ImageFont
+
+    font = ImageFont.load_default(size=36)
+    img = Image.new('RGB', (900, 80 + 60 * len(RECEIPT)), 'white')
+    draw = ImageDraw.Draw(img)
+    for i, line in enumerate(RECEIPT):
+        draw.text((40, 40 + 60 * i), line, fill='black', font=font)
+    img.save(path)
+    return path
+
+
+def _text_pdf(path, lines):
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(path)
+    for i, line in enumerate(lines):
+        c.drawString(72, 760 - 20 * i, line)
+    c.save()
+    return path
+
+
+def _scanned_pdf(path, image_paths):
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(path)
+    for image_path in image_paths:
+        c.drawImage(image_path, 72, 400, width=400, height=200)
+        c.showPage()
+    c.save()
+    return path
+
+
+def test_parse_fields_picks_total_line():
+    fields = ocr.parse_fields("\n".join(RECEIPT))
+    assert fields['merchant'] == 'SUPER ABARROTES LUNA'
+    assert fields['amount'] == Decimal('62.50')
+    assert fields['date'] == date(2024, 3, 14)
+
+
+def test_ocr_runs_in_pool_and_is_cached(ocr_app, fresh_pool, monkeypatch, tmp_path):
+    monkeypatch.setattr(ocr, 'ocr_image', fake_ocr_image)
+    path = tmp_path / 'receipt.png'
+    path.write_bytes(b'not really an image')
+
+    fields = ocr.extract_fields(str(path))
+    assert fields['amount'] == Decimal('62.50')
+    sha = ocr.file_sha256(str(path))
+    assert os.path.exists(os.path.join(ocr_app.config['OCR_CACHE_DIR'], sha[:2], f'{sha}.txt'))
+
+    def fail(*args, **kwargs):
+        raise AssertionError('cached text should skip OCR')
+
+    monkeypatch.setattr(ocr, '_get_pool', fail)
+    assert ocr.extract_fields(str(path), sha256=sha)['merchant'] == 'SUPER ABARROTES LUNA'
+
+
+@pytest.mark.skipif(shutil.which('tesseract') is None, reason='tesseract not installed')
+def test_real_ocr_reads_generated_receipt(ocr_app, fresh_pool, tmp_path):
+    path = _receipt_image(str(tmp_path / 'receipt.png'))
+    fields = ocr.extract_fields(path)
+    assert fields['amount'] == Decimal('62.50')
+    assert fields['date'] == date(2024, 3, 14)
+    assert 'LUNA' in fields['merchant'].upper()
+
+
+def test_pdf_text_layer_skips_ocr(ocr_app, monkeypatch, tmp_path):
+    def fail(*args, **kwargs):
+        raise AssertionError('digital PDFs should not be OCR\'d')
+
+    monkeypatch.setattr(ocr, '_get_pool', fail)
+    path = _text_pdf(str(tmp_path / 'receipt.pdf'), RECEIPT)
+    fields = ocr.extract_fields(path)
+    assert fields['merchant'] == 'SUPER ABARROTES LUNA'
+    assert fields['amount'] == Decimal('62.50')
+    assert fields['date'] == date(2024, 3, 14)
+
+
+def test_scanned_pdf_falls_back_to_ocr(ocr_app, fresh_pool, monkeypatch, tmp_path):
+    monkeypatch.setattr(ocr, 'ocr_image', fake_ocr_image)
+    image = _receipt_image(str(tmp_path / 'scan.png'))
+    path = _scanned_pdf(str(tmp_path / 'scan.pdf'), [image])
+    assert ocr.extract_fields(path)['amount'] == Decimal('62.50')
+
+
+def test_multipage_pages_are_merged_in_order(ocr_app, fresh_pool, monkeypatch, tmp_path):
+    from PIL import Image
+
+    monkeypatch.setattr(ocr, 'ocr_image', fake_page_ocr)
+    ocr_app.config['OCR_WORKERS'] = 3
+    frames = [Image.new('RGB', (40, 40), color) for color in ('red', 'green', 'blue')]
+    tiff = str(tmp_path / 'statement.tiff')
+    frames[0].save(tiff, save_all=True, append_images=frames[1:])
+    assert ocr.document_text(tiff).splitlines() == ['page 0.png', 'page 1.png', 'page 2.png']
+
+    image = _receipt_image(str(tmp_path / 'scan.png'))
+    pdf = _scanned_pdf(str(tmp_path / 'scan.pdf'), [image, image])
+    assert ocr.document_text(pdf).splitlines() == ['page 0-0.png', 'page 1-0.png']
+
+
+def test_page_limit(ocr_app, fresh_pool, monkeypatch, tmp_path):
+    from PIL import Image
+
+    monkeypatch.setattr(ocr, 'ocr_image', fake_page_ocr)
+    ocr_app.config['OCR_MAX_PAGES'] = 2
+    frames = [Image.new('RGB', (40, 40), 'white') for _ in range(5)]
+    tiff = str(tmp_path / 'long.tiff')
+    frames[0].save(tiff, save_all=True, append_images=frames[1:])
+    assert len(ocr.document_text(tiff).splitlines()) == 2
@@ -0,0 +1,73 @@
+import os
+import sys
+import pathlib
+import threading
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+os.environ['DATABASE_URL'] = 'sqlite:///test.db'
+
+from app import create_app, db, passwords
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(passwords, '_executor', None)
+    monkeypatch.setattr(passwords, '_slots', None)
+    app = create_app()
+    app.config.update(TESTING=True, BCRYPT_ROUNDS=4, PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=0)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    if passwords._executor is not None:
+        passwords._executor.shutdown()
+    if os.path.exists('test.db'):
+        os.remove('test.db')
+
+
+def test_login_rehashes_when_cost_changes(app):
+    from app.models import User
+
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    client.post('/auth/logout')
+    with app.app_context():
+        assert User.query.one().password_hash.startswith('$2b$04$')
+
+    app.config['BCRYPT_ROUNDS'] = 5
+    res = client.post('/auth/login', data={'email': 'test@example.com', 'password': 'pass'})
+    assert res.headers['Location'].endswith('/dashboard')
+    with app.app_context():
+        assert User.query.one().password_hash.startswith('$2b$05$')
+
+    client.post('/auth/logout')
+    res = client.post('/auth/login', data={'email': 'test@example.com', 'password': 'wrong'})
+    assert res.headers['Location'].endswith('/auth/login')
+
+
+def test_full_backlog_is_rejected_with_503(app):
+    release = threading.Event()
+    started = threading.Event()
+
+    def occupy():
+        with app.app_context():
+            passwords._run(lambda: (started.set(), release.wait(5)))
+
+    worker = threading.Thread(target=occupy)
+    worker.start()
+    started.wait(5)
+    try:
+        client = app.test_client()
+        res = client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+        assert res.status_code == 503
+        assert res.headers['Retry-After'] == '1'
+        # Requests that do not hash passwords are unaffected
+        assert client.get('/auth/login').status_code == 200
+    finally:
+        release.set()
+        worker.join()
+
+    res = client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    assert res.status_code == 302
@@ -0,0 +1,139 @@
+import io
+import os
+import re
+import sys
+import pathlib
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+os.environ['DATABASE_URL'] = 'sqlite:///test.db'
+
+from app import create_app, db
+from app.api import routes
+
+# A bare "SCAN <table>" line is a full table scan; "SCAN x USING INDEX" and
+# "SEARCH ..." lines are index driven
+_FULL_SCAN_RE = re.compile(r'^SCAN (\w+)$')
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    app = create_app()
+    app.config.update(
+        TESTING=True,
+        BCRYPT_ROUNDS=4,
+        UPLOAD_FOLDER=str(tmp_path / 'uploads'),
+        THUMBNAIL_FOLDER=str(tmp_path / 'thumbs'),
+        STATEMENT_FOLDER=str(tmp_path / 'statements'),
+    )
+    monkeypatch.setattr(
+        routes, 'extract_fields',
+        lambda path, **kwargs: {'merchant': 'OXXO', 'amount': Decimal('-12.50'), 'date': date(2024, 5, 1)},
+    )
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    if os.path.exists('test.db'):
+        os.remove('test.db')
+
+
+def _seed(app, client):
+    """A few users with enough rows that a scan and a search are distinguishable."""
+    from app.models import Account, Category, Rule, Transaction, User
+
+    for n in range(20):
+        client.post('/auth/register', data={'email': f'user{n}@example.com', 'password': 'pass'})
+        client.post('/auth/logout')
+    with app.app_context():
+        for user in User.query.all():
+            accounts = [Account(user_id=user.id, name=f'Acc {i}', type='cash') for i in range(3)]
+            categories = [Category(user_id=user.id, name=f'Cat {i}', kind='expense') for i in range(3)]
+            db.session.add_all(accounts + categories)
+            db.session.flush()
+            for i in range(40):
+                db.session.add(Transaction(
+                    user_id=user.id,
+                    account_id=accounts[i % 3].id,
+                    category_id=categories[i % 3].id,
+                    date=date.today() - timedelta(days=i),
+                    amount=Decimal('-1.00'),
+                    merchant=f'Shop {i}',
+                ))
+            db.session.add(Rule(user_id=user.id, pattern='Shop', category_id=categories[0].id,
+                                scope_account_id=accounts[0].id))
+        db.session.commit()
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+
+
+def _exercise(client):
+    """Hit every hot read/write path of the Flask app."""
+    client.post('/auth/login', data={'email': 'user0@example.com', 'password': 'pass'})
+    accounts = client.get('/api/accounts').get_json()['data']
+    categories = client.get('/api/categories').get_json()['data']
+    client.get('/api/rules')
+    client.get('/dashboard')
+    client.get('/api/categories/rollup')
+    client.get(f'/api/categories/rollup?root_id={categories[0]["id"]}')
+    for _ in range(2):  # second upload takes the dedup path
+        res = client.post(
+            '/api/upload',
+            data={'file': (io.BytesIO(b'receipt'), 'r.png'), 'account_id': str(accounts[0]['id'])},
+            content_type='multipart/form-data',
+        )
+    client.get(f'/api/attachments/{res.get_json()["attachment_id"]}')
+    client.get(f'/api/uploads/{res.get_json().get("job_id", "missing")}')
+    client.put(f'/api/categories/{categories[1]["id"]}', json={'parent_id': categories[0]['id']})
+    client.post('/api/accounts/bulk', json=[{'name': 'New', 'type': 'cash'}, {'id': accounts[1]['id'], 'name': 'Renamed'}])
+    client.delete(f'/api/categories/{categories[2]["id"]}?confirm=true')
+    client.post(f'/api/categories/{categories[2]["id"]}/restore')
+    client.delete(f'/api/accounts/{accounts[0]["id"]}')
+    client.post(f'/api/accounts/{accounts[0]["id"]}/restore')
+    client.post('/api/categories/bulk/delete?confirm=true', json=[categories[2]['id']])
+    client.post('/api/categories/bulk/restore', json=[categories[2]['id']])
+    client.get('/api/sync?since=0')
+    page = client.get('/api/transactions?limit=10').get_json()['data']
+    client.get(f'/api/transactions?limit=10&cursor={page["next_cursor"]}')
+    client.get(f'/api/transactions?account_id={accounts[1]["id"]}&from={date.today() - timedelta(days=7)}')
+    client.put(f'/api/transactions/{page["items"][0]["id"]}', json={'note': 'checked'})
+    client.delete(f'/api/transactions/{page["items"][1]["id"]}')
+    client.get(f'/api/accounts/{accounts[1]["id"]}/statements/{date.today():%Y-%m}')
+    client.get('/api/timeseries?granularity=week')
+    client.get(f'/api/timeseries?account={accounts[1]["id"]}')
+    client.get('/api/merchants/suggest?prefix=sh')
+
+
+def test_hot_queries_use_indexes(app):
+    client = app.test_client()
+    _seed(app, client)
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')):
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+        tables = set(db.metadata.tables)
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        _exercise(client)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert statements
+
+    scans = []
+    with engine.connect() as conn:
+        raw = conn.connection.driver_connection
+        for statement, parameters in statements:
+            for row in raw.execute(f'EXPLAIN QUERY PLAN {statement}', parameters):
+                m = _FULL_SCAN_RE.match(row[-1])
+                if m and m.group(1) in tables:
+                    scans.append(f'{row[-1]}\n    in: {" ".join(statement.split())}')
+    assert not scans, 'full table scans:\n' + '\n'.join(scans)
@@ -0,0 +1,89 @@
+import os
+import sys
+import pathlib
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+os.environ['DATABASE_URL'] = 'sqlite:///test.db'
+
+from app import create_app, db
+from app.config import Config
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'SQLALCHEMY_BINDS', {'replica': f"sqlite:///{tmp_path / 'replica.db'}"})
+    app = create_app()
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    # init_app registers a metadata per bind key on the shared extension
+    db.metadatas.pop('replica', None)
+    if os.path.exists('test.db'):
+        os.remove('test.db')
+
+
+def sync_replica(app):
+    """Copy the primary into the replica with the SQLite backup API."""
+    with app.app_context():
+        src = db.engines[None].raw_connection()
+        dst = db.engines['replica'].raw_connection()
+        try:
+            src.driver_connection.backup(dst.driver_connection)
+        finally:
+            src.close()
+            dst.close()
+
+
+def test_reads_go_to_replica_and_writes_to_primary(app):
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    res = client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'})
+    assert res.status_code == 201
+    sync_replica(app)
+    assert [a['name'] for a in client.get('/api/accounts').get_json()['data']] == ['Cash']
+
+    # Written to the primary but not yet replicated
+    res = client.post('/api/accounts', json={'name': 'Wallet', 'type': 'cash'})
+    assert res.status_code == 201
+    assert [a['name'] for a in client.get('/api/accounts').get_json()['data']] == ['Cash']
+
+    sync_replica(app)
+    names = sorted(a['name'] for a in client.get('/api/accounts').get_json()['data'])
+    assert names == ['Cash', 'Wallet']
+
+
+def test_reference_data_cache_is_filled_from_primary(app):
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    sync_replica(app)
+    acc_id = client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+
+    # A GET before replication fills the cache; it must not miss the new account
+    assert client.get('/upload').status_code == 200
+    sync_replica(app)
+    res = client.post('/api/rules', json={'pattern': 'OXXO', 'scope_account_id': acc_id})
+    assert res.status_code == 201
+
+
+def test_dashboard_is_rebuilt_from_primary(app):
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    sync_replica(app)
+    assert b'No accounts yet.' in client.get('/dashboard').data
+
+    client.post('/api/accounts', json={'name': 'Wallet', 'type': 'cash'})
+    assert b'Wallet' in client.get('/dashboard').data
+
+
+def test_merchant_index_is_built_from_primary(app):
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    acc_id = client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+    sync_replica(app)
+    client.post('/api/transactions', json={'account_id': acc_id, 'amount': '-1.00', 'merchant': 'Oxxo'})
+
+    res = client.get('/api/merchants/suggest?prefix=ox')
+    assert res.get_json()['data']['items'] == [{'merchant': 'Oxxo', 'count': 1}]
@@ -0,0 +1,92 @@
+import os
+import sys
+import pathlib
+
+import pytest
+from sqlalchemy import event
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+os.environ['DATABASE_URL'] = 'sqlite:///test.db'
+
+from app import create_app, db
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    if os.path.exists('test.db'):
+        os.remove('test.db')
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    return client
+
+
+def _reads(app, fn):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and ('FROM account' in statement or 'FROM category' in statement):
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        fn()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return statements
+
+
+def test_reference_checks_are_served_from_cache(app, client):
+    acc_id = client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+    cat_id = client.post('/api/categories', json={'name': 'Food', 'kind': 'expense'}).get_json()['data']['id']
+    client.get('/upload')  # warms the cache
+
+    def writes():
+        assert client.post('/api/rules', json={
+            'pattern': 'OXXO', 'category_id': cat_id, 'scope_account_id': acc_id,
+        }).status_code == 201
+        assert client.post('/api/transactions', json={
+            'account_id': acc_id, 'category_id': cat_id, 'amount': -10,
+        }).status_code == 201
+        assert client.post('/api/accounts', json={'name': 'cash', 'type': 'cash'}).status_code == 409
+
+    assert _reads(app, writes) == []
+
+
+def test_writes_invalidate_the_cache(client):
+    acc_id = client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+    parent = client.post('/api/categories', json={'name': 'Home', 'kind': 'expense'}).get_json()['data']['id']
+    # A category created a moment ago is immediately a valid parent
+    res = client.post('/api/categories', json={'name': 'Power', 'kind': 'expense', 'parent_id': parent})
+    assert res.status_code == 201
+
+    client.put(f'/api/accounts/{acc_id}', json={'name': 'Wallet'})
+    assert client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).status_code == 201
+    assert b'Wallet' in client.get('/upload').data
+
+    # Set-based bulk deletes bypass the ORM events and invalidate explicitly
+    client.post('/api/accounts/bulk/delete', json=[acc_id])
+    res = client.post('/api/transactions', json={'account_id': acc_id, 'amount': 1})
+    assert res.get_json()['message'] == 'invalid account'
+    assert b'Wallet' not in client.get('/upload').data
+    client.post('/api/accounts/bulk/restore', json=[acc_id])
+    assert client.post('/api/transactions', json={'account_id': acc_id, 'amount': 1}).status_code == 201
+
+
+def test_cache_is_per_user(app, client):
+    acc_id = client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+    other = app.test_client()
+    other.post('/auth/register', data={'email': 'other@example.com', 'password': 'pass'})
+    assert other.post('/api/transactions', json={'account_id': acc_id, 'amount': 1}).status_code == 422
+    assert other.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).status_code == 201
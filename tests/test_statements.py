@@ -0,0 +1,142 @@
+import io
+import json
+import os
+import sys
+import time
+import pathlib
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from pypdf import PdfReader
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+os.environ['DATABASE_URL'] = 'sqlite:///test.db'
+
+from app import create_app, db
+from app.models import Transaction, User
+from services.worker.worker import process_statement
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app()
+    app.config.update(TESTING=True, STATEMENT_FOLDER=str(tmp_path / 'statements'))
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    if os.path.exists('test.db'):
+        os.remove('test.db')
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    return client
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.queues = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+    def rpush(self, queue, data):
+        self.queues.setdefault(queue, []).append(data)
+
+
+def _seed(app, client, rows):
+    acc_id = client.post(
+        '/api/accounts', json={'name': 'Checking', 'type': 'checking', 'opening_balance': 100}
+    ).get_json()['data']['id']
+    with app.app_context():
+        user_id = User.query.first().id
+        db.session.execute(db.insert(Transaction), [
+            {'user_id': user_id, 'account_id': acc_id, 'date': date(2024, 4, 1) + timedelta(days=i % 30),
+             'amount': Decimal('-1.25'), 'merchant': f'Shop {i}'}
+            for i in range(rows)
+        ])
+        # Before the month: part of the opening balance
+        db.session.add(Transaction(user_id=user_id, account_id=acc_id, date=date(2024, 3, 31),
+                                   amount=Decimal('50.00'), merchant='Salary'))
+        db.session.commit()
+    return acc_id
+
+
+def _wait_for_pdf(client, url, timeout=30):
+    deadline = time.time() + timeout
+    while True:
+        res = client.get(url)
+        if res.status_code != 202 or time.time() > deadline:
+            return res
+        time.sleep(0.05)
+
+
+def test_statement_rendered_in_background_and_cached(app, client):
+    acc_id = _seed(app, client, 1500)
+    url = f'/api/accounts/{acc_id}/statements/2024-04'
+
+    res = client.get(url)
+    assert res.status_code == 202
+    assert res.get_json()['data']['status'] == 'pending'
+    assert res.headers['Retry-After']
+
+    res = _wait_for_pdf(client, url)
+    assert res.status_code == 200
+    assert res.mimetype == 'application/pdf'
+    reader = PdfReader(io.BytesIO(res.data))
+    assert len(reader.pages) > 1
+    first, last = reader.pages[0].extract_text(), reader.pages[-1].extract_text()
+    assert 'Opening balance' in first and '150.00' in first
+    # 150.00 - 1500 * 1.25
+    assert 'Closing balance' in last and '-1,725.00' in last
+
+    etag = res.headers['ETag']
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    # Any change to the month's rows is a new version, rendered again
+    with app.app_context():
+        tx_id = db.session.scalar(db.select(Transaction.id).where(Transaction.date == date(2024, 4, 2)).limit(1))
+    client.put(f'/api/transactions/{tx_id}', json={'note': 'checked'})
+    assert client.get(url).status_code == 202
+    res = _wait_for_pdf(client, url)
+    assert res.status_code == 200 and res.headers['ETag'] != etag
+    assert len(os.listdir(os.path.join(app.config['STATEMENT_FOLDER'], str(acc_id)))) == 1
+
+
+def test_statement_queued_for_worker(app, client, monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr('app.statements.get_redis', lambda: redis)
+    acc_id = _seed(app, client, 10)
+    url = f'/api/accounts/{acc_id}/statements/2024-04'
+
+    assert client.get(url).status_code == 202
+    assert client.get(url).status_code == 202
+    jobs = redis.queues[app.config['STATEMENT_QUEUE']]
+    assert len(jobs) == 1  # not queued again while pending
+
+    with app.app_context():
+        process_statement(json.loads(jobs[0]), redis, engine=db.engine)
+    assert redis.values == {}
+    res = client.get(url)
+    assert res.status_code == 200
+    assert 'Shop 9' in PdfReader(io.BytesIO(res.data)).pages[0].extract_text()
+
+
+def test_statement_requires_valid_month_and_own_account(app, client):
+    acc_id = _seed(app, client, 1)
+    assert client.get(f'/api/accounts/{acc_id}/statements/2024-13').status_code == 400
+    assert client.get(f'/api/accounts/{acc_id}/statements/april').status_code == 400
+    client.post('/auth/logout')
+    client.post('/auth/register', data={'email': 'other@example.com', 'password': 'pass'})
+    assert client.get(f'/api/accounts/{acc_id}/statements/2024-04').status_code == 404
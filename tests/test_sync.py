@@ -0,0 +1,122 @@
+import os
+import sys
+import pathlib
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+os.environ['DATABASE_URL'] = 'sqlite:///test.db'
+
+from app import create_app, db
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    if os.path.exists('test.db'):
+        os.remove('test.db')
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    return client
+
+
+def _sync(client, since):
+    res = client.get(f'/api/sync?since={since}')
+    assert res.status_code == 200
+    return res.get_json()['data']
+
+
+def test_sync_returns_only_changes_since_cursor(client):
+    acc_id = client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+    cat_id = client.post('/api/categories', json={'name': 'Food', 'kind': 'expense'}).get_json()['data']['id']
+    rule_id = client.post('/api/rules', json={'pattern': 'OXXO', 'category_id': cat_id}).get_json()['data']['id']
+
+    first = _sync(client, 0)
+    assert [a['id'] for a in first['accounts']] == [acc_id]
+    assert [c['id'] for c in first['categories']] == [cat_id]
+    assert [r['id'] for r in first['rules']] == [rule_id]
+    assert first['has_more'] is False
+    cursor = first['cursor']
+
+    empty = _sync(client, cursor)
+    assert empty['cursor'] == cursor
+    assert empty['accounts'] == empty['categories'] == empty['rules'] == []
+
+    client.put(f'/api/accounts/{acc_id}', json={'name': 'Wallet'})
+    delta = _sync(client, cursor)
+    assert [a['name'] for a in delta['accounts']] == ['Wallet']
+    assert delta['categories'] == delta['rules'] == []
+    assert delta['cursor'] > cursor
+
+    # The set-based cascade shows up as a changed rule
+    client.delete(f'/api/categories/{cat_id}?confirm=true')
+    delta = _sync(client, delta['cursor'])
+    assert delta['deleted']['categories'] == [cat_id]
+    assert [(r['id'], r['active']) for r in delta['rules']] == [(rule_id, False)]
+
+    client.post('/api/rules/bulk/delete', json=[rule_id])
+    delta = _sync(client, delta['cursor'])
+    assert delta['deleted']['rules'] == [rule_id]
+
+
+def test_sync_pages_and_isolates_users(app, client, monkeypatch):
+    from app.api import routes
+
+    monkeypatch.setattr(routes, 'SYNC_PAGE_SIZE', 3)
+    client.post('/api/accounts/bulk', json=[{'name': f'A{i}', 'type': 'cash'} for i in range(5)])
+    # Updating an early row moves it to the end instead of repeating it
+    client.put('/api/accounts/1', json={'name': 'First'})
+
+    page = _sync(client, 0)
+    assert [a['name'] for a in page['accounts']] == ['A1', 'A2', 'A3']
+    assert page['has_more'] is True
+    page = _sync(client, page['cursor'])
+    assert [a['name'] for a in page['accounts']] == ['A4', 'First']
+    assert page['has_more'] is False
+
+    other = app.test_client()
+    other.post('/auth/register', data={'email': 'other@example.com', 'password': 'pass'})
+    assert other.get('/api/sync').get_json()['data']['accounts'] == []
+    assert client.get('/api/sync?since=abc').status_code == 400
+
+
+def test_users_are_locked_before_their_changes_are_logged(app, client):
+    from sqlalchemy import event
+    from sqlalchemy.dialects import postgresql
+    from app.changelog import lock_users
+
+    assert 'FOR UPDATE' in str(lock_users([1]).compile(dialect=postgresql.dialect()))
+
+    acc_id = client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+    client.post('/api/rules', json={'pattern': 'OXXO', 'scope_account_id': acc_id})
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(' '.join(statement.split()))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        client.put(f'/api/accounts/{acc_id}', json={'name': 'Wallet'})
+        client.delete(f'/api/accounts/{acc_id}')
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    def first(prefix, after=0):
+        return next(i for i, s in enumerate(statements) if i >= after and s.startswith(prefix))
+
+    # Both the ORM update and the set-based rule cascade lock the user first
+    lock = first('SELECT user.id FROM user')
+    assert lock < first('UPDATE account') < first('INSERT INTO change_log')
+    lock = first('SELECT user.id FROM user', lock + 1)
+    assert lock < first('UPDATE rule')
@@ -0,0 +1,126 @@
+import os
+import sys
+import pathlib
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+os.environ['DATABASE_URL'] = 'sqlite:///test.db'
+
+from app import create_app, db
+from app.models import Transaction, User
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config.update(TESTING=True, TIMESERIES_MAX_POINTS=120)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    if os.path.exists('test.db'):
+        os.remove('test.db')
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    return client
+
+
+def _account(client, name='Cash'):
+    return client.post('/api/accounts', json={'name': name, 'type': 'cash'}).get_json()['data']['id']
+
+
+def _add(app, account_id, day, amount):
+    with app.app_context():
+        db.session.add(Transaction(user_id=User.query.first().id, account_id=account_id,
+                                   date=day, amount=Decimal(amount)))
+        db.session.commit()
+
+
+def _series(client, **params):
+    res = client.get('/api/timeseries', query_string=params)
+    assert res.status_code == 200, res.get_json()
+    return res.get_json()['data']
+
+
+def test_daily_buckets_fill_gaps(app, client):
+    acc = _account(client)
+    _add(app, acc, date(2024, 4, 1), '100.00')
+    _add(app, acc, date(2024, 4, 1), '-30.00')
+    _add(app, acc, date(2024, 4, 3), '-5.50')
+    _add(app, acc, date(2024, 4, 9), '-1.00')  # outside the range
+
+    data = _series(client, granularity='day', **{'from': '2024-04-01', 'to': '2024-04-03'})
+    assert (data['granularity'], data['step']) == ('day', 1)
+    assert data['points'] == [
+        {'date': '2024-04-01', 'income': 100.0, 'expense': 30.0},
+        {'date': '2024-04-02', 'income': 0.0, 'expense': 0.0},
+        {'date': '2024-04-03', 'income': 0.0, 'expense': 5.5},
+    ]
+
+
+def test_weeks_start_on_monday_and_months_on_the_first(app, client):
+    acc = _account(client)
+    _add(app, acc, date(2024, 4, 7), '-1.00')   # Sunday
+    _add(app, acc, date(2024, 4, 8), '-2.00')   # Monday
+    _add(app, acc, date(2024, 4, 14), '-4.00')  # Sunday
+    _add(app, acc, date(2024, 5, 1), '8.00')
+
+    weeks = _series(client, granularity='week', **{'from': '2024-04-03', 'to': '2024-04-14'})
+    assert [(p['date'], p['expense']) for p in weeks['points']] == [('2024-04-01', 1.0), ('2024-04-08', 6.0)]
+
+    months = _series(client, granularity='month', **{'from': '2024-04-03', 'to': '2024-05-31'})
+    assert [(p['date'], p['income'], p['expense']) for p in months['points']] == [
+        ('2024-04-01', 0.0, 7.0),
+        ('2024-05-01', 8.0, 0.0),
+    ]
+
+
+def test_long_ranges_are_downsampled(app, client):
+    acc = _account(client)
+    for year in range(2000, 2025):
+        _add(app, acc, date(year, 2, 29 if year % 4 == 0 else 28), '-10.00')
+
+    data = _series(client, granularity='day', **{'from': '2000-01-01', 'to': '2024-12-31'})
+    # 300 months do not fit in 120 points, so every 3 months share one
+    assert (data['granularity'], data['step']) == ('month', 3)
+    assert len(data['points']) == 100
+    assert data['points'][1]['date'] == '2000-04-01'
+    assert sum(p['expense'] for p in data['points']) == 250.0
+    assert all(p['expense'] == 10.0 for p in data['points'][::4])
+
+    # 90 days fit as days, a year as weeks
+    assert _series(client, **{'from': '2024-01-01', 'to': '2024-03-30'})['granularity'] == 'day'
+    assert _series(client, **{'from': '2024-01-01', 'to': '2024-12-31'})['granularity'] == 'week'
+
+
+def test_account_filter_and_validation(app, client):
+    cash = _account(client)
+    bank = _account(client, 'Bank')
+    day = date.today() - timedelta(days=1)
+    _add(app, cash, day, '-3.00')
+    _add(app, bank, day, '-4.00')
+
+    assert sum(p['expense'] for p in _series(client)['points']) == 7.0
+    assert sum(p['expense'] for p in _series(client, account=bank)['points']) == 4.0
+    assert len(_series(client)['points']) == 30
+
+    assert client.get('/api/timeseries?granularity=hour').status_code == 400
+    assert client.get('/api/timeseries?from=2024-05-01&to=2024-04-01').status_code == 400
+    assert client.get('/api/timeseries?from=yesterday').status_code == 400
+    assert client.get('/api/timeseries?account=9999').status_code == 400
+
+
+def test_ranges_at_the_ends_of_the_calendar(client):
+    data = _series(client, to='0001-01-05')
+    assert data['from'] == '0001-01-01'
+    assert len(data['points']) == 5
+    for granularity in ('day', 'week', 'month'):
+        data = _series(client, granularity=granularity, **{'from': '0001-01-01', 'to': '9999-12-31'})
+        assert data['points'][-1]['date'] <= '9999-12-31'
@@ -0,0 +1,123 @@
+import os
+import sys
+import pathlib
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+os.environ['DATABASE_URL'] = 'sqlite:///test.db'
+
+from app import create_app, db
+from app.models import Attachment, Transaction, User
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    if os.path.exists('test.db'):
+        os.remove('test.db')
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    return client
+
+
+def _account(client, name='Cash'):
+    return client.post('/api/accounts', json={'name': name, 'type': 'cash'}).get_json()['data']['id']
+
+
+def test_transactions_crud(app, client):
+    acc_id = _account(client)
+    cat_id = client.post('/api/categories', json={'name': 'Food', 'kind': 'expense'}).get_json()['data']['id']
+
+    res = client.post('/api/transactions', json={
+        'account_id': acc_id, 'category_id': cat_id, 'date': '2024-03-14', 'amount': '-62.5', 'merchant': 'OXXO',
+    })
+    assert res.status_code == 201
+    tx = res.get_json()['data']
+    assert tx == {
+        'id': tx['id'], 'account_id': acc_id, 'category_id': cat_id, 'date': '2024-03-14',
+        'amount': -62.5, 'merchant': 'OXXO', 'note': None, 'source': 'manual',
+    }
+
+    res = client.put(f'/api/transactions/{tx["id"]}', json={'category_id': None, 'note': 'snacks'})
+    assert res.get_json()['data']['category_id'] is None
+    assert client.get(f'/api/transactions/{tx["id"]}').get_json()['data']['note'] == 'snacks'
+
+    assert client.post('/api/transactions', json={'amount': 1}).status_code == 400
+    assert client.post('/api/transactions', json={'account_id': acc_id, 'amount': 'x'}).status_code == 422
+    assert client.post('/api/transactions', json={'account_id': 9999, 'amount': 1}).status_code == 422
+    assert client.put(f'/api/transactions/{tx["id"]}', json={'date': '14/03/2024'}).status_code == 422
+
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        db.session.add(Attachment(user_id=user.id, transaction_id=tx['id'], filename='r.png'))
+        db.session.commit()
+    assert client.delete(f'/api/transactions/{tx["id"]}').get_json()['data'] == {'id': tx['id']}
+    assert client.get(f'/api/transactions/{tx["id"]}').status_code == 404
+    with app.app_context():
+        assert Attachment.query.one().transaction_id is None
+
+
+def test_transactions_keyset_pagination_and_filters(app, client):
+    acc_id = _account(client)
+    other_acc = _account(client, 'Bank')
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').one()
+        start = date(2024, 1, 1)
+        for i in range(25):
+            # Two transactions per day so pages split ties on date
+            db.session.add(Transaction(
+                user_id=user.id, account_id=acc_id if i % 5 else other_acc,
+                date=start + timedelta(days=i // 2), amount=Decimal(-i), merchant=f'Shop {i}',
+            ))
+        db.session.commit()
+        expected = [t.id for t in Transaction.query.order_by(Transaction.date.desc(), Transaction.id.desc())]
+
+    seen, cursor = [], None
+    while True:
+        url = '/api/transactions?limit=7' + (f'&cursor={cursor}' if cursor else '')
+        data = client.get(url).get_json()['data']
+        seen += [t['id'] for t in data['items']]
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+    assert seen == expected
+
+    data = client.get('/api/transactions?fields=amount,merchant&limit=2').get_json()['data']
+    assert set(data['items'][0]) == {'id', 'amount', 'merchant'}
+
+    data = client.get(f'/api/transactions?account_id={other_acc}').get_json()['data']
+    assert [t['merchant'] for t in data['items']] == [f'Shop {i}' for i in (20, 15, 10, 5, 0)]
+    data = client.get('/api/transactions?from=2024-01-13&q=SHOP').get_json()['data']
+    assert [t['merchant'] for t in data['items']] == ['Shop 24']
+    data = client.get('/api/transactions?min_amount=-2').get_json()['data']
+    assert len(data['items']) == 3
+
+    assert client.get('/api/transactions?cursor=bogus').status_code == 400
+    assert client.get('/api/transactions?fields=password').status_code == 400
+    assert client.get('/api/transactions?limit=1000').status_code == 400
+    assert client.get('/api/transactions?from=yesterday').status_code == 400
+
+    other = app.test_client()
+    other.post('/auth/register', data={'email': 'other@example.com', 'password': 'pass'})
+    assert other.get('/api/transactions').get_json()['data']['items'] == []
+    assert other.get(f'/api/transactions/{expected[0]}').status_code == 404
+
+
+def test_transactions_page_renders(client):
+    _account(client)
+    res = client.get('/transactions')
+    assert res.status_code == 200
+    assert b'id="transactions"' in res.data
+    assert b'"accounts": {"1": "Cash"}' in res.data
@@ -0,0 +1,110 @@
+import io
+import os
+import sys
+import pathlib
+import hashlib
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+os.environ['DATABASE_URL'] = 'sqlite:///test.db'
+
+from app import create_app, db
+from app.api import routes
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app()
+    app.config.update(TESTING=True, UPLOAD_FOLDER=str(tmp_path / 'uploads'))
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    if os.path.exists('test.db'):
+        os.remove('test.db')
+
+
+@pytest.fixture
+def ocr_calls(monkeypatch):
+    calls = []
+
+    def fake_extract(path, **kwargs):
+        calls.append(path)
+        return {'merchant': 'OXXO', 'amount': Decimal('12.50'), 'date': date(2024, 5, 1)}
+
+    monkeypatch.setattr(routes, 'extract_fields', fake_extract)
+    return calls
+
+
+def upload(client, account_id, data, name='receipt.jpg'):
+    return client.post(
+        '/api/upload',
+        data={'file': (io.BytesIO(data), name), 'account_id': str(account_id)},
+        content_type='multipart/form-data',
+    )
+
+
+def test_identical_upload_skips_ocr(app, ocr_calls):
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    acc_id = client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+    data = os.urandom(300 * 1024)
+    sha = hashlib.sha256(data).hexdigest()
+
+    res = upload(client, acc_id, data)
+    # No REDIS_URL in tests, so OCR runs inline and the job is already done
+    assert res.status_code == 202
+    first = res.get_json()
+    assert first['deduplicated'] is False
+    assert first['status'] == 'done'
+    assert len(ocr_calls) == 1
+
+    res = upload(client, acc_id, data, name='copy.jpg')
+    assert res.status_code == 200
+    second = res.get_json()
+    assert second['deduplicated'] is True
+    assert second['transaction_id'] != first['transaction_id']
+    assert len(ocr_calls) == 1
+
+    updir = pathlib.Path(app.config['UPLOAD_FOLDER'])
+    stored = updir / sha[:2] / sha[2:4] / sha
+    assert stored.read_bytes() == data
+    # Both names share one blob and no temp files are left behind
+    assert [p for p in updir.rglob('*') if p.is_file()] == [stored]
+
+    with app.app_context():
+        from app.models import Transaction
+        tx = db.session.get(Transaction, second['transaction_id'])
+        assert tx.merchant == 'OXXO'
+        assert tx.amount == Decimal('12.50')
+
+
+def test_dedup_is_per_user(app, ocr_calls):
+    client = app.test_client()
+    data = b'same receipt bytes'
+    for email in ('a@example.com', 'b@example.com'):
+        client.post('/auth/register', data={'email': email, 'password': 'pass'})
+        acc_id = client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+        assert upload(client, acc_id, data).get_json()['deduplicated'] is False
+        client.post('/auth/logout')
+    assert len(ocr_calls) == 2
+
+
+def test_inline_ocr_failure_marks_job_failed(app, monkeypatch):
+    def broken(path, **kwargs):
+        raise RuntimeError('tesseract is not installed')
+
+    monkeypatch.setattr(routes, 'extract_fields', broken)
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    acc_id = client.post('/api/accounts', json={'name': 'Cash', 'type': 'cash'}).get_json()['data']['id']
+
+    res = upload(client, acc_id, b'receipt')
+    assert res.status_code == 202
+    body = res.get_json()
+    assert body['status'] == 'failed'
+    status = client.get(f"/api/uploads/{body['job_id']}").get_json()['data']
+    assert (status['status'], status['error']) == ('failed', 'tesseract is not installed')
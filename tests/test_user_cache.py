@@ -0,0 +1,85 @@
+import os
+import sys
+import pathlib
+
+import pytest
+from sqlalchemy import event
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+os.environ['DATABASE_URL'] = 'sqlite:///test.db'
+
+from app import create_app, db
+from app.cache import TTLCache
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    yield app
+    if os.path.exists('test.db'):
+        os.remove('test.db')
+
+
+@pytest.fixture
+def user_queries(app):
+    queries = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM user' in statement:
+            queries.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield queries
+    event.remove(engine, 'before_cursor_execute', record)
+
+
+def test_authenticated_requests_skip_user_lookup(app, user_queries):
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+
+    # The first request after login reads the user row and caches it
+    assert client.get('/api/accounts').status_code == 200
+    before = len(user_queries)
+    for _ in range(3):
+        assert client.get('/api/accounts').status_code == 200
+    assert len(user_queries) == before
+
+
+def test_user_changes_invalidate_cache(app, user_queries):
+    from app.models import User
+
+    client = app.test_client()
+    client.post('/auth/register', data={'email': 'test@example.com', 'password': 'pass'})
+    client.get('/api/accounts')
+
+    with app.app_context():
+        user = User.query.filter_by(email='test@example.com').first()
+        user.set_password('new-pass')
+        db.session.commit()
+
+    before = len(user_queries)
+    assert client.get('/api/accounts').status_code == 200
+    assert len(user_queries) == before + 1
+
+    client.post('/auth/logout')
+    client.post('/auth/login', data={'email': 'test@example.com', 'password': 'new-pass'})
+    assert client.get('/api/accounts').status_code == 200
+
+
+def test_ttl_cache_expires_and_evicts(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('app.cache.time.monotonic', lambda: now[0])
+    cache = TTLCache(ttl=10, maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)  # evicts least recently used 'b'
+    assert cache.get('b') is None
+    now[0] += 11
+    assert cache.get('a') is None
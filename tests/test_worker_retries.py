@@ -42,6 +42,28 @@ def failing_ocr(job):
     raise RuntimeError("boom")
 
 
+class RecordingHTTPClient(DummyHTTPClient):
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, json=None, headers=None):
+        self.posts.append((json, headers))
+
+
+def test_job_secret_signs_the_callback():
+    import hashlib
+    import hmac
+
+    http = RecordingHTTPClient()
+    job = {"id": "7", "webhook_url": "http://example.com/webhooks/ocr", "webhook_secret": "api-secret"}
+    process_ocr(job, FakeRedis(), http_client=http, ocr_func=lambda job: "TOTAL 1.00",
+                webhook_secret="default")
+
+    payload, headers = http.posts[0]
+    expected = hmac.new(b"api-secret", json.dumps(payload).encode(), hashlib.sha256).hexdigest()
+    assert headers["X-Hub-Signature"] == expected
+
+
 def test_retry_and_dead_letter():
     redis_conn = FakeRedis()
     job = {
@@ -76,3 +98,54 @@ def test_retry_and_dead_letter():
     assert redis_conn.queues["main"] == []
     assert json.loads(redis_conn.queues["dead"][0]) == job
     assert redis_conn.get("retries:1") is None
+
+
+def test_pdf_text_layer_is_used_without_ocr(tmp_path, monkeypatch):
+    from reportlab.pdfgen import canvas
+    from app import ocr
+
+    def fail(*args, **kwargs):
+        raise AssertionError("digital PDFs should not be OCR'd")
+
+    monkeypatch.setattr(ocr, "_get_pool", fail)
+    path = str(tmp_path / "statement.pdf")
+    c = canvas.Canvas(path)
+    c.drawString(72, 760, "BANCO DEL NORTE estado de cuenta")
+    c.save()
+
+    posted = []
+
+    class RecordingClient(DummyHTTPClient):
+        def post(self, url, json=None, headers=None):
+            posted.append(json)
+
+    job = {"id": "pdf", "image_path": path, "webhook_url": "http://example.com"}
+    process_ocr(job, FakeRedis(), http_client=RecordingClient())
+    assert "BANCO DEL NORTE" in posted[0]["text"]
+
+
+def test_worker_shares_the_ocr_text_cache(tmp_path, monkeypatch):
+    from app import ocr
+
+    calls = []
+
+    def fake_document_text(path):
+        calls.append(path)
+        return "OXXO\nTOTAL 12.50"
+
+    monkeypatch.setattr(ocr, "document_text", fake_document_text)
+    monkeypatch.setenv("OCR_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "receipt.png"
+    path.write_bytes(b"receipt-bytes")
+
+    posted = []
+
+    class RecordingClient(DummyHTTPClient):
+        def post(self, url, json=None, headers=None):
+            posted.append(json)
+
+    for job_id in ("a", "b"):
+        job = {"id": job_id, "image_path": str(path), "webhook_url": "http://example.com"}
+        process_ocr(job, FakeRedis(), http_client=RecordingClient())
+    assert [p["text"] for p in posted] == ["OXXO\nTOTAL 12.50"] * 2
+    assert len(calls) == 1